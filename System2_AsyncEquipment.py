@@ -0,0 +1,523 @@
+import asyncio
+import threading
+import time
+import serial
+from pymodbus.client import AsyncModbusTcpClient
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+from System2_Equipment import (BalanceReader, ModbusEndpoint, Pump, PumpReply, PumpTimeoutError, ScanPlan,
+                               encode_floats, serial_port_name)
+
+
+class EquipmentLoop:
+    """
+    Runs one asyncio event loop in a background thread for all async equipment.
+
+    Synchronous code (the Tk GUI, PID threads) hands coroutines to the loop with
+    submit() or run(), or wraps an async device with wrap() to get a blocking
+    object with the same method names.
+    """
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="EquipmentLoop")
+        self.thread.daemon = True
+        self.thread.start()
+
+    @classmethod
+    def default(cls):
+        """Get the shared loop, starting it on first use."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the loop.
+
+        Returns:
+            concurrent.futures.Future with the coroutine's result
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and block until it finishes."""
+        if threading.current_thread() is self.thread:
+            coro.close()
+            raise RuntimeError("EquipmentLoop.run() called from the loop thread, await the coroutine instead")
+        return self.submit(coro).result(timeout)
+
+    def wrap(self, device):
+        """Get a blocking proxy for an async device, see BlockingProxy."""
+        return BlockingProxy(device, self)
+
+    def stop(self):
+        """Stop the event loop."""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class BlockingProxy:
+    """
+    Thin synchronous wrapper around an async device.
+
+    Coroutine methods run on the EquipmentLoop and block the caller until they
+    finish; every other attribute is passed through unchanged.
+    """
+    def __init__(self, device, equipment_loop):
+        self._device = device
+        self._equipment_loop = equipment_loop
+
+    def __getattr__(self, name):
+        attr = getattr(self._device, name)
+        if asyncio.iscoroutinefunction(attr):
+            def blocking(*args, **kwargs):
+                return self._equipment_loop.run(attr(*args, **kwargs))
+            return blocking
+        return attr
+
+
+class AsyncSerialPort:
+    """
+    Non-blocking serial transport for the event loop.
+
+    On POSIX the port's file descriptor is registered with loop.add_reader, so
+    reads are event driven. Where that is not available (Windows COM ports,
+    pyserial URL handlers without a file descriptor) the port is switched to
+    timeout=0 and polled from the loop every poll_interval seconds.
+    """
+    def __init__(self, port, baudrate=9600, poll_interval=0.002, **kwargs):
+        """
+        Args:
+            port: Open serial port, or a device path, COM port or pyserial URL to open
+            baudrate: Baud rate when the port is opened here (default: 9600)
+            poll_interval: Polling period when event-driven reads are unavailable
+            **kwargs: Further pyserial settings (parity, stopbits, ...) when the port is opened here
+        """
+        if isinstance(port, (str, int)):
+            port = serial.serial_for_url(serial_port_name(port), baudrate, timeout=0, **kwargs)
+        else:
+            port.timeout = 0
+        self._serial = port
+        self.url = port.port
+        self.poll_interval = poll_interval
+        self.last_arrival = None  # time.monotonic() of the newest received bytes
+        self._buffer = bytearray()
+        self._data_event = None
+        self._error = None
+        self._loop = None
+        self._event_driven = False
+
+    async def open(self):
+        """Register the port with the running loop."""
+        self._loop = asyncio.get_running_loop()
+        self._data_event = asyncio.Event()
+        try:
+            self._loop.add_reader(self._serial.fileno(), self._on_readable)
+            self._event_driven = True
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            self._event_driven = False
+
+    def _receive(self, size):
+        data = self._serial.read(size)
+        if data:
+            self.last_arrival = time.monotonic()
+            self._buffer += data
+        return data
+
+    def _on_readable(self):
+        try:
+            self._receive(self._serial.in_waiting or 1)
+        except (serial.SerialException, OSError) as e:
+            # A dead descriptor stays readable; fall back to polling, which reports the error per read
+            self._error = e
+            self.detach()
+        self._data_event.set()
+
+    def write(self, data):
+        self._serial.write(data)
+
+    def discard_input(self):
+        """Drop buffered input, e.g. the tail of a reply that timed out."""
+        self._buffer.clear()
+        self._serial.reset_input_buffer()
+
+    async def _fill_until(self, complete, timeout):
+        """Receive into the buffer until complete(buffer) is True or the deadline passes."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not complete(self._buffer):
+            if self._error is not None:
+                error, self._error = self._error, None
+                raise error
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(bytes(self._buffer))
+            if self._event_driven:
+                self._data_event.clear()
+                try:
+                    await asyncio.wait_for(self._data_event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            elif not self._receive(self._serial.in_waiting):
+                await asyncio.sleep(min(self.poll_interval, remaining))
+
+    async def read(self, timeout):
+        """
+        Read whatever arrives next.
+
+        Returns:
+            The received bytes, empty if nothing arrived within timeout
+        """
+        try:
+            await self._fill_until(len, timeout)
+        except asyncio.TimeoutError:
+            pass
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+    async def read_until(self, complete, timeout):
+        """
+        Read until complete(received_bytes) is True.
+
+        Args:
+            complete: Predicate on the bytes received so far
+            timeout: Deadline in seconds
+
+        Returns:
+            The received bytes
+
+        Raises:
+            asyncio.TimeoutError: If the deadline passes first
+        """
+        await self._fill_until(lambda buf: complete(bytes(buf)), timeout)
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+    async def readline(self, timeout):
+        """Read one line terminated by LF, keeping any bytes after it for the next call."""
+        await self._fill_until(lambda buf: b"\n" in buf, timeout)
+        end = self._buffer.index(b"\n") + 1
+        line = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        return line
+
+    def detach(self):
+        """Unregister the port from the loop; call on the loop thread. The port stays open."""
+        if self._event_driven:
+            self._event_driven = False
+            try:
+                self._loop.remove_reader(self._serial.fileno())
+            except (OSError, ValueError):
+                pass
+
+    def close(self):
+        """Unregister and close the port; call on the loop thread."""
+        self.detach()
+        self._serial.close()
+
+
+class AsyncPump:
+    """
+    Async counterpart of Pump for the Reglo ICC.
+
+    Commands are serialized per port with an asyncio.Lock instead of a worker
+    thread, so any number of pumps can be driven from the one EquipmentLoop. The
+    commands are encoded and the replies framed by the same code as Pump.
+    """
+    ACK = Pump.ACK
+    NAK = Pump.NAK
+    TERMINATOR = Pump.TERMINATOR
+    _reply_complete = Pump._reply_complete
+
+    def __init__(self, port_number, command_timeout=0.5):
+        """
+        Args:
+            port_number: COM port number, device path or pyserial URL (see serial_port_name)
+            command_timeout: Per-command reply deadline in seconds
+        """
+        self.COM = serial_port_name(port_number)
+        self.command_timeout = command_timeout
+        self.last_rtt = None
+        self.port = AsyncSerialPort(
+            self.COM,
+            9600,
+            parity=serial.PARITY_NONE,
+            stopbits=serial.STOPBITS_ONE,
+            bytesize=serial.EIGHTBITS,
+        )
+        self._lock = None
+
+    async def open(self):
+        """Attach the serial port to the running loop. Call once before any command."""
+        self._lock = asyncio.Lock()
+        await self.port.open()
+
+    async def close(self):
+        self.port.close()
+
+    async def transact(self, command, timeout=None):
+        """
+        Send one command and await the reply terminator or ack, see Pump.transact.
+
+        Returns:
+            PumpReply with the decoded text, ack status and round-trip time
+        """
+        if timeout is None:
+            timeout = self.command_timeout
+
+        async with self._lock:
+            self.port.discard_input()
+            start = time.perf_counter()
+            self.port.write(f"{command}\r".encode())
+            try:
+                buf = await self.port.read_until(self._reply_complete, timeout)
+            except asyncio.TimeoutError as e:
+                raise PumpTimeoutError(
+                    f"{self.COM}: no complete reply to {command!r} within {timeout * 1000:.0f} ms "
+                    f"(received {e.args[0] if e.args else b''!r})")
+            rtt = time.perf_counter() - start
+
+        self.last_rtt = rtt
+        return PumpReply(buf.decode(errors='ignore').strip(), buf != self.NAK, rtt)
+
+    async def set_independent_channel_control(self):
+        return await self.transact("1~1")
+
+    async def start_channel(self, channel):
+        return await self.transact(f"{channel}H")
+
+    async def stop_channel(self, channel):
+        return await self.transact(f"{channel}I")
+
+    async def set_direction(self, channel, direction):
+        return await self.transact(Pump.direction_command(channel, direction))
+
+    async def get_direction(self, channel):
+        return (await self.transact(f"{channel}xD")).text
+
+    async def set_speed(self, channel, speed):
+        for command in Pump.speed_commands(channel, speed):
+            reply = await self.transact(command)
+        return reply.text
+
+    async def get_speed(self, channel):
+        return Pump.parse_speed((await self.transact(f"{channel}f")).text)
+
+    async def set_mode(self, channel, mode):
+        return await self.transact(Pump.mode_command(channel, mode))
+
+    async def get_mode(self, channel):
+        return (await self.transact(f"{channel}xM")).text
+
+
+class AsyncModbusConnection(ModbusEndpoint):
+    """
+    Shared async Modbus TCP connection per PLC endpoint, the async counterpart
+    of ModbusConnection. Requests are serialized with an asyncio.Lock; the
+    reconnect backoff and stats() are the same as ModbusConnection's.
+    """
+    _connections = {}
+    _connections_lock = threading.Lock()
+
+    def __init__(self, host, port=502, backoff_initial=0.5, backoff_max=10.0):
+        super().__init__(host, port, backoff_initial, backoff_max)
+        self.client = None  # AsyncModbusTcpClient, created on the loop by the first request
+        self._lock = None  # Created on the loop
+        self._users = 0
+
+    @classmethod
+    def get(cls, host, port=None):
+        """Get the shared connection for host:port, creating it on first use."""
+        port = port or 502
+        with cls._connections_lock:
+            if (host, port) not in cls._connections:
+                cls._connections[(host, port)] = cls(host, port)
+            return cls._connections[(host, port)]
+
+    def _request_lock(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _ensure_connected(self, force=False):
+        """Connect if the socket is down, honouring the reconnect backoff. Lock must be held."""
+        if self.client is None:
+            # Reconnects are driven by our own backoff, not pymodbus' background reconnect
+            self.client = AsyncModbusTcpClient(self.host, port=self.port, reconnect_delay=0)
+        if self.client.connected:
+            return
+        self._check_backoff(force)
+        self._connect_result(await self.client.connect())
+
+    async def acquire(self):
+        """Register a user of the connection and open the socket if needed."""
+        async with self._request_lock():
+            self._users += 1
+            try:
+                await self._ensure_connected(force=True)
+            except ConnectionError as e:
+                # Requests will keep retrying with backoff
+                print(e)
+
+    async def release(self):
+        """Unregister a user; the socket is closed when the last user is gone."""
+        async with self._request_lock():
+            self._users = max(0, self._users - 1)
+            if self._users == 0 and self.client is not None:
+                self.client.close()
+
+    async def execute(self, method, *args, **kwargs):
+        """Run one request, connecting first if the socket is down."""
+        async with self._request_lock():
+            start = time.perf_counter()
+            try:
+                await self._ensure_connected()
+                result = await getattr(self.client, method)(*args, **kwargs)
+            except ConnectionError:
+                self._record(error=True)
+                raise
+            except (ConnectionException, ModbusIOException, OSError, asyncio.TimeoutError):
+                # Drop the socket, it may hold half a frame; the next request reconnects
+                self._record(error=True)
+                self.client.close()
+                self._schedule_retry()
+                raise
+            self._record(time.perf_counter() - start, result.isError())
+            return result
+
+
+class AsyncPLC:
+    """Base class for async PLC wrappers; connect() and the requests run on the EquipmentLoop."""
+    def __init__(self, host_num, port_num=None):
+        self.client = AsyncModbusConnection.get(host_num, port_num)
+        self.reading = False
+        self._connected = False
+
+    async def connect(self):
+        if not self._connected:
+            self._connected = True
+            await self.client.acquire()
+
+    async def disconnect(self):
+        if self._connected:
+            self._connected = False
+            await self.client.release()
+
+
+class AsyncReadFloatsPLC(AsyncPLC):
+    def __init__(self, host_num, port_num=None, word_order='little'):
+        super().__init__(host_num, port_num)
+        self.word_order = word_order
+
+    def reading_onoff(self, boolean):
+        self.reading = boolean
+
+    async def read_floats_once(self, plan):
+        """
+        Read every group of a ScanPlan once.
+
+        Returns:
+            Dictionary mapping register to value; registers of failed groups are left out
+        """
+        results = await asyncio.gather(
+            *(self.client.execute('read_holding_registers', start, count=count) for start, count in plan.groups),
+            return_exceptions=True)
+        ok = []
+        for g, result in enumerate(results):
+            good = not isinstance(result, Exception) and not result.isError()
+            if good:
+                plan.store(g, result.registers)
+            else:
+                start, count = plan.groups[g]
+                print(f"Error reading registers {start}-{start + count - 1}: {result}")
+            ok.append(good)
+        values = plan.decode(self.word_order).tolist()
+        return {reg: value for reg, value, g in zip(plan.registers, values, plan.group_of) if ok[g]}
+
+    async def read_floats(self, callbacks, interval=0.5, max_gap=10):
+        """
+        Async counterpart of ReadFloatsPLC.read_floats; callbacks maps first register to callback.
+        Scans run on a fixed period instead of sleeping a fixed time after each scan.
+        """
+        plan = ScanPlan(callbacks, max_gap)
+        loop = asyncio.get_running_loop()
+        next_scan = loop.time()
+        while self.reading:
+            for reg, value in (await self.read_floats_once(plan)).items():
+                try:
+                    callbacks[reg](value)
+                except Exception as e:
+                    print(f"Error reading float: {e}")
+            next_scan = max(next_scan + interval, loop.time())
+            await asyncio.sleep(next_scan - loop.time())
+
+
+class AsyncOneBitClass(AsyncPLC):
+    async def write_onoff(self, address_num, boolean):
+        return await self.client.execute('write_coil', int(address_num), boolean)
+
+
+class AsyncWriteFloatsPLC(AsyncPLC):
+    async def write_float(self, reg1, value):
+        return await self.client.execute('write_registers', reg1, encode_floats([value]))
+
+
+class AsyncBalanceReader(BalanceReader):
+    """
+    BalanceReader whose port is read by a task on the EquipmentLoop instead of a thread.
+
+    Any number of balances share the one loop thread. The ring, latest() and since()
+    are those of BalanceReader, so consumers such as PIDExecutor use it unchanged;
+    start(), stop() and close() are the blocking wrappers around the task.
+    """
+    def __init__(self, balance_ser, capacity=256, callback=None, equipment_loop=None):
+        """
+        Args:
+            balance_ser: Open serial port of the balance (or a port number/device path to open)
+            capacity: Number of readings kept
+            callback: Optional callback(timestamp, mass, stable) called on the loop thread
+            equipment_loop: EquipmentLoop to read on (default: EquipmentLoop.default())
+        """
+        super().__init__(balance_ser, capacity, callback)
+        self.equipment_loop = equipment_loop or EquipmentLoop.default()
+        self.port = AsyncSerialPort(self.ser)
+        self._stopped = threading.Event()
+        self._stopped.set()
+
+    def start(self):
+        """Start reading on the event loop."""
+        if self._stopped.is_set():
+            self._running = True
+            self._stopped.clear()
+            self.equipment_loop.submit(self._run())
+
+    def stop(self):
+        """Stop reading and wait until the task has let go of the port (the port is left open)."""
+        self._running = False
+        if threading.current_thread() is not self.equipment_loop.thread:
+            self._stopped.wait(timeout=2.0)
+
+    async def _run(self, timeout=0.2):
+        try:
+            await self.port.open()
+            while self._running:
+                try:
+                    data = await self.port.read(timeout)
+                except Exception as e:
+                    if self._running:
+                        print(f"Balance read error on {self.ser.port}: {e}")
+                        await asyncio.sleep(0.5)
+                    continue
+                if data:
+                    self._add_data(self.port.last_arrival, data)
+        finally:
+            self.port.detach()
+            self._stopped.set()
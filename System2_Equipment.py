@@ -1,141 +1,1333 @@
 import serial
 from pymodbus.client import ModbusTcpClient
 from time import sleep
+import time
 import struct
-from pymodbus.constants import Endian
-from pymodbus.payload import BinaryPayloadBuilder
+import numpy as np
+from pymodbus.exceptions import ConnectionException, ModbusIOException
 import threading
+import heapq
+import itertools
+import collections
+import re
+from concurrent.futures import Future
+
+def serial_port_name(port):
+    """
+    Turn a bare port number into 'COM<n>'; device paths such as /dev/ttyUSB0 or
+    /dev/pts/3 and pyserial URLs such as socket://host:port are passed through.
+    """
+    port = str(port).strip()
+    return f'COM{port}' if port.isdigit() else port
+
 
 # https://blog.darwin-microfluidics.com/how-to-control-the-reglo-icc-pump-using-python-and-matlab/
+class PumpTimeoutError(Exception):
+    """Raised when the pump does not finish its reply before the command deadline."""
+
+
+class PumpReply:
+    """
+    Result of one pump transaction.
+
+    Attributes:
+        text: Decoded reply with the terminator stripped
+        ok: False if the pump answered with the '#' (not executed) ack
+        rtt: Measured round-trip time in seconds
+    """
+    def __init__(self, text, ok, rtt):
+        self.text = text
+        self.ok = ok
+        self.rtt = rtt
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"PumpReply({self.text!r}, ok={self.ok}, rtt={self.rtt * 1000:.1f} ms)"
+
+
+class CommandScheduler:
+    """
+    Single worker thread that serializes all commands for one serial port.
+
+    Commands are run in priority order (lower number first, FIFO within a priority),
+    so PID setpoint writes jump ahead of queued polling reads. A command submitted
+    with a key replaces any still-queued command with the same key, so redundant
+    writes collapse and the last one wins.
+    """
+    PRIORITY_PID = 0
+    PRIORITY_GUI = 1
+    PRIORITY_POLL = 2
+
+    def __init__(self, name="port"):
+        """
+        Start the worker thread.
+
+        Args:
+            name: Name used for the worker thread and in error messages
+        """
+        self.name = name
+        self._cond = threading.Condition()
+        self._heap = []  # (priority, sequence, job)
+        self._keyed = {}  # key -> queued job, used to collapse redundant commands
+        self._seq = itertools.count()
+        self._depth = 0
+        self._running = True
+        self.reset_stats()
+
+        self.thread = threading.Thread(target=self._worker, name=f"CommandScheduler-{name}")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, func, *args, priority=PRIORITY_GUI, key=None):
+        """
+        Queue a command for the worker thread.
+
+        Args:
+            func: Callable doing the serial I/O
+            *args: Arguments for func
+            priority: PRIORITY_PID, PRIORITY_GUI or PRIORITY_POLL
+            key: Optional collapse key, e.g. ('set_speed', channel)
+
+        Returns:
+            concurrent.futures.Future resolved with the return value of func
+        """
+        future = Future()
+        if threading.current_thread() is self.thread:
+            # Called from a running command, queueing would deadlock
+            future.set_result(func(*args))
+            return future
+
+        with self._cond:
+            if not self._running:
+                raise RuntimeError(f"Command scheduler for {self.name} is stopped")
+
+            job = self._keyed.get(key) if key is not None else None
+            if job is not None:
+                # Last write wins, every caller still gets the result of the command that ran
+                job['func'] = func
+                job['args'] = args
+                job['futures'].append(future)
+                self._collapsed += 1
+                if priority < job['priority']:
+                    job['priority'] = priority
+                    heapq.heappush(self._heap, (priority, next(self._seq), job))
+                return future
+
+            job = {'func': func, 'args': args, 'priority': priority, 'key': key,
+                   'futures': [future], 'submitted': time.perf_counter(), 'done': False}
+            if key is not None:
+                self._keyed[key] = job
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+            self._depth += 1
+            self._max_depth = max(self._max_depth, self._depth)
+            self._cond.notify()
+        return future
+
+    def call(self, func, *args, priority=PRIORITY_GUI, key=None, timeout=None):
+        """Submit a command and block until its result is available."""
+        return self.submit(func, *args, priority=priority, key=key).result(timeout)
+
+    def queue_depth(self):
+        """Number of commands waiting to run."""
+        with self._cond:
+            return self._depth
+
+    def _next_job(self):
+        """Pop the next job, skipping heap entries left behind by priority upgrades."""
+        while self._heap:
+            _, _, job = heapq.heappop(self._heap)
+            if not job['done']:
+                job['done'] = True
+                self._depth -= 1
+                if job['key'] is not None:
+                    del self._keyed[job['key']]
+                return job
+        return None
+
+    def _worker(self):
+        """Run queued commands until stop() is called."""
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None and self._running:
+                    self._cond.wait()
+                    job = self._next_job()
+                if job is None:
+                    return
+
+            start = time.perf_counter()
+            wait = start - job['submitted']
+            try:
+                result = job['func'](*job['args'])
+                error = None
+            except Exception as e:
+                result = None
+                error = e
+            busy = time.perf_counter() - start
+
+            with self._cond:
+                self._executed += 1
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+                self._waits.append(wait)
+                self._busy_total += busy
+
+            for future in job['futures']:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def stats(self):
+        """
+        Get queue depth and wait-time statistics since the last reset.
+
+        Returns:
+            Dictionary with queue_depth, max_queue_depth, executed, collapsed,
+            mean_wait, p95_wait and max_wait (seconds) and utilization
+            (fraction of wall time the port was busy, 1.0 means saturated)
+        """
+        with self._cond:
+            waits = sorted(self._waits)
+            elapsed = time.perf_counter() - self._stats_start
+            return {
+                'queue_depth': self._depth,
+                'max_queue_depth': self._max_depth,
+                'executed': self._executed,
+                'collapsed': self._collapsed,
+                'mean_wait': self._wait_total / self._executed if self._executed else 0.0,
+                'p95_wait': waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                'max_wait': self._wait_max,
+                'utilization': self._busy_total / elapsed if elapsed > 0 else 0.0,
+            }
+
+    def reset_stats(self):
+        """Reset the counters reported by stats()."""
+        with self._cond:
+            self._stats_start = time.perf_counter()
+            self._executed = 0
+            self._collapsed = 0
+            self._max_depth = 0
+            self._wait_total = 0.0
+            self._wait_max = 0.0
+            self._waits = collections.deque(maxlen=1000)
+            self._busy_total = 0.0
+
+    def stop(self):
+        """Stop the worker thread after the queued commands have run."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+
 class Pump:
     """
     Reglo ICC Pump Control Library
+
+    All commands for the port run on one CommandScheduler worker. PID writes use
+    PRIORITY_PID, GUI buttons PRIORITY_GUI and speed polling PRIORITY_POLL.
     """
-    def __init__(self, port_number):
-        self.lock = threading.Lock()  # Add this
-        self.COM = f'COM{port_number}'
-        self.sp = serial.Serial(
+    # The Reglo answers set commands with a single '*' (done) or '#' (not executed)
+    # and query commands with a data line terminated by CR LF.
+    ACK = b"*"
+    NAK = b"#"
+    TERMINATOR = b"\r\n"
+
+    PRIORITY_PID = CommandScheduler.PRIORITY_PID
+    PRIORITY_GUI = CommandScheduler.PRIORITY_GUI
+    PRIORITY_POLL = CommandScheduler.PRIORITY_POLL
+
+    def __init__(self, port_number, command_timeout=0.5, verbose=False):
+        """
+        Args:
+            port_number: COM port number, device path or pyserial URL (see serial_port_name)
+            command_timeout: Per-command reply deadline in seconds
+            verbose: Print the reply of every set command (for debugging at the bench)
+        """
+        self.verbose = verbose
+        self.COM = serial_port_name(port_number)
+        self.command_timeout = command_timeout  # Per-command reply deadline in seconds
+        self.last_rtt = None
+        self.sp = serial.serial_for_url(
             self.COM,
             9600,
             parity=serial.PARITY_NONE,
             stopbits=serial.STOPBITS_ONE,
             bytesize=serial.EIGHTBITS,
+            timeout=0.02,  # Short read timeout, the transaction deadline is enforced in transact()
         )
+        self.scheduler = CommandScheduler(self.COM)
 
     def __del__(self):
-        self.sp.close()
+        self.close()
+
+    def close(self):
+        """Stop the command scheduler and close the serial port."""
+        if hasattr(self, 'scheduler'):
+            self.scheduler.stop()
+        if hasattr(self, 'sp'):
+            self.sp.close()
+
+    def _reply_complete(self, buf):
+        """Check if the bytes received so far form a complete reply."""
+        if buf in (self.ACK, self.NAK):
+            return True
+        return buf.endswith(self.TERMINATOR)
+
+    def transact(self, command, timeout=None):
+        """
+        Send one command and read until the reply terminator or ack arrives.
+
+        This does the raw I/O on the calling thread without locking; the public commands
+        below run it on the scheduler worker, which serializes all access to the port.
+
+        Args:
+            command: Command string without the trailing carriage return
+            timeout: Reply deadline in seconds (default: self.command_timeout)
+
+        Returns:
+            PumpReply with the decoded text, ack status and round-trip time
+
+        Raises:
+            PumpTimeoutError: If the reply is not complete before the deadline
+        """
+        if timeout is None:
+            timeout = self.command_timeout
+
+        self.sp.reset_input_buffer()  # Drop stale bytes from earlier timed out replies
+        start = time.perf_counter()
+        deadline = start + timeout
+        self.sp.write(f"{command}\r".encode())
+
+        buf = b""
+        while not self._reply_complete(buf):
+            if time.perf_counter() >= deadline:
+                raise PumpTimeoutError(
+                    f"{self.COM}: no complete reply to {command!r} within {timeout * 1000:.0f} ms "
+                    f"(received {buf!r})")
+            buf += self.sp.read(max(1, self.sp.in_waiting))
+
+        rtt = time.perf_counter() - start
+
+        self.last_rtt = rtt
+        return PumpReply(buf.decode(errors='ignore').strip(), buf != self.NAK, rtt)
+
+    def _log(self, reply):
+        if self.verbose:
+            print(f"{self.COM}: {reply.text}")
+
+    def command(self, command, priority=PRIORITY_GUI, key=None):
+        """
+        Run one command on the scheduler worker and wait for the reply.
+
+        Args:
+            command: Command string without the trailing carriage return
+            priority: Scheduler priority
+            key: Optional collapse key for redundant commands
+
+        Returns:
+            PumpReply
+        """
+        return self.scheduler.call(self.transact, command, priority=priority, key=key)
 
     def set_independent_channel_control(self):
         # Enable independent channel control mode
-        command = "1~1\r".encode()
-        self.sp.write(command)
-        sleep(0.1)
-        print(self.sp.read(self.sp.in_waiting).decode())
-
-    def start_channel(self, channel):
-        command = f"{channel}H\r".encode()
-        self.sp.write(command)
-        sleep(0.1)
-        print(self.sp.read(self.sp.in_waiting).decode())
-
-    def stop_channel(self, channel):
-        command = f"{channel}I\r".encode()
-        self.sp.write(command)
-        sleep(0.1)
-        print(self.sp.read(self.sp.in_waiting).decode())
+        reply = self.command("1~1")
+        self._log(reply)
+        return reply
+
+    def start_channel(self, channel, priority=PRIORITY_GUI):
+        reply = self.command(f"{channel}H", priority)
+        self._log(reply)
+        return reply
+
+    def stop_channel(self, channel, priority=PRIORITY_GUI):
+        reply = self.command(f"{channel}I", priority)
+        self._log(reply)
+        return reply
 
     # Set rotation direction
-    def set_direction(self, channel, direction):
+    def set_direction(self, channel, direction, priority=PRIORITY_GUI):
+        reply = self.command(self.direction_command(channel, direction), priority)
+        self._log(reply)
+        return reply
+
+    @staticmethod
+    def direction_command(channel, direction):
+        """Encode a set-direction command: 1 is counter-clockwise, anything else clockwise."""
         if direction == 1:
-            command = f"{channel}K\r".encode()  # counter-clockwise
-        else:
-            command = f"{channel}J\r".encode()  # clockwise
-        self.sp.write(command)
-        sleep(0.1)
-        print(self.sp.read(self.sp.in_waiting).decode())
+            return f"{channel}K"  # counter-clockwise
+        return f"{channel}J"  # clockwise
 
     # Get rotation direction
-    def get_direction(self, channel):
-        command = f"{channel}xD\r".encode()
-        self.sp.write(command)
-        sleep(0.1)
-        return self.sp.read(self.sp.in_waiting).decode()
+    def get_direction(self, channel, priority=PRIORITY_GUI):
+        return self.command(f"{channel}xD", priority).text
+
+    @staticmethod
+    def speed_commands(channel, speed):
+        """Encode a flow rate write: switch the channel to flow rate mode, then set the rate."""
+        speed_int = int(speed * 1000)
+        speed_string = f"{speed_int:04d}-3"
+        return [f"{channel}M", f"{channel}f{speed_string}"]
+
+    def _set_speed(self, channel, speed):
+        for command in self.speed_commands(channel, speed):
+            reply = self.transact(command)
+        return reply.text
+
+    def set_speed(self, channel: int, speed: float, priority=PRIORITY_GUI) -> str:
+        # Queued writes to the same channel collapse, only the latest speed is sent
+        return self.scheduler.call(self._set_speed, channel, speed,
+                                   priority=priority, key=('set_speed', channel))
+
+    def set_speeds(self, speeds, priority=PRIORITY_PID):
+        """
+        Queue speed writes for several channels at once without waiting for the replies.
+
+        Args:
+            speeds: {channel: speed in mL/min}
+            priority: Scheduler priority (default: PRIORITY_PID)
+
+        Returns:
+            {channel: Future} resolved with each reply
+        """
+        return {channel: self.scheduler.submit(self._set_speed, channel, speed,
+                                               priority=priority, key=('set_speed', channel))
+                for channel, speed in speeds.items()}
+
+    def get_speed(self, channel, priority=PRIORITY_POLL):
+        return self.parse_speed(self.command(f"{channel}f", priority).text)
+
+    @staticmethod
+    def parse_speed(raw_response):
+        """Parse the flow rate from the reply to an 'nf' query."""
+        lines = [line.strip() for line in raw_response.splitlines() if line.strip()]
+
+        for line in reversed(lines):
+            try:
+                value = float(line)
+                if value > 100:
+                    value = value / 1000.0
+                return round(value, 2)
+            except ValueError:
+                continue
+
+        raise ValueError("No response from pump")
+
+    def set_mode(self, channel, mode, priority=PRIORITY_GUI):
+        reply = self.command(self.mode_command(channel, mode), priority)
+        self._log(reply)
+        return reply
+
+    @staticmethod
+    def mode_command(channel, mode):
+        """Encode a set-mode command: 0 RPM, 1 flow rate, anything else volume over time."""
+        if mode == 0:
+            return f"{channel}L"  # RPM mode
+        if mode == 1:
+            return f"{channel}M"  # Flow rate mode
+        return f"{channel}G"  # Volume (over time) mode
+
+    def get_mode(self, channel, priority=PRIORITY_GUI):
+        return self.command(f"{channel}xM", priority).text
+
+class PumpSpeedPoller:
+    """
+    One polling thread per Pump that reads the speed of its active channels
+    round-robin at a fixed aggregate rate.
+
+    Channels can be added and removed at any time without creating or destroying
+    threads. Channels for which skip(name) returns True (e.g. PID-controlled
+    channels that publish their own flow rate) are passed over.
+    """
+    def __init__(self, pump, callback, rate=8.0, skip=None):
+        """
+        Args:
+            pump: Pump object to poll
+            callback: Called as callback(name, speed) for every reading
+            rate: Aggregate speed reads per second across all channels (default: 8.0)
+            skip: Optional predicate skip(name) -> bool checked before each read
+        """
+        self.pump = pump
+        self.callback = callback
+        self.rate = rate
+        self.skip = skip
+        self._channels = {}  # channel number -> series name, in insertion order
+        self._cond = threading.Condition()
+        self._running = True
+
+        self.thread = threading.Thread(target=self._poll_loop, name=f"PumpSpeedPoller-{pump.COM}")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def add_channel(self, channel, name):
+        """Start polling a channel, publishing readings under the given name."""
+        with self._cond:
+            self._channels[channel] = name
+            self._cond.notify()
+
+    def remove_channel(self, channel):
+        """Stop polling a channel."""
+        with self._cond:
+            self._channels.pop(channel, None)
+
+    def has_channel(self, channel):
+        with self._cond:
+            return channel in self._channels
+
+    def set_rate(self, rate):
+        """Set the aggregate read rate in reads per second."""
+        self.rate = rate
+
+    def stop(self, timeout=2.0):
+        """
+        Stop the polling thread and wait for a read in flight to finish, so the pump
+        can be closed right after.
+
+        Args:
+            timeout: Longest wait in seconds for the thread to exit
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def _poll_loop(self):
+        """Cycle through the active channels, one read per 1/rate seconds."""
+        position = 0
+        next_read = time.monotonic()
+
+        while True:
+            with self._cond:
+                while self._running and not self._channels:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                channels = list(self._channels.items())
+
+            # Next channel in turn that is not skipped; if all are skipped this slot stays idle
+            for _ in range(len(channels)):
+                channel, name = channels[position % len(channels)]
+                position += 1
+                if self.skip is None or not self.skip(name):
+                    try:
+                        value = self.pump.get_speed(channel)
+                        self.callback(name, value)
+                    except Exception as e:
+                        print(f"Polling error on {name}: {e}")
+                    break
+
+            # Fixed aggregate rate; if a read overran its slot, start the next one right away
+            next_read = max(next_read + 1.0 / self.rate, time.monotonic())
+            with self._cond:
+                if self._running:
+                    self._cond.wait(max(0.0, next_read - time.monotonic()))
+
+
+# The reading is the last number on the line, followed only by the unit and an optional
+# '?' unstable flag, so digits in a header like "W1" are never taken for the mass
+BALANCE_NUMBER = re.compile(r'([+-]?)\s*(\d+\.?\d*|\.\d+)\s*(kg|mg|g)?\s*\??\s*$', re.IGNORECASE)
+BALANCE_UNITS = {'kg': 1000.0, 'g': 1.0, 'mg': 0.001}
+
+
+def parse_balance_line(line):
+    """
+    Parse one line of balance continuous output into a mass in grams.
+
+    Understands the common formats, with the sign attached to or separated from the
+    number and an optional unit:
+        "ST,+00123.45  g"    A&D (ST stable, US unstable, OL overload)
+        "S S     123.45 g"   Mettler Toledo SICS (S D while unstable)
+        "N  +    123.45 g"   Sartorius
+        "   123.45 g ?"      Ohaus (? while unstable)
+        "W1 123.45 g"        header with digits (e.g. weighing unit 1)
+        "-0.12"              bare number
+
+    Returns:
+        Tuple of (mass in grams, stable) or None for empty, overload or unparsable lines
+    """
+    line = line.strip()
+    if not line or 'OL' in line.upper().split(',')[0]:
+        return None
+    match = BALANCE_NUMBER.search(line)
+    if not match:
+        return None
+    mass = float(match.group(2)) * BALANCE_UNITS.get((match.group(3) or 'g').lower(), 1.0)
+    if match.group(1) == '-':
+        mass = -mass
+    header = line[:match.start()].upper()
+    stable = not ('US' in header or header.startswith('S D') or '?' in line)
+    return mass, stable
+
+
+class BalanceReader:
+    """
+    Reader thread for a balance in continuous-output mode.
+
+    Drains the serial port as bytes arrive and stamps every line with time.monotonic()
+    the moment it is read, so a slow consumer does not age the timestamps. Parsed
+    readings go into a fixed ring of NumPy arrays written only by the reader thread:
+    each slot is filled before the write counter moves on, so consumers can read
+    without a lock and sample at their own rate with latest() or since().
+    """
+    def __init__(self, balance_ser, capacity=256, callback=None):
+        """
+        Args:
+            balance_ser: Open serial port of the balance (or a port number/device path to open)
+            capacity: Number of readings kept
+            callback: Optional callback(timestamp, mass, stable) called on the reader thread
+        """
+        if isinstance(balance_ser, (str, int)):
+            balance_ser = serial.serial_for_url(serial_port_name(balance_ser), 9600, timeout=0.2,
+                                                parity=serial.PARITY_NONE, stopbits=serial.STOPBITS_ONE,
+                                                bytesize=serial.EIGHTBITS)
+        self.ser = balance_ser
+        self.capacity = int(capacity)
+        self.callback = callback
+        self._times = np.zeros(self.capacity)
+        self._masses = np.zeros(self.capacity)
+        self._stable = np.zeros(self.capacity, dtype=bool)
+        self.count = 0  # Readings written so far; slot = count % capacity
+
+        self.lines = 0
+        self.parse_errors = 0
+        self._buffer = b""
+        self._running = False
+        self.thread = None
+
+    def start(self):
+        """Start the reader thread."""
+        if self.thread is None or not self.thread.is_alive():
+            self._running = True
+            self.thread = threading.Thread(target=self._read_loop, name=f"BalanceReader-{self.ser.port}")
+            self.thread.daemon = True
+            self.thread.start()
+
+    def stop(self):
+        """Stop the reader thread (the port is left open)."""
+        self._running = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+
+    def close(self):
+        """Stop the reader thread and close the port."""
+        self._running = False
+        try:
+            self.ser.cancel_read()  # Wake a read blocked on the port timeout
+        except Exception:
+            pass
+        self.stop()
+        self.ser.close()
+
+    def _read_loop(self):
+        while self._running:
+            try:
+                data = self.ser.read(self.ser.in_waiting or 1)
+            except Exception as e:
+                if self._running:
+                    print(f"Balance read error on {self.ser.port}: {e}")
+                    time.sleep(0.5)
+                continue
+            if data:
+                self._add_data(time.monotonic(), data)
+
+    def _add_data(self, arrival, data):
+        """Split received bytes into lines; a partial last line waits for the next call."""
+        self._buffer += data
+        *lines, self._buffer = self._buffer.replace(b"\r", b"\n").split(b"\n")
+        for line in lines:
+            if line.strip():
+                self._add_line(arrival, line)
+
+    def _add_line(self, arrival, line):
+        self.lines += 1
+        reading = parse_balance_line(line.decode('ascii', errors='ignore'))
+        if reading is None:
+            self.parse_errors += 1
+            return
+        mass, stable = reading
+        slot = self.count % self.capacity
+        self._times[slot] = arrival
+        self._masses[slot] = mass
+        self._stable[slot] = stable
+        self.count += 1  # Publish the slot only after it is complete
+        if self.callback:
+            try:
+                self.callback(arrival, mass, stable)
+            except Exception as e:
+                print(f"Error in balance callback: {e}")
+
+    def latest(self):
+        """
+        Returns:
+            The newest reading as (monotonic arrival time, mass in grams, stable), or None
+        """
+        count = self.count
+        if not count:
+            return None
+        slot = (count - 1) % self.capacity
+        reading = float(self._times[slot]), float(self._masses[slot]), bool(self._stable[slot])
+        if self.count + 1 - self.capacity > count - 1:
+            return self.latest()  # The slot was overwritten while it was read, take the newer one
+        return reading
+
+    def since(self, position):
+        """
+        Get the readings that arrived after a previous call.
+
+        Args:
+            position: Counter returned by the previous call (0 for everything still kept)
+
+        Returns:
+            Tuple of (new position, times, masses, stable) with copies of the new readings,
+            oldest first; readings that were already overwritten are skipped
+        """
+        count = self.count
+        first = max(position, count - self.capacity)
+        slots = np.arange(first, count) % self.capacity
+        times, masses, stable = self._times[slots], self._masses[slots], self._stable[slots]
+        # The reader may have wrapped the ring during the copy; drop the slots it overwrote
+        # (it writes slot count % capacity before publishing count + 1, hence the + 1)
+        overwritten = self.count + 1 - self.capacity - first
+        if overwritten > 0:
+            times, masses, stable = times[overwritten:], masses[overwritten:], stable[overwritten:]
+        return count, times, masses, stable
+
+
+class ModbusEndpoint:
+    """
+    Reconnect backoff and request counters of one PLC endpoint.
+
+    Shared by ModbusConnection and the asyncio AsyncModbusConnection, so both back
+    off the same way while the PLC is down and report the same stats().
+    """
+    def __init__(self, host, port=502, backoff_initial=0.5, backoff_max=10.0):
+        """
+        Args:
+            host: PLC host address
+            port: PLC port (default: 502)
+            backoff_initial: First reconnect delay in seconds after a failure
+            backoff_max: Upper limit for the reconnect delay in seconds
+        """
+        self.host = host
+        self.port = port
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self._backoff = 0.0
+        self._next_attempt = 0.0
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.host}:{self.port})"
+
+    def _check_backoff(self, force=False):
+        """Raise ConnectionError while a reconnect is not allowed yet (unless force is set)."""
+        wait = self._next_attempt - time.monotonic()
+        if not force and wait > 0:
+            raise ConnectionError(f"{self}: reconnecting in {wait:.1f} s")
+
+    def _connect_result(self, connected):
+        """Reset the backoff after a successful connect, otherwise schedule the next attempt."""
+        if connected:
+            self._backoff = 0.0
+            with self._stats_lock:
+                self._connects += 1
+            return
+        self._schedule_retry()
+        raise ConnectionError(f"{self}: connection failed, retrying in {self._backoff:.1f} s")
 
-    def set_speed(self, channel: int, speed: float) -> str:
+    def _schedule_retry(self):
+        """Double the reconnect delay, starting at backoff_initial."""
+        self._backoff = min(self.backoff_max, max(self.backoff_initial, 2 * self._backoff))
+        self._next_attempt = time.monotonic() + self._backoff
+
+    def _record(self, latency=None, error=False):
+        """Count one request; latency is None for a request that raised."""
+        with self._stats_lock:
+            if latency is not None:
+                self._requests += 1
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+                self._latencies.append(latency)
+            if error:
+                self._errors += 1
+
+    def stats(self):
+        """
+        Get latency and throughput counters since the last reset.
+
+        Returns:
+            Dictionary with requests, errors, connects, requests_per_s and
+            mean, p50, p95, p99 and max latency in seconds (recent 1000 requests
+            for the percentiles)
+        """
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            elapsed = time.perf_counter() - self._stats_start
+            return {
+                'requests': self._requests,
+                'errors': self._errors,
+                'connects': self._connects,
+                'requests_per_s': self._requests / elapsed if elapsed > 0 else 0.0,
+                'mean_latency': self._latency_total / self._requests if self._requests else 0.0,
+                'p50_latency': latencies[int(0.50 * (len(latencies) - 1))] if latencies else 0.0,
+                'p95_latency': latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+                'p99_latency': latencies[int(0.99 * (len(latencies) - 1))] if latencies else 0.0,
+                'max_latency': self._latency_max,
+            }
+
+    def reset_stats(self):
+        """Reset the counters reported by stats()."""
+        with self._stats_lock:
+            self._stats_start = time.perf_counter()
+            self._requests = 0
+            self._errors = 0
+            self._connects = 0
+            self._latency_total = 0.0
+            self._latency_max = 0.0
+            self._latencies = collections.deque(maxlen=1000)
+
+
+class ModbusConnection(ModbusEndpoint):
+    """
+    One shared Modbus TCP connection to a PLC endpoint.
+
+    Every PLC wrapper talking to the same host and port uses the same
+    ModbusConnection, obtained through ModbusConnectionManager.get(). Requests
+    are serialized with a lock, so concurrent reader and writer threads never
+    interleave frames on the socket. A failed request drops the socket and the
+    next request reconnects, backing off exponentially while the PLC is down.
+    """
+    def __init__(self, host, port=502, backoff_initial=0.5, backoff_max=10.0):
+        """
+        Args:
+            host: PLC host address
+            port: PLC port (default: 502)
+            backoff_initial: First reconnect delay in seconds after a failure
+            backoff_max: Upper limit for the reconnect delay in seconds
+        """
+        super().__init__(host, port, backoff_initial, backoff_max)
+        self.client = ModbusTcpClient(host=host, port=port)
+        self.lock = threading.Lock()
+        self._users = 0
+        self._write_queue = None
+
+    def acquire(self):
+        """Register a user of the connection and open the socket if needed."""
         with self.lock:
-            self.sp.write(f"{channel}M\r".encode())
-            speed_int = int(speed * 1000)
-            speed_string = f"{speed_int:04d}-3"
-            command = f"{channel}f{speed_string}\r"
-            self.sp.write(command.encode())
-            sleep(0.1)
-            return self.sp.read(self.sp.in_waiting).decode(errors='ignore')
-
-    def get_speed(self, channel):
+            self._users += 1
+            try:
+                self._ensure_connected(force=True)
+            except ConnectionError as e:
+                # Requests will keep retrying with backoff
+                print(e)
+
+    def release(self):
+        """Unregister a user; the socket is closed when the last user is gone."""
         with self.lock:
-            self.sp.reset_input_buffer()
-            self.sp.write(f"{channel}f\r".encode())
-            sleep(0.1)
-            raw_response = self.sp.read(self.sp.in_waiting).decode(errors='ignore').strip()
-            lines = [line.strip() for line in raw_response.splitlines() if line.strip()]
+            self._users = max(0, self._users - 1)
+            if self._users == 0:
+                self.client.close()
 
-            for line in reversed(lines):
-                try:
-                    value = float(line)
-                    if value > 100:
-                        value = value / 1000.0
-                    return round(value, 2)
-                except ValueError:
-                    continue
+    def _ensure_connected(self, force=False):
+        """Connect if the socket is down, honouring the reconnect backoff. Lock must be held."""
+        if self.client.connected:
+            return
+        self._check_backoff(force)
+        self._connect_result(self.client.connect())
 
-            raise ValueError("No response from pump")
+    def execute(self, method, *args, **kwargs):
+        """
+        Run one request on the shared client.
 
-    def set_mode(self, channel, mode):
-        if mode == 0:
-            command = f"{channel}L\r".encode()  # RPM mode
-        elif mode == 1:
-            command = f"{channel}M\r".encode()  # Flow rate mode
+        Args:
+            method: Name of the ModbusTcpClient method, e.g. 'read_holding_registers'
+            *args, **kwargs: Arguments for that method
+
+        Returns:
+            The pymodbus response
+        """
+        with self.lock:
+            start = time.perf_counter()
+            try:
+                self._ensure_connected()
+                result = getattr(self.client, method)(*args, **kwargs)
+            except ConnectionError:
+                self._record(error=True)
+                raise
+            except (ConnectionException, ModbusIOException, OSError):
+                # Drop the socket, it may hold half a frame; the next request reconnects
+                self._record(error=True)
+                self.client.close()
+                self._schedule_retry()
+                raise
+            self._record(time.perf_counter() - start, result.isError())
+            return result
+
+    def write_queue(self):
+        """Get the coalescing PLCWriteQueue of this endpoint, starting it on first use."""
+        with self.lock:
+            if self._write_queue is None:
+                self._write_queue = PLCWriteQueue(self)
+            return self._write_queue
+
+    # Thin proxies so PLC subclasses can keep calling self.client.<request>(...)
+    def read_holding_registers(self, address, count=1, **kwargs):
+        return self.execute('read_holding_registers', address, count=count, **kwargs)
+
+    def read_coils(self, address, count=1, **kwargs):
+        return self.execute('read_coils', address, count=count, **kwargs)
+
+    def write_coil(self, address, value, **kwargs):
+        return self.execute('write_coil', address, value, **kwargs)
+
+    def write_coils(self, address, values, **kwargs):
+        return self.execute('write_coils', address, values, **kwargs)
+
+    def write_register(self, address, value, **kwargs):
+        return self.execute('write_register', address, value, **kwargs)
+
+    def write_registers(self, address, values, **kwargs):
+        return self.execute('write_registers', address, values, **kwargs)
+
+
+class ModbusConnectionManager:
+    """Registry handing out one ModbusConnection per PLC endpoint."""
+    _connections = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, host, port=None):
+        """Get the shared connection for host:port, creating it on first use."""
+        port = port or 502
+        with cls._lock:
+            if (host, port) not in cls._connections:
+                cls._connections[(host, port)] = ModbusConnection(host, port)
+            return cls._connections[(host, port)]
+
+    @classmethod
+    def stats(cls):
+        """Get the stats() of every endpoint, keyed by 'host:port'."""
+        with cls._lock:
+            connections = list(cls._connections.values())
+        return {f"{c.host}:{c.port}": c.stats() for c in connections}
+
+
+class PLCWriteQueue:
+    """
+    Background write queue for one PLC endpoint.
+
+    Writes return immediately with a Future and are sent in the order they were
+    submitted. Consecutive writes of the same kind (coils or floats) form a run:
+    until the worker picks a run up, a newer write to the same coil or float
+    register in it replaces the older one (last write wins), and adjacent coils
+    or floats of the run are sent as one write_coils/write_registers request.
+    A write of the other kind starts a new run, so e.g. "set point, then enable
+    coil" always reaches the PLC in that order.
+    """
+    MAX_COILS = 1968  # Modbus limit for write_coils
+    MAX_REGISTERS = 122  # write_registers allows 123 registers, keep floats whole
+
+    def __init__(self, connection):
+        """
+        Args:
+            connection: ModbusConnection the writes are sent on
+        """
+        self.connection = connection
+        self._cond = threading.Condition()
+        self._runs = []  # [kind, {address: [value, [(future, submitted), ...]]}] in submission order
+        self._busy = False
+
+        self.thread = threading.Thread(target=self._worker, name=f"PLCWriteQueue-{connection.host}")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _submit(self, kind, address, value):
+        future = Future()
+        with self._cond:
+            if self._runs and self._runs[-1][0] == kind:
+                pending = self._runs[-1][1]
+            else:
+                pending = {}
+                self._runs.append([kind, pending])
+            entry = pending.get(address)
+            if entry is None:
+                pending[address] = [value, [(future, time.perf_counter())]]
+            else:
+                entry[0] = value
+                entry[1].append((future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def write_coil(self, address, value):
+        """
+        Queue a coil write.
+
+        Returns:
+            Future resolved with the completion latency in seconds
+        """
+        return self._submit('coil', int(address), bool(value))
+
+    def write_float(self, reg1, value):
+        """
+        Queue a 32-bit float write to reg1 and reg1 + 1.
+
+        Returns:
+            Future resolved with the completion latency in seconds
+        """
+        return self._submit('float', int(reg1), float(value))
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._runs or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    @staticmethod
+    def _adjacent(pending, width, max_count):
+        """Split pending writes into runs of adjacent addresses."""
+        runs = []
+        for address in sorted(pending):
+            run = runs[-1] if runs else None
+            if run and address == run[-1] + width and (len(run) + 1) * width <= max_count:
+                run.append(address)
+            else:
+                runs.append([address])
+        return runs
+
+    def _batches(self, kind, pending):
+        """Requests for one run: (method, first address, payload, addresses)."""
+        batches = []
+        if kind == 'coil':
+            for run in self._adjacent(pending, 1, self.MAX_COILS):
+                values = [pending[a][0] for a in run]
+                if len(run) == 1:
+                    batches.append(('write_coil', run[0], values[0], run))
+                else:
+                    batches.append(('write_coils', run[0], values, run))
         else:
-            command = f"{channel}G\r".encode()  # Volume (over time) mode
-        self.sp.write(command)
-        sleep(0.1)
-        print(self.sp.read(self.sp.in_waiting).decode())
+            for run in self._adjacent(pending, 2, self.MAX_REGISTERS):
+                batches.append(('write_registers', run[0], encode_floats([pending[a][0] for a in run]), run))
+        return batches
+
+    def _send(self, kind, pending):
+        """Send one run and resolve its futures."""
+        try:
+            batches = self._batches(kind, pending)
+        except Exception as e:
+            print(f"Exception preparing {kind} writes: {e}")
+            batches = [(None, None, e, list(pending))]
+
+        for method, address, payload, run in batches:
+            if method is None:
+                error = payload
+            else:
+                try:
+                    result = self.connection.execute(method, address, payload)
+                    error = IOError(result) if result.isError() else None
+                except Exception as e:
+                    error = e
+                if error is not None:
+                    print(f"Exception in {method} at {address}: {error}")
+
+            done = time.perf_counter()
+            for a in run:
+                for future, submitted in pending[a][1]:
+                    if future.done():
+                        continue
+                    if error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(done - submitted)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._runs:
+                    self._cond.wait()
+                runs, self._runs = self._runs, []
+                self._busy = True
+
+            try:
+                for kind, pending in runs:
+                    self._send(kind, pending)
+            except Exception as e:
+                print(f"Error in PLC write queue for {self.connection.host}: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
 
-    def get_mode(self, channel):
-        command = f"{channel}xM\r".encode()
-        self.sp.write(command)
-        sleep(0.1)
-        return self.sp.read(self.sp.in_waiting).decode()
 
 class PLC:
     def __init__(self, host_num, port_num=None) -> None:
-        if port_num:
-            self.client = ModbusTcpClient(host=host_num, port=port_num)
-        else:
-            self.client = ModbusTcpClient(host=host_num)
+        # All wrappers for the same endpoint share one connection
+        self.client = ModbusConnectionManager.get(host_num, port_num)
         self.reading = False
         self.data = None
+        self._connected = False
 
     def connect(self):
-        self.client.connect()
+        if not self._connected:
+            self._connected = True
+            self.client.acquire()
         print("Connected")
 
     def disconnect(self):
-        self.client.close()
+        if self._connected:
+            self._connected = False
+            self.client.release()
         print("Disconnected")
 
 
+def plan_scan_groups(registers, width=2, max_gap=10, max_count=125):
+    """
+    Merge register addresses into as few contiguous block reads as possible.
+
+    Two values are read in the same block if the hole between them is at most
+    max_gap registers and the block stays within the Modbus limit of 125
+    registers per read.
+
+    Args:
+        registers: First register of each value
+        width: Registers per value (2 for a 32-bit float)
+        max_gap: Largest run of unused registers worth reading to save a request
+        max_count: Maximum registers per request
+
+    Returns:
+        List of (start, count) tuples sorted by start register
+    """
+    groups = []
+    for reg in sorted(set(int(r) for r in registers)):
+        end = reg + width
+        if groups:
+            start, count = groups[-1]
+            if reg - (start + count) <= max_gap and end - start <= max_count:
+                groups[-1] = (start, max(count, end - start))
+                continue
+        groups.append((reg, width))
+    return groups
+
+
+def decode_floats(words, index, word_order='little'):
+    """
+    Decode 32-bit floats from a register array in one vectorized pass.
+
+    Args:
+        words: numpy uint16 array of register values
+        index: numpy array with the position of the first register of each float
+        word_order: 'little' if the first register holds the low word, 'big' otherwise
+
+    Returns:
+        numpy float32 array with one value per index
+    """
+    pairs = np.stack((words[index], words[index + 1]), axis=1)
+    if word_order == 'big':
+        pairs = pairs[:, ::-1]
+    return np.frombuffer(np.ascontiguousarray(pairs, dtype='<u2').tobytes(), dtype='<f4')
+
+
+_float_structs = {}  # number of floats -> (big-endian float Struct, big-endian word Struct)
+
+
+def encode_floats(values, word_order='little'):
+    """
+    Encode 32-bit floats into register values, the inverse of decode_floats.
+
+    Uses cached precompiled structs; 'little' word order matches the
+    BinaryPayloadBuilder(byteorder=BIG, wordorder=LITTLE) payloads the PLC expects.
+
+    Args:
+        values: Sequence of floats
+        word_order: 'little' to put the low word first, 'big' for the high word first
+
+    Returns:
+        List with two register values per float
+    """
+    n = len(values)
+    structs = _float_structs.get(n)
+    if structs is None:
+        structs = _float_structs[n] = (struct.Struct(f'>{n}f'), struct.Struct(f'>{2 * n}H'))
+    words = list(structs[1].unpack(structs[0].pack(*values)))  # high word, low word per float
+    if word_order == 'little':
+        words[0::2], words[1::2] = words[1::2], words[0::2]
+    return words
+
+
+class ScanPlan:
+    """
+    Block-read layout for a set of 32-bit float registers.
+
+    The scan groups are read back to back into one words buffer; index holds the
+    position of each float in that buffer and group_of the group it came from.
+    """
+    def __init__(self, registers, max_gap=10):
+        """
+        Args:
+            registers: First register of each float
+            max_gap: Largest hole of unused registers read to save a request
+        """
+        self.registers = sorted(registers)
+        self.groups = plan_scan_groups(self.registers, 2, max_gap)
+
+        self.offsets = []
+        offset = 0
+        for start, count in self.groups:
+            self.offsets.append(offset)
+            offset += count
+        self.words = np.zeros(offset, dtype=np.uint16)
+
+        self.index = np.empty(len(self.registers), dtype=np.intp)
+        self.group_of = np.empty(len(self.registers), dtype=np.intp)
+        for i, reg in enumerate(self.registers):
+            for g, (start, count) in enumerate(self.groups):
+                if start <= reg < start + count:
+                    self.index[i] = self.offsets[g] + reg - start
+                    self.group_of[i] = g
+                    break
+
+    def store(self, group, registers):
+        """Copy the registers returned for one group into the words buffer."""
+        offset = self.offsets[group]
+        self.words[offset:offset + self.groups[group][1]] = registers
+
+    def decode(self, word_order='little'):
+        """Decode all floats, rounded to 4 decimals like read_float."""
+        return np.round(decode_floats(self.words, self.index, word_order).astype(float), 4)
+
+
+class Deadband:
+    """
+    Report-by-exception filter for one polled value.
+
+    A reading is reported if it is the first one, if it moved away from the last
+    reported value by more than the deadband, or if nothing has been reported for
+    heartbeat seconds. The deadband is the larger of the absolute band and
+    percent of the last reported value; with both at 0 any change is reported.
+    """
+    def __init__(self, absolute=0.0, percent=0.0, heartbeat=None):
+        """
+        Args:
+            absolute: Absolute deadband in engineering units
+            percent: Deadband in percent of the last reported value
+            heartbeat: Maximum silence in seconds, None to never force a report
+        """
+        self.absolute = absolute
+        self.percent = percent
+        self.heartbeat = heartbeat
+        self.last_value = None
+        self.last_report = None
+
+    def check(self, value, now=None):
+        """
+        Decide whether a reading should be passed on, remembering it if so.
+
+        Returns:
+            True if the reading should be reported
+        """
+        if now is None:
+            now = time.monotonic()
+
+        if self.last_value is None:
+            report = True
+        else:
+            change = abs(value - self.last_value)
+            band = max(self.absolute, abs(self.last_value) * self.percent / 100.0)
+            report = change > band if band > 0 else change != 0
+            if not report and self.heartbeat is not None:
+                report = now - self.last_report >= self.heartbeat
+
+        if report:
+            self.last_value = value
+            self.last_report = now
+        return report
+
+    def reset(self):
+        """Forget the last report so the next reading is always passed on."""
+        self.last_value = None
+        self.last_report = None
+
+
+class DeadbandSet:
+    """Per-register Deadband filters with a shared default configuration."""
+    def __init__(self):
+        self.default = None  # (absolute, percent, heartbeat) or None to report every reading
+        self.config = {}  # register -> (absolute, percent, heartbeat)
+        self.filters = {}  # register -> Deadband
+
+    def configure(self, reg, absolute=0.0, percent=0.0, heartbeat=None):
+        """Set the deadband of one register."""
+        self.config[reg] = (absolute, percent, heartbeat)
+        self.filters.pop(reg, None)
+
+    def set_default(self, absolute=0.0, percent=0.0, heartbeat=None):
+        """Set the deadband of registers without their own configuration."""
+        self.default = (absolute, percent, heartbeat)
+        self.filters = {reg: f for reg, f in self.filters.items() if reg in self.config}
+
+    def check(self, reg, value, now=None):
+        """Return True if the reading of reg should be reported."""
+        f = self.filters.get(reg)
+        if f is None:
+            config = self.config.get(reg, self.default)
+            if config is None:
+                return True
+            f = self.filters[reg] = Deadband(*config)
+        return f.check(value, now)
+
+    def reset(self):
+        """Report the next reading of every register."""
+        for f in self.filters.values():
+            f.reset()
+
+
 # Modified ReadFloatsPLC class to support callbacks
 class ReadFloatsPLC(PLC):
-    def __init__(self, host_num, port_num=None) -> None:
+    def __init__(self, host_num, port_num=None, word_order='little') -> None:
+        """
+        Args:
+            host_num: PLC host address
+            port_num: PLC port (default: Modbus 502)
+            word_order: 'little' if the first register holds the low word of a float
+                        (the PLC default), 'big' if it holds the high word
+        """
         super().__init__(host_num, port_num)
         self.reading = False
         self.data = None
+        self.word_order = word_order
+        self.deadbands = DeadbandSet()  # Report-by-exception filters, default: report every reading
 
     def reading_onoff(self, boolean):
         self.reading = boolean
+        if boolean:
+            self.deadbands.reset()  # Fresh connection, show the current values right away
 
-    def read_float(self, label_or_callback, reg1, reg2=None):
+    def set_deadband(self, reg, absolute=0.0, percent=0.0, heartbeat=None):
+        """
+        Only report a register's value when it changes by more than a deadband.
+
+        Args:
+            reg: First register of the value
+            absolute: Absolute deadband in engineering units
+            percent: Deadband in percent of the last reported value
+            heartbeat: Report at least every heartbeat seconds even without change
+        """
+        self.deadbands.configure(reg, absolute, percent, heartbeat)
+
+    def set_default_deadband(self, absolute=0.0, percent=0.0, heartbeat=None):
+        """Deadband for all registers without their own set_deadband configuration."""
+        self.deadbands.set_default(absolute, percent, heartbeat)
+
+    def read_float(self, label_or_callback, reg1, reg2=None, interval=0.5):
         """
         Inputs in two registers. The second register is optional.
 
@@ -162,34 +1354,86 @@ class ReadFloatsPLC(PLC):
                 # Round the value to 3 decimal places
                 current_value = round(current_value, 4)
 
-                # Update the label or call the callback
-                if callable(label_or_callback):
-                    # It's a callback function
-                    label_or_callback(current_value)
-                else:
-                    # It's a label widget (for backward compatibility)
-                    label_or_callback.config(text=str(current_value))
+                # Update the label or call the callback, unless the value stayed within its deadband
+                if self.deadbands.check(reg1, current_value):
+                    if callable(label_or_callback):
+                        # It's a callback function
+                        label_or_callback(current_value)
+                    else:
+                        # It's a label widget (for backward compatibility)
+                        label_or_callback.config(text=str(current_value))
 
             except Exception as e:
                 print(f"Error reading float: {e}")
                 
-            sleep(0.5)
+            sleep(interval)
+
+    def decode_floats(self, words, index):
+        """Decode 32-bit floats with this PLC's word order, see decode_floats()."""
+        return decode_floats(words, index, self.word_order)
+
+    def read_floats(self, labels_or_callbacks, interval=0.5, max_gap=10):
+        """
+        Continuously read many 32-bit floats using block reads of adjacent registers.
+
+        The registers are merged into scan groups with plan_scan_groups, so e.g.
+        three floats at 28710/28712/28714 cost one 6-register request per scan
+        instead of six single-register requests.
+
+        Args:
+            labels_or_callbacks: Dictionary mapping the first register of each float to
+                                 a tk.Label or a callback, as in read_float
+            interval: Time between scans in seconds (default: 0.5)
+            max_gap: Largest hole of unused registers read to save a request
+        """
+        plan = ScanPlan(labels_or_callbacks, max_gap)
+
+        while self.reading:
+            group_ok = np.ones(len(plan.groups), dtype=bool)
+            for g, (start, count) in enumerate(plan.groups):
+                try:
+                    result = self.client.read_holding_registers(start, count=count)
+                    if result.isError():
+                        raise IOError(result)
+                    plan.store(g, result.registers)
+                except Exception as e:
+                    group_ok[g] = False
+                    print(f"Error reading registers {start}-{start + count - 1}: {e}")
+
+            values = plan.decode(self.word_order)
+            now = time.monotonic()
+
+            for reg, value, ok in zip(plan.registers, values.tolist(), group_ok[plan.group_of]):
+                if not ok or not self.deadbands.check(reg, value, now):
+                    continue
+                label_or_callback = labels_or_callbacks[reg]
+                try:
+                    if callable(label_or_callback):
+                        label_or_callback(value)
+                    else:
+                        label_or_callback.config(text=str(value))
+                except Exception as e:
+                    print(f"Error reading float: {e}")
+
+            sleep(interval)
 
 class OneBitClass(PLC):
     def write_onoff(self, address_num, boolean):
-        self.client.write_coil(address=int(address_num), value=boolean)
+        """
+        Queue a coil write; adjacent coils queued together go out as one write_coils.
+
+        Returns:
+            Future resolved with the completion latency in seconds
+        """
+        return self.client.write_queue().write_coil(address_num, boolean)
 
 
 class WriteFloatsPLC(PLC):
     def write_float(self, reg1, value): # reg2 is automatically reg1 + 1 in the code
-        try:
-            builder = BinaryPayloadBuilder(byteorder=Endian.BIG, wordorder=Endian.LITTLE)
-            builder.add_32bit_float(value)
-            payload = builder.to_registers()  # Converts to register values instead of raw bytes
-
-            print(f"Writing value: {value} to registers {reg1}, {reg1+1}")
-
-            result = self.client.write_registers(reg1, payload)
+        """
+        Queue a float write without blocking; a newer value for reg1 replaces a queued one.
 
-        except Exception as e:
-            print(f"Exception in write_float: {e}")
\ No newline at end of file
+        Returns:
+            Future resolved with the completion latency in seconds
+        """
+        return self.client.write_queue().write_float(reg1, value)
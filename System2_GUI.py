@@ -2,9 +2,11 @@ import tkinter as tk
 import threading
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from System2_Equipment import Pump, ReadFloatsPLC, OneBitClass, WriteFloatsPLC
-from System2_utils import Graph, DataCollector
-from pid_control import PIDControl
+from System2_Equipment import Pump, PumpSpeedPoller, ReadFloatsPLC, OneBitClass, WriteFloatsPLC, serial_port_name
+from System2_utils import Graph, Series, DataCollector, RenderScheduler
+from pid_control import PIDExecutor
+import data_export
+from session_recorder import SessionRecorder, latest_session, load_session
 import serial
 import time
 import sys
@@ -38,6 +40,14 @@ addresses = {
     'Drums': [16387]
 }
 
+# Report-by-exception settings for polled PLC values: a reading only updates the label,
+# log and data buffer when it moves by more than the absolute or percent deadband,
+# or when heartbeat seconds have passed since the last update
+deadbands = {
+    'Temperatures': {'absolute': 0.05, 'percent': 0.0, 'heartbeat': 5.0},
+    'Pressure Transmitters': {'absolute': 0.01, 'percent': 0.0, 'heartbeat': 5.0},
+}
+
 class System2:
     def __init__(self):
         self.root = tk.Tk()
@@ -110,9 +120,8 @@ class System2:
         self.pump_plot_on = False
         self.create_pump_ui()
         self.create_pid_control_ui()
-        self.pump_polling_threads = {}
-        self.stop_polling_flags = {}
-        self.pid_controllers = {}
+        self.pump_pollers = {}  # Pump object -> PumpSpeedPoller
+        self.pid_controllers = {}  # Channel name -> balance port of its loop in pid_executor
 
         # Maps equipment type to a dictionary that maps a specific equipment to either the current_label
         # for temp and pressure transmitters, or the current value variable for pressure regulator and stirrer
@@ -178,9 +187,18 @@ class System2:
         tk.Label(control_buttons_frame, text="seconds").grid(row=0, column=2, padx=5)
         tk.Button(control_buttons_frame, text="Set", command=self.set_time_window).grid(row=0, column=3, padx=5)
 
-        # Export data button
-        tk.Button(control_buttons_frame, text="Export Data", command=self.export_graph_data).grid(row=0, column=4,
-                                                                                                  padx=20)
+        # Export data button and file format
+        export_frame = tk.Frame(control_buttons_frame)
+        export_frame.grid(row=0, column=4, padx=20)
+        self.export_button = tk.Button(export_frame, text="Export Data", command=self.export_graph_data)
+        self.export_button.pack(side="left")
+        self.export_format_var = tk.StringVar(value="xlsx")
+        # Formats whose optional backend (pyarrow, h5py) is not installed are left out
+        tk.OptionMenu(export_frame, self.export_format_var, *data_export.available_writers()).pack(side="left", padx=2)
+
+        # Reload the previous session's recording
+        tk.Button(control_buttons_frame, text="Load Last Session", command=self.load_last_session).grid(row=0, column=8,
+                                                                                                        padx=5)
 
         # Clear data button
         tk.Button(control_buttons_frame, text="Clear All Data", command=self.clear_graph_data).grid(row=0, column=5,
@@ -192,6 +210,16 @@ class System2:
                                       command=self.toggle_graphing)
         self.graph_button.grid(row=0, column=6, padx=20)
 
+        # Autoscale the y-axes to the 1st-99th percentile of the window instead of the full range
+        self.clip_outliers_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(control_buttons_frame, text="Clip outliers", variable=self.clip_outliers_var,
+                       command=self.set_autoscale_mode).grid(row=0, column=7, padx=5)
+
+        # Frame counters of the render scheduler
+        self.render_status_var = tk.StringVar(value="")
+        tk.Label(graph_control_frame, textvariable=self.render_status_var, fg="gray30",
+                 font=("Arial", 9)).pack(anchor="w")
+
         # Create a frame for the graphs
         graph_frame = tk.Frame(parent_frame)
         graph_frame.pack(fill="both", expand=True, pady=5)
@@ -204,6 +232,8 @@ class System2:
         canvas = FigureCanvasTkAgg(fig, master=graph_frame)
         canvas.get_tk_widget().pack(fill="both", expand=True)
         self.canvas = canvas
+        self.fig = fig
+        self.render_scheduler = None
 
         # Initialize dictionaries for graph data
         self.init_graph_data()
@@ -224,17 +254,23 @@ class System2:
     def init_graph_data(self):
         """Initialize dictionaries for the graph data with channel-specific entries"""
         # For each data type, create a dictionary to store the series
-        # Format: {series_name: [global_switch(bool), active_status(bool), data_points(list)]}
+        # Format: {series_name: [global_switch(bool), active_status(bool), data_points(Series)]}
+        # Raw samples for 10 h at 1 Hz, then 10 s min/mean/max aggregates for 12 h and 1 min ones for 48 h
+        max_points = 36000
+        history_tiers = ((10, 4320), (60, 2880))
+        self.export_note = (f"The last {max_points} samples of each series are exported at full resolution, "
+                            "older history as " + " and ".join(f"{interval} s" for interval, size in history_tiers)
+                            + " means.")
 
         # Temperature data
         self.temperatures_dict = {}
         for name in self.temperatures_list:
-            self.temperatures_dict[name] = [True, True, []]
+            self.temperatures_dict[name] = [True, True, Series(max_points, history_tiers)]
 
         # Pressure data
         self.pressures_dict = {}
         for name in self.pressure_transmitters_list:
-            self.pressures_dict[name] = [True, True, []]
+            self.pressures_dict[name] = [True, True, Series(max_points, history_tiers)]
 
         # Balance data - for PID control
         self.balances_dict = {}
@@ -242,14 +278,14 @@ class System2:
         for pump_name in self.pumps_list:
             for channel in range(1, 5):  # 4 channels per pump
                 channel_name = f"{pump_name}_Ch{channel}"
-                self.balances_dict[channel_name] = [True, True, []]
+                self.balances_dict[channel_name] = [True, True, Series(max_points, history_tiers)]
 
         # Flow rate data - per channel
         self.flow_rates_dict = {}
         for pump_name in self.pumps_list:
             for channel in range(1, 5):  # 4 channels per pump
                 channel_name = f"{pump_name}_Ch{channel}"
-                self.flow_rates_dict[channel_name] = [True, True, []]
+                self.flow_rates_dict[channel_name] = [True, True, Series(max_points, history_tiers)]
 
         # Create the graph object
         self.graph = Graph(
@@ -257,10 +293,15 @@ class System2:
             self.pressures_dict,
             self.balances_dict,
             self.flow_rates_dict,
-            max_points=1000,  # Store up to 1000 data points per series
-            update_interval=0.5  # Update every 0.5 seconds
+            max_points=max_points,
+            update_interval=0.1,  # Update every 0.1 seconds
+            render_mode='blit'  # Persistent artists, only changed plots are redrawn
         )
 
+        # All PID loops run in one executor thread; loops are added and removed by the PID buttons
+        self.pid_executor = PIDExecutor(self.graph, rate=2.0)
+        self.pid_executor.start()
+
     def create_data_selector_tabs(self, parent_frame):
         """Create tabs for selecting which data series to display"""
         # Create notebook for tabs
@@ -422,10 +463,11 @@ class System2:
             if data_dict[series_name][1] != is_visible:
                 # When turning off, add a discontinuity marker
                 if not is_visible:
-                    data_dict[series_name][2].append((None, None))
+                    data_dict[series_name][2].append_gap()
 
                 # Update the visibility state
                 data_dict[series_name][1] = is_visible
+                self.graph.mark_dirty(data_type, series_name)
 
     def toggle_all_series(self, data_type, visible):
         """
@@ -448,20 +490,26 @@ class System2:
             # Update the data visibility directly
             if data_dict[name][1] != visible and not visible:
                 # Add discontinuity marker if hiding
-                data_dict[name][2].append((None, None))
+                data_dict[name][2].append_gap()
 
             # Set visibility
             data_dict[name][1] = visible
 
+        self.graph.mark_dirty(data_type)
+
     def start_graph(self):
-        """Start the graph plotting thread"""
-        self.graph_thread = threading.Thread(
-            target=self.graph.plot,
-            args=(self.plot_axes, self.canvas, plt.gcf())
-        )
+        """Start the graph data snapshot thread and the render scheduler on the Tk main loop"""
+        self.graph_thread = threading.Thread(target=self.graph.snapshot_loop)
         self.graph_thread.daemon = True
         self.graph_thread.start()
 
+        # Drawing happens on the Tk thread only, at the graph update rate
+        if self.render_scheduler is None:
+            self.render_scheduler = RenderScheduler(self.root, self.graph, self.plot_axes, self.canvas, self.fig,
+                                                    fps=1.0 / self.graph.update_interval,
+                                                    status_var=self.render_status_var)
+            self.render_scheduler.start()
+
     def toggle_graphing(self):
         """Toggle the graph plotting on/off"""
         self.graph_running = not self.graph_running
@@ -486,10 +534,29 @@ class System2:
             # Handle invalid input
             self.time_window_var.set("120")  # Reset to default
 
+    def set_autoscale_mode(self):
+        """Switch the graph y-axis autoscaling between min/max and percentile clipping"""
+        self.graph.set_autoscale('percentile' if self.clip_outliers_var.get() else 'minmax')
+
     def export_graph_data(self):
-        """Export graph data to excel"""
-        filename = self.graph.export_data()
-        tk.messagebox.showinfo("Data Exported", f"Data exported to {filename}")
+        """Export graph data in the selected format in a background thread, with the progress on the button"""
+        self.export_button.config(state="disabled", text="Exporting...")
+
+        def progress(fraction):
+            self.root.after(0, lambda: self.export_button.config(text=f"Exporting {100 * fraction:.0f}%"))
+
+        def done(filename, error):
+            self.root.after(0, lambda: self.export_finished(filename, error))
+
+        self.graph.export_data_in_background(progress=progress, done=done, fmt=self.export_format_var.get())
+
+    def export_finished(self, filenames, error):
+        """Re-enable the export button and report the result of a background export"""
+        self.export_button.config(state="normal", text="Export Data")
+        if error is not None:
+            tk.messagebox.showerror("Export Failed", f"Data export failed: {error}")
+        else:
+            tk.messagebox.showinfo("Data Exported", "Data exported to " + ", ".join(filenames) + "\n\n" + self.export_note)
 
     def clear_graph_data(self):
         """Clear all graph data"""
@@ -498,26 +565,16 @@ class System2:
 
     # pumps
     def start_flow_polling(self, channel_name, pump_ser, channel):
-        if channel_name in self.pump_polling_threads:
-            return
-
-        stop_flag = threading.Event()
-        self.stop_polling_flags[channel_name] = stop_flag
-
-        def poll():
-            while not stop_flag.is_set():
-                try:
-                    value = pump_ser.get_speed(channel)
-                    self.graph.update_dict("flow_rates", channel_name, value)
-                    time.sleep(0.5)
-                except Exception as e:
-                    print(f"Polling error on {channel_name}: {e}")
-                    break
-
-        t = threading.Thread(target=poll)
-        t.daemon = True
-        self.pump_polling_threads[channel_name] = t
-        t.start()
+        """Add a channel to the round-robin speed poller of its pump."""
+        poller = self.pump_pollers.get(pump_ser)
+        if poller is None:
+            poller = PumpSpeedPoller(
+                pump_ser,
+                lambda name, value: self.graph.update_dict("flow_rates", name, value),
+                skip=lambda name: name in self.pid_controllers  # PID loops publish their own flow rate
+            )
+            self.pump_pollers[pump_ser] = poller
+        poller.add_channel(channel, channel_name)
 
     def create_pump_ui(self):
         """Creates UI elements for pumps with the updated PumpControl class structure."""
@@ -594,16 +651,17 @@ class System2:
         if not self.pump_connect_vars[pump_index]:  # If not connected
             if not self.pump_port_vars[pump_index]:
                 address = addresses["Pumps"][pump_index]
-                self.pump_port_vars[pump_index] = tk.IntVar(value=address)
+                self.pump_port_vars[pump_index] = tk.StringVar(value=str(address))
 
             try:
                 # Get the port number from the pump port variable
+                # COM port number, device path or pyserial URL (e.g. a Reglo emulator pty)
                 com_number = str(self.pump_port_vars[pump_index].get())
 
                 # Create pump serial object
                 pump_ser = Pump(com_number)
                 pump_ser.set_independent_channel_control()
-                print(f'Connecting pump {pump_index} on COM{com_number}')
+                print(f'Connecting pump {pump_index} on {pump_ser.COM}')
 
                 # Update connection state
                 self.pump_connect_vars[pump_index] = True
@@ -626,8 +684,16 @@ class System2:
                 # Get the PumpControl object
                 pump_control = self.pump_objects[pump_index]
 
-                # Clean up serial connection
+                # Clean up serial connection and its command scheduler
                 if hasattr(pump_control, 'serial_obj'):
+                    # Its PID loops go first, so the executor stops writing to the closed port
+                    pump_name = self.pumps_list[pump_index]
+                    for channel_id in [c for c in self.pid_controllers if c.split('_Ch')[0] == pump_name]:
+                        self.stop_pid_control(channel_id, resume_polling=False)
+                    poller = self.pump_pollers.pop(pump_control.serial_obj, None)
+                    if poller:
+                        poller.stop()
+                    pump_control.serial_obj.close()
                     delattr(pump_control, 'serial_obj')
 
             except Exception as e:
@@ -699,8 +765,7 @@ class System2:
                 self.pid_setpoint_vars[channel_name].set(flow_rate)
 
             if channel_name in self.pid_controllers:
-                pid = self.pid_controllers[channel_name]
-                pid.pump_controller._set_point = flow_rate
+                self.pid_executor.set_gains(channel_name, set_point=flow_rate)
 
         except ValueError:
             tk.messagebox.showerror("Error", "Please enter a valid flow rate")
@@ -803,6 +868,10 @@ class System2:
         self.pid_data_points_var = tk.IntVar(value=10)
         tk.Entry(control_frame, textvariable=self.pid_data_points_var, width=5).grid(row=0, column=3, padx=5, pady=2)
 
+        # Outlier rejection and refill detection for the flow rate; holds the pump on low confidence
+        self.pid_robust_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(control_frame, text="Robust Flow", variable=self.pid_robust_var).grid(row=0, column=4, padx=5, pady=2)
+
         pid_frame.pack(anchor="nw", padx=15, pady=15)
 
     def toggle_pid_control(self, channel_id):
@@ -828,12 +897,6 @@ class System2:
             tk.messagebox.showerror("Error", f"{pump_name} is not connected. Please connect the pump first.")
             return
 
-        # Stop polling
-        if channel_id in self.stop_polling_flags:
-            self.stop_polling_flags[channel_id].set()
-            del self.stop_polling_flags[channel_id]
-            del self.pump_polling_threads[channel_id]
-
         # Get balance port for this specific channel
         balance_port = self.pid_balance_port_vars[pump_name][channel].get()
         if not balance_port:
@@ -841,15 +904,7 @@ class System2:
             return
 
         try:
-            balance_ser = serial.Serial(
-                f'COM{balance_port}', 9600, timeout=1,
-                parity=serial.PARITY_NONE,
-                stopbits=serial.STOPBITS_ONE,
-                bytesize=serial.EIGHTBITS,
-            )
             pump_control = self.pump_objects[pump_index]
-            pump_ser = pump_control.serial_obj
-            pump_type = "REGLO"
 
             pid_config = {
                 'set_point': self.pid_setpoint_vars[channel_id].get(),
@@ -859,38 +914,29 @@ class System2:
                 'integral_error_limit': self.pid_integral_limit_var.get()
             }
 
-            pid_controller = PIDControl(
-                balance_ser, pump_ser, pump_type, channel_id, self.graph
-            )
-            pid_controller.set_controller_and_matrix(pid_config, self.pid_data_points_var.get())
-
-            if pid_controller.start():
-                self.pid_controllers[channel_id] = pid_controller
-                self.pid_status_vars[channel_id].set("Active")
-                if channel_id in self.pid_buttons:
-                    self.pid_buttons[channel_id].config(text="Stop PID", bg="IndianRed1")
-            else:
-                tk.messagebox.showerror("Error", f"Failed to start PID control for {channel_id}")
-                balance_ser.close()
+            # The executor opens the balance port; channels on the same port share its reader
+            self.pid_executor.add_loop(channel_id, balance_port, pump_control.serial_obj, channel,
+                                       pid_config, self.pid_data_points_var.get(),
+                                       robust=self.pid_robust_var.get())
+            self.pid_controllers[channel_id] = serial_port_name(balance_port)
+            self.pid_status_vars[channel_id].set("Active")
+            if channel_id in self.pid_buttons:
+                self.pid_buttons[channel_id].config(text="Stop PID", bg="IndianRed1")
 
         except Exception as e:
             tk.messagebox.showerror("Error", f"Error starting PID control: {str(e)}")
 
-    def stop_pid_control(self, channel_id):
+    def stop_pid_control(self, channel_id, resume_polling=True):
         if channel_id in self.pid_controllers:
-            pid_controller = self.pid_controllers[channel_id]
-            pid_controller.set_stop(True)
-
-            try:
-                pid_controller.balance_ser.close()
-            except:
-                pass
+            self.pid_executor.remove_loop(channel_id)  # Closes the balance port in the background
 
             self.pid_status_vars[channel_id].set("Inactive")
             if channel_id in self.pid_buttons:
                 self.pid_buttons[channel_id].config(text="Start PID", bg="SystemButtonFace")
 
             del self.pid_controllers[channel_id]
+            if not resume_polling:
+                return
 
             # Resume polling
             parts = channel_id.split('_Ch')
@@ -1103,7 +1149,7 @@ class System2:
 
             # Pump port entry
             address = addresses["Pumps"][i]
-            self.pump_port_var = tk.IntVar(value=address)
+            self.pump_port_var = tk.StringVar(value=str(address))
             if self.pump_port_vars[i]:
                 self.pump_port_var.set(self.pump_port_vars[i].get())
             pump_port_entry = tk.Entry(pump_balance_frame, textvariable=self.pump_port_var)
@@ -1180,16 +1226,50 @@ class System2:
         scrollbar_y.pack(side="right", fill="y")
 
     def setup_synchronized_data_collection(self):
-        """Create and start the synchronized data collector"""
+        """Create and start the synchronized data collector and the session recorder"""
         self.data_collector = DataCollector(self.graph)
+
+        # Every tick and every PID/balance sample is appended to disk as it arrives
+        self.session_recorder = SessionRecorder("sessions")
+        try:
+            self.session_recorder.start()
+            self.data_collector.recorder = self.session_recorder
+            self.graph.recorder = self.session_recorder
+        except OSError as e:
+            print(f"Session recording disabled: {e}")
+            self.session_recorder = None
+
         self.data_collector.start_collection()
 
+    def load_last_session(self):
+        """Reload the previous recorded session into the graphs in a background thread"""
+        current = self.session_recorder.directory if self.session_recorder else None
+        directory = latest_session("sessions", exclude=current)
+        if directory is None:
+            tk.messagebox.showinfo("Load Session", "No recorded session found")
+            return
+
+        def worker():
+            try:
+                loaded = self.graph.load_session(load_session(directory))
+                message = f"Loaded {loaded} samples from {directory}"
+            except Exception as e:
+                message = f"Failed to load {directory}: {e}"
+            self.root.after(0, lambda: tk.messagebox.showinfo("Load Session", message))
+
+        t = threading.Thread(target=worker)
+        t.daemon = True
+        t.start()
+
     def read_float_values(self, plc_object, data_type):
         """
         For PLC equipment that reads float values with synchronized data collection
         data_type is the type of equipment (i.e. Temperatures or Pressure Transmitters)
         """
         print(f"[read_float_values] Starting for type: {data_type}")
+        if data_type in deadbands:
+            plc_object.set_default_deadband(**deadbands[data_type])
+        callbacks = {}  # first register -> callback, read together as one scan group
         for equipment_name in self.equipment_data[data_type]:
             label = self.equipment_data[data_type][equipment_name]
             reg1 = self.register_dictionary[data_type][equipment_name].get()
@@ -1208,12 +1288,12 @@ class System2:
                     print(f"[callback] {equipment_name}: Value received = {value}")
                 return _update
             print(f'Creating Callback for equiptment {equipment_name}')
-            callback = update_value_and_buffer(label, equipment_name, data_type)
+            callbacks[reg1] = update_value_and_buffer(label, equipment_name, data_type)
 
-            # Start the reading thread
-            t = threading.Thread(target=lambda: plc_object.read_float(callback, reg1, reg1 + 1))
-            t.daemon = True
-            t.start()
+        # One reading thread per PLC object, adjacent registers are fetched in block reads
+        t = threading.Thread(target=plc_object.read_floats, args=(callbacks,))
+        t.daemon = True
+        t.start()
 
     def write_float_values(self, equipment_type, equipment_name, value):
         """
@@ -1253,16 +1333,20 @@ class System2:
         if hasattr(self, 'data_collector'):
             self.data_collector.stop_collection()
 
+        if getattr(self, 'session_recorder', None):
+            self.session_recorder.stop()  # Writes the buffered samples and seals the segment
+
         if hasattr(self, 'graph'):
             self.graph.stop_plotting(True)
+
+        if getattr(self, 'render_scheduler', None):
+            self.render_scheduler.stop()
         
-        if hasattr(self, 'pid_controllers'):
-            for pump_name, controller in list(self.pid_controllers.items()):
-                try:
-                    controller.set_stop(True)
-                    controller.stop_thread()
-                except:
-                    pass
+        if getattr(self, 'pid_executor', None):
+            try:
+                self.pid_executor.stop()
+            except:
+                pass
         
         time.sleep(0.2)
 
@@ -1287,4 +1371,5 @@ class System2:
         print(f'Closed {ser.portstr}')
 
 
-gui = System2()
\ No newline at end of file
+if __name__ == "__main__":
+    gui = System2()
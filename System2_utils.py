@@ -1,16 +1,486 @@
 import time
 import matplotlib.pyplot as plt
 import datetime
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
-import datetime
-import os
 import threading
+import collections
+import functools
+import numpy as np
+import data_export
+
+class RingBuffer:
+    """
+    Fixed number of float64 rows in a preallocated NumPy array; the oldest row is overwritten
+    once it is full.
+
+    Every row is written twice, at i and i + capacity, so the rows in order are always one
+    contiguous slice and view() returns them without copying. Not thread-safe on its own.
+    """
+    def __init__(self, capacity, columns):
+        """
+        Args:
+            capacity: Maximum number of rows kept
+            columns: Number of values per row
+        """
+        self.capacity = int(capacity)
+        self._rows = np.zeros((2 * self.capacity, columns))
+        self._start = 0  # Position of the oldest row
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, row):
+        i = (self._start + self._count) % self.capacity
+        self._rows[i] = self._rows[i + self.capacity] = row
+        if self._count < self.capacity:
+            self._count += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def extend(self, rows):
+        """Append many rows at once (only the last capacity rows are kept)."""
+        rows = np.asarray(rows, dtype=float)[-self.capacity:]
+        n = len(rows)
+        if not n:
+            return
+        positions = (self._start + self._count + np.arange(n)) % self.capacity
+        self._rows[positions] = rows
+        self._rows[positions + self.capacity] = rows
+        total = self._count + n
+        if total > self.capacity:
+            self._start = (self._start + total - self.capacity) % self.capacity
+        self._count = min(total, self.capacity)
+
+    def view(self):
+        """Rows oldest first, as a read-only view that later appends overwrite."""
+        rows = self._rows[self._start:self._start + self._count]
+        rows.flags.writeable = False
+        return rows
+
+    def last(self):
+        """The newest row, or None if empty."""
+        return self._rows[self._start + self._count - 1] if self._count else None
+
+    def clear(self):
+        self._start = 0
+        self._count = 0
+
+
+class RollupTier:
+    """
+    Min/mean/max aggregates of a series over fixed time buckets, updated on every sample.
+
+    Rows are (bucket start, min, mean, max); a gap in the series closes the current bucket
+    and is stored as a row of NaN.
+    """
+    def __init__(self, interval, capacity):
+        """
+        Args:
+            interval: Bucket length in seconds
+            capacity: Number of buckets kept
+        """
+        self.interval = float(interval)
+        self.rows = RingBuffer(capacity, 4)
+        self._bucket = None
+        self._reset_bucket()
+
+    def _reset_bucket(self):
+        self._n = 0
+        self._sum = 0.0
+        self._min = np.inf
+        self._max = -np.inf
+
+    def add(self, timestamp, value):
+        """Add one sample (NaN for a gap)."""
+        if np.isnan(value):
+            self._close()
+            last = self.rows.last()
+            if last is None or not np.isnan(last[2]):
+                self.rows.append((timestamp, np.nan, np.nan, np.nan))
+            return
+
+        bucket = timestamp - timestamp % self.interval
+        if bucket != self._bucket:
+            self._close()
+            self._bucket = bucket
+        self._n += 1
+        self._sum += value
+        self._min = min(self._min, value)
+        self._max = max(self._max, value)
+
+    def extend(self, times, values):
+        """
+        Add many samples in time order; same result as add() for each of them, but the
+        statistics of each bucket are computed with NumPy (for reloading long histories).
+        """
+        times = np.asarray(times, dtype=float)
+        values = np.asarray(values, dtype=float)
+        if not len(times):
+            return
+        gaps = np.cumsum(np.isnan(values))  # Number of gap markers up to each sample
+        idx = np.flatnonzero(~np.isnan(values))
+        if not len(idx):
+            # Only gaps: close the open bucket and write one gap marker
+            self.add(times[0], np.nan)
+            return
+        buckets = times[idx] - times[idx] % self.interval
+        runs = gaps[idx]
+
+        # One group per bucket between two gaps
+        starts = np.flatnonzero(np.r_[True, (buckets[1:] != buckets[:-1]) | (runs[1:] != runs[:-1])])
+        counts = np.diff(np.r_[starts, len(idx)])
+        mins = np.minimum.reduceat(values[idx], starts)
+        maxs = np.maximum.reduceat(values[idx], starts)
+        sums = np.add.reduceat(values[idx], starts)
+
+        run = 0
+        for g, start in enumerate(starts):
+            if runs[start] != run:  # Gap markers before this group
+                self.add(times[np.searchsorted(gaps, run + 1)], np.nan)
+                run = runs[start]
+            if buckets[start] != self._bucket:
+                self._close()
+                self._bucket = buckets[start]
+            self._n += counts[g]
+            self._sum += sums[g]
+            self._min = min(self._min, mins[g])
+            self._max = max(self._max, maxs[g])
+        if gaps[-1] != run:
+            self.add(times[np.searchsorted(gaps, run + 1)], np.nan)
+
+    def _close(self):
+        if self._n:
+            self.rows.append((self._bucket, self._min, self._sum / self._n, self._max))
+        self._bucket = None
+        self._reset_bucket()
+
+    def view(self):
+        """Closed buckets plus the bucket still being filled, oldest first (a copy if there is an open bucket)."""
+        rows = self.rows.view()
+        if self._n:
+            rows = np.vstack((rows, [(self._bucket, self._min, self._sum / self._n, self._max)]))
+        return rows
+
+    def clear(self):
+        self.rows.clear()
+        self._bucket = None
+        self._reset_bucket()
+
+
+class Series:
+    """
+    History of one data series: recent (timestamp, value) samples at full resolution in a
+    fixed-capacity NumPy ring buffer, plus optional rolled-up tiers of min/mean/max
+    aggregates that keep coarser history for much longer.
+
+    Appends are O(1) and overwrite the oldest sample once a buffer is full, so memory is
+    fixed when the series is created. Gaps (series hidden, device stopped) are stored as a
+    NaN value, which Matplotlib draws as a break in the line.
+    """
+    def __init__(self, capacity=1000, tiers=()):
+        """
+        Args:
+            capacity: Maximum number of raw samples kept (default: 1000)
+            tiers: (interval in seconds, number of buckets) of each rolled-up tier, finest first,
+                e.g. ((10, 4320), (60, 2880)) for 12 h of 10 s and 48 h of 1 min aggregates
+        """
+        self.capacity = int(capacity)
+        self._raw = RingBuffer(self.capacity, 2)
+        self.tiers = [RollupTier(interval, size) for interval, size in tiers]
+        self.version = 0  # Incremented on every change, for cheap change detection
+        self._cleared_version = 0
+        self._lock = threading.Lock()
+        self.listeners = []  # Called without arguments after every change; must be quick and not read the series
+
+    def __len__(self):
+        return len(self._raw)
+
+    def append(self, timestamp, value):
+        """Add a sample, dropping the oldest one if the buffer is full."""
+        with self._lock:
+            self._append(timestamp, value)
+
+    def append_gap(self, timestamp=None):
+        """Add a NaN gap marker, unless the last sample already is one."""
+        with self._lock:
+            last = self._raw.last()
+            if last is not None and np.isnan(last[1]):
+                return
+            self._append(time.time() if timestamp is None else timestamp, np.nan)
+
+    def extend(self, timestamps, values):
+        """
+        Add many samples in time order at once, e.g. when reloading a recorded session.
+        Listeners are notified once.
+        """
+        timestamps = np.asarray(timestamps, dtype=float)
+        values = np.asarray(values, dtype=float)
+        if not len(timestamps):
+            return
+        with self._lock:
+            self._raw.extend(np.column_stack((timestamps, values)))
+            for tier in self.tiers:
+                tier.extend(timestamps, values)
+            self.version += 1
+            for listener in self.listeners:
+                listener()
+
+    def load_history(self, timestamps, values):
+        """
+        Put older recorded samples in front of the ones held, e.g. when reloading a session.
+        Recorded samples at or after the first held one are dropped. The merged buffers are
+        built aside and swapped in under the lock, so samples appended meanwhile are kept
+        and the series is unchanged if building them fails.
+
+        Returns:
+            Number of recorded samples loaded
+        """
+        timestamps = np.asarray(timestamps, dtype=float)
+        values = np.asarray(values, dtype=float)
+        with self._lock:
+            live = self._raw.view()
+            if len(live):
+                keep = timestamps < live[0, 0]
+                timestamps, values = timestamps[keep], values[keep]
+            if not len(timestamps):
+                return 0
+            times = np.concatenate((timestamps, live[:, 0]))
+            merged = np.concatenate((values, live[:, 1]))
+            raw = RingBuffer(self.capacity, 2)
+            raw.extend(np.column_stack((times, merged)))
+            tiers = [RollupTier(tier.interval, tier.rows.capacity) for tier in self.tiers]
+            for tier in tiers:
+                tier.extend(times, merged)
+
+            self._raw, self.tiers = raw, tiers
+            self.version += 1
+            self._cleared_version = self.version  # Readers of since() start over
+            for listener in self.listeners:
+                listener()
+        return len(timestamps)
+
+    def _append(self, timestamp, value):
+        self._raw.append((timestamp, value))
+        for tier in self.tiers:
+            tier.add(timestamp, value)
+        self.version += 1
+        for listener in self.listeners:
+            listener()
+
+    def samples(self):
+        """
+        Get copies of the raw samples oldest first, safe to use on another thread.
+
+        Returns:
+            Tuple of (timestamps, values) NumPy arrays
+        """
+        with self._lock:
+            rows = self._raw.view().copy()
+        return rows[:, 0], rows[:, 1]
+
+    def history(self):
+        """
+        Get the whole history oldest first: for the time before the raw samples, the bucket
+        means of the rolled-up tiers (coarsest first), then the raw samples. Gaps are NaN.
+
+        Returns:
+            Tuple of (timestamps, values) NumPy arrays (copies)
+        """
+        with self._lock:
+            raw = self._raw.view().copy()
+            parts = [raw]
+            covered = raw[0, 0] if len(raw) else np.inf  # Oldest time already covered
+            for tier in self.tiers:
+                rows = tier.view()
+                # Only buckets that end before the finer data starts, so no sample counts twice
+                older = rows[rows[:, 0] + tier.interval <= covered]
+                if len(older):
+                    parts.append(older[:, [0, 2]])
+                    covered = older[0, 0]
+        rows = np.concatenate(parts[::-1])
+        # Gap rows carry the time of the gap, which can fall inside the next bucket's interval
+        rows = rows[np.argsort(rows[:, 0], kind='stable')]
+        return rows[:, 0], rows[:, 1]
+
+    def window(self, start):
+        """
+        Get the samples from `start` on, read from the finest tier that reaches back that far
+        (the coarsest tier if none does).
+
+        Rolled-up buckets are returned as two points, the minimum at the bucket start and
+        the maximum half an interval later, so the line still spans the full range. The
+        newest bucket is replaced by its raw samples, so the result always ends with the
+        latest real sample and no synthetic point lies after it.
+
+        Args:
+            start: Oldest timestamp wanted; one sample before it is included
+
+        Returns:
+            Tuple of (timestamps, values) NumPy arrays, copied under the lock so they stay
+            consistent while appends continue (safe to use on another thread)
+        """
+        with self._lock:
+            raw = self._raw.view()
+            if not self.tiers or len(raw) < self.capacity or (len(raw) and raw[0, 0] <= start):
+                raw = raw[max(0, np.searchsorted(raw[:, 0], start) - 1):].copy()
+                return raw[:, 0], raw[:, 1]
+
+            for tier in self.tiers:
+                if tier is self.tiers[-1] or len(tier.rows) < tier.rows.capacity or tier.rows.view()[0, 0] <= start:
+                    break
+            rows = tier.rows.view()
+            # Raw samples from the newest bucket on: the one still being filled, or else the
+            # last closed one (only gaps came after it)
+            if tier._n:
+                cutoff = tier._bucket
+            else:
+                filled = np.flatnonzero(~np.isnan(rows[:, 2]))
+                cutoff = rows[filled[-1], 0] if len(filled) else -np.inf
+            rows = rows[rows[:, 0] < cutoff]
+            rows = rows[max(0, np.searchsorted(rows[:, 0], start) - 1):].copy()
+            tail = raw[np.searchsorted(raw[:, 0], max(cutoff, start)):].copy()
+            last = raw[-1, 0]
+
+        times = np.repeat(rows[:, 0], 2)
+        times[1::2] += np.where(np.isnan(rows[:, 2]), 0.0, tier.interval / 2)
+        # A gap row carries the time of the gap, which can be later than the start of the
+        # bucket after it; keep the points in time order and never past the raw samples
+        times = np.minimum(np.maximum.accumulate(times), tail[0, 0] if len(tail) else last)
+        values = np.column_stack((rows[:, 1], rows[:, 3])).ravel()
+        return np.concatenate((times, tail[:, 0])), np.concatenate((values, tail[:, 1]))
+
+    def since(self, version):
+        """
+        Get the raw samples appended after a given version.
+
+        Args:
+            version: Value of self.version at the previous read
+
+        Returns:
+            Tuple of (timestamps, values, current version), or None if the series was cleared
+            or the samples were already overwritten since then
+        """
+        with self._lock:
+            n = self.version - version
+            if version < self._cleared_version or n > len(self._raw):
+                return None
+            rows = self._raw.view()[len(self._raw) - n:]
+            return rows[:, 0].copy(), rows[:, 1].copy(), self.version
+
+    def last_time(self):
+        """Timestamp of the newest sample (gap markers included), or None if empty."""
+        with self._lock:
+            last = self._raw.last()
+            return None if last is None else last[0]
+
+    def clear(self):
+        """Remove all samples."""
+        with self._lock:
+            self._raw.clear()
+            for tier in self.tiers:
+                tier.clear()
+            self.version += 1
+            self._cleared_version = self.version
+            for listener in self.listeners:
+                listener()
+
+
+class WindowExtremes:
+    """
+    Minimum and maximum of the samples in a sliding time window, O(1) amortized per sample.
+
+    Two monotonic deques hold the candidates: a sample is dropped from the min deque as soon
+    as a smaller newer one arrives (and vice versa), and from the front once it is older
+    than the window.
+    """
+    def __init__(self, window):
+        """
+        Args:
+            window: Window length in seconds, measured back from the newest sample
+                (or from the time passed to expire())
+        """
+        self.window = window
+        self.version = 0  # Series version the deques are up to date with
+        self._min = collections.deque()  # (t, v), values increasing
+        self._max = collections.deque()  # (t, v), values decreasing
+
+    def add(self, times, values):
+        """Add samples in time order (NaN gaps are skipped) and expire the old ones."""
+        for t, v in zip(times.tolist(), values.tolist()):
+            if v != v:
+                continue
+            while self._min and self._min[-1][1] >= v:
+                self._min.pop()
+            self._min.append((t, v))
+            while self._max and self._max[-1][1] <= v:
+                self._max.pop()
+            self._max.append((t, v))
+        if len(times):
+            self.expire(times[-1])
+
+    def expire(self, latest):
+        """Drop the samples older than the window ending at `latest`."""
+        cutoff = latest - self.window
+        while self._min and self._min[0][0] < cutoff:
+            self._min.popleft()
+        while self._max and self._max[0][0] < cutoff:
+            self._max.popleft()
+
+    def range(self):
+        """(min, max) of the window, or None if it holds no values."""
+        if not self._min:
+            return None
+        return self._min[0][1], self._max[0][1]
+
+
+def decimate_minmax(times, values, buckets):
+    """
+    Reduce a series to the minimum and maximum of each of `buckets` equal-time buckets.
+
+    The first and newest valid samples are always kept, as is the first NaN gap marker of
+    every bucket that has one, so spikes, gaps and the latest value survive. The result is
+    a time-ordered subset of the original samples.
+
+    Args:
+        times: Increasing timestamps
+        values: Values, NaN for gaps
+        buckets: Number of buckets, e.g. the plot width in pixels for 2 points per pixel
+
+    Returns:
+        Tuple of (times, values) NumPy arrays with at most about 2 * buckets + 2 points
+    """
+    n = len(times)
+    if n <= 2 * buckets:
+        return times, values
+
+    edges = np.linspace(times[0], times[-1], buckets + 1)[1:-1]
+    starts = np.unique(np.concatenate(([0], np.searchsorted(times, edges))))
+    starts = starts[starts < n]
+    segment = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+
+    gaps = np.isnan(values)
+    low = np.where(gaps, np.inf, values)
+    high = np.where(gaps, -np.inf, values)
+
+    def first_per_segment(mask):
+        hits = np.flatnonzero(mask)
+        _, first = np.unique(segment[hits], return_index=True)
+        return hits[first]
+
+    keep = [first_per_segment(low == np.minimum.reduceat(low, starts)[segment]),
+            first_per_segment(high == np.maximum.reduceat(high, starts)[segment]),
+            first_per_segment(gaps),
+            [0]]
+    valid = np.flatnonzero(~gaps)
+    if len(valid):
+        keep.append(valid[-1:])
+    index = np.unique(np.concatenate(keep))
+    return times[index], values[index]
+
 
 class Graph:
     def __init__(self, temperatures_dict, pressures_dict, balances_dict, flow_rates_dict, 
-                 max_points=1000, update_interval=0.5):
+                 max_points=1000, update_interval=0.5, render_mode='full'):
         """
         Enhanced graph utility for real-time data visualization.
         
@@ -19,8 +489,10 @@ class Graph:
             pressures_dict: Dictionary of pressure data series
             balances_dict: Dictionary of balance data series  
             flow_rates_dict: Dictionary of flow rate data series
-            max_points: Maximum number of data points to keep per series (default: 1000)
+            max_points: Raw-sample capacity of the Series ring buffers in the dicts; once a
+                series holds that many samples each new one overwrites the oldest (default: 1000)
             update_interval: Time between plot updates in seconds (default: 0.5)
+            render_mode: 'full' to rebuild every frame or 'blit' for persistent, blitted artists (default: 'full')
         """
         self.temperatures_dict = temperatures_dict
         self.pressures_dict = pressures_dict
@@ -59,6 +531,40 @@ class Graph:
         # For tracking time window
         self.start_time = None
         self.time_window = 120  # Default time window in seconds
+        self.recorder = None  # Optional session_recorder.SessionRecorder that gets every update_dict sample
+
+        # Y-axis autoscaling over the visible time window ('minmax' or 'percentile')
+        self.autoscale_mode = 'minmax'
+        self.clip_percentiles = (1.0, 99.0)
+        self._extremes = {}       # (label, name) -> WindowExtremes
+        self._series_ranges = {}  # (label, name) -> (min, max) over the time window
+
+        # Rendering mode and frame time tracking
+        if render_mode not in ('full', 'blit'):
+            raise ValueError(f"Unknown render mode: {render_mode}")
+        self.render_mode = render_mode
+        self.frame_time = 0.0
+        self.frame_times = collections.deque(maxlen=100)
+        self._blit_canvas = None
+        self._hooked_canvas = None
+        self._xlim_window = None
+        self._layout_dirty = True  # The first frame always draws
+        self.plot_width_px = 800  # Axes width in pixels, updated on every full draw
+
+        # Data snapshots prepared by a worker thread for the drawing thread
+        self._snapshot_lock = threading.Lock()
+        self._pending_snapshot = None
+        self._resnapshot = False
+        self._signatures = {}       # (label, name) -> state of the series at the last snapshot
+        self._latest_times = {}     # (label, name) -> latest timestamp of a shown series
+        self._window_end = None     # Newest sample of all shown series; every series' window ends here
+
+        # Dirty tracking: series and plots that got new samples or changed visibility since the last snapshot
+        self._dirty_series = set()
+        self.dirty_categories = set()
+        self._data_event = threading.Event()  # Set on ingest, wakes snapshot_loop
+        self._watched = set()
+        self._watch_series()
 
     def toggle_all_series(self, dict_type):
         """
@@ -75,6 +581,7 @@ class Graph:
             # Toggle all to the opposite state
             for name in d:
                 d[name][0] = not all_on
+            self.mark_dirty(dict_type)
 
     def plot(self, plots, canvas, fig=None):
         """
@@ -97,103 +604,535 @@ class Graph:
                 continue
                 
             self.last_update_time = current_time
+            self.render_frame(plots, canvas, fig)
             
-            # Clear plots but maintain settings
-            for p in plots:
-                p.clear()
+            # Small sleep to prevent CPU hogging
+            time.sleep(0.05)
+
+    def render_frame(self, plots, canvas, fig=None):
+        """
+        Prepare a data snapshot and draw one frame in the current render mode.
+        
+        Args:
+            plots: List of matplotlib subplot axes
+            canvas: Canvas to draw on
+            fig: Figure object (optional)
             
-            # Set up plots
-            for label, properties in self.plot_properties.items():
-                label = label[:-1] # remove s from the end of the label
-                idx = properties['index']
-                plots[idx].set_title(f'{label} Over Time')
-                plots[idx].set_xlabel('Time (s)')
-                plots[idx].set_ylabel(properties['ylabel'])
-                plots[idx].grid(True, linestyle='--', alpha=0.7)
+        Returns:
+            False if the frame was skipped because nothing changed
+        """
+        if self.render_mode == 'blit' and self._blit_canvas is not canvas:
+            self._init_blit(plots, canvas, fig)
+        self.prepare_snapshot()
+        snapshot = self.take_snapshot()
+        if snapshot is None and not self.needs_redraw():
+            return False
+        self.render_snapshot(plots, canvas, fig, snapshot)
+        return True
+
+    def render_snapshot(self, plots, canvas, fig=None, snapshot=None):
+        """
+        Draw one frame from a snapshot taken with take_snapshot() and record its frame time.
+        Must run on the thread that owns the canvas.
+        
+        Args:
+            plots: List of matplotlib subplot axes
+            canvas: Canvas to draw on
+            fig: Figure object (optional)
+            snapshot: Series changes from take_snapshot() (ignored in 'full' mode)
+        """
+        if self.start_time is None:
+            self.start_time = time.time()
+
+        start = time.perf_counter()
+        if self.render_mode == 'blit':
+            self._apply_snapshot(plots, canvas, fig, snapshot)
+        else:
+            self._render_full(plots, canvas, fig)
+        self.frame_time = time.perf_counter() - start
+        self.frame_times.append(self.frame_time)
+
+    def prepare_snapshot(self):
+        """
+        Collect the series that changed since the last snapshot into the pending snapshot.
+        Only reads the data dictionaries, so it can run on a worker thread.
+        """
+        if self.start_time is None:
+            self.start_time = time.time()
+
+        with self._snapshot_lock:
+            dirty, self._dirty_series = self._dirty_series, set()
+            categories, self.dirty_categories = self.dirty_categories, set()
+            resnapshot, self._resnapshot = self._resnapshot, False
+        if resnapshot:
+            # The artists were rebuilt or the window changed, send every series again
+            self._signatures = {}
+            self._latest_times = {}
+            self._watch_series()
+            dirty = {(label, name) for label, data_dict in self.data_dicts for name in list(data_dict)}
+            categories = set(self.plot_properties)
+        if not dirty:
+            return  # Nothing arrived since the last snapshot
+
+        data_dicts = dict(self.data_dicts)
+        self._window_end = self.latest_time()
+        changes = {}
+        for key in dirty:
+            label, name = key
+            var_value = data_dicts[label].get(name)
+            if var_value is not None:
+                series = var_value[2]
+                shown = bool(var_value[0] and var_value[1] and len(series) > 0)
+                signature = (shown, series.version)
+                if self._signatures.get(key) == signature:
+                    continue
+                self._signatures[key] = signature
+
+                data = None
+                if shown:
+                    times, values = self.visible_data(series)
+                    valid = np.flatnonzero(~np.isnan(values))
+                    if len(valid):
+                        # visible_data returns copies, so appends cannot tear them; NaN gaps break the line
+                        data = (times - self.start_time, values, valid[-1])
+                        self._series_ranges[key] = self._series_range(key, series)
+                        self._latest_times[key] = times[valid[-1]]
+                if data is None:
+                    self._latest_times.pop(key, None)
+                    self._series_ranges.pop(key, None)
+                    self._extremes.pop(key, None)
+                changes[key] = data
+
+        if not changes:
+            return
+        self._expire_ranges()
+        self._update_value_ranges()
+        latest = max(self._latest_times.values()) if self._latest_times else None
+        with self._snapshot_lock:
+            if self._pending_snapshot is None:
+                self._pending_snapshot = {'series': {}, 'categories': set(), 'latest': None}
+            self._pending_snapshot['series'].update(changes)  # Unrendered older changes are superseded
+            self._pending_snapshot['categories'].update(categories)
+            self._pending_snapshot['latest'] = latest
+
+    def set_autoscale(self, mode='minmax', percentiles=(1.0, 99.0)):
+        """
+        Choose how the y-axes follow the data in the time window.
+        
+        Args:
+            mode: 'minmax' to show every value in the window, 'percentile' to clip outliers
+            percentiles: Lower and upper percentile kept in 'percentile' mode (default: (1.0, 99.0))
+        """
+        if mode not in ('minmax', 'percentile'):
+            raise ValueError(f"Unknown autoscale mode: {mode}")
+        self.autoscale_mode = mode
+        self.clip_percentiles = percentiles
+        with self._snapshot_lock:
+            self._resnapshot = True  # Recompute the ranges of every series
+        self._data_event.set()
+
+    def latest_time(self):
+        """Timestamp of the newest sample of all shown series, or None if nothing is shown."""
+        latest = None
+        for label, data_dict in self.data_dicts:
+            for name, var_value in list(data_dict.items()):
+                if var_value[0] and var_value[1]:
+                    t = var_value[2].last_time()
+                    if t is not None and (latest is None or t > latest):
+                        latest = t
+        return latest
+
+    def _series_range(self, key, series):
+        """
+        Get (min, max) of a series over the time window, or None if it has no values there.
+        
+        The window ends at the newest sample of all shown series, so every series is scaled
+        over the same time span. In 'minmax' mode only the samples added since the last call
+        are pushed through the series' monotonic deques; 'percentile' mode takes the clip
+        percentiles of the window.
+        """
+        latest = self._window_end if self._window_end is not None else series.last_time()
+        if latest is None:
+            return None
+        span = self.time_window + self.x_headroom()
+
+        if self.autoscale_mode == 'percentile':
+            times, values = series.window(latest - span)
+            values = values[(times >= latest - span) & ~np.isnan(values)]
+            if len(values) == 0:
+                return None
+            low, high = np.percentile(values, self.clip_percentiles)
+            return float(low), float(high)
+
+        extremes = self._extremes.get(key)
+        new = None
+        if extremes is not None and extremes.window == span:
+            new = series.since(extremes.version)
+        if new is None:
+            # First use, new time window or series cleared: start over from the window
+            extremes = self._extremes[key] = WindowExtremes(span)
+            version = series.version
+            times, values = series.window(latest - span)
+            new = (times, values, version)
+        times, values, extremes.version = new
+        extremes.add(times, values)
+        extremes.expire(latest)
+        return extremes.range()
+
+    def _expire_ranges(self):
+        """
+        Move the windows of the series that got no new samples up to the current window end,
+        so a stalled series no longer holds the y range with values that scrolled out of view.
+        """
+        if self._window_end is None:
+            return
+        start = self._window_end - self.time_window - self.x_headroom()
+        for key in list(self._series_ranges):
+            latest = self._latest_times.get(key)
+            if latest is None or latest < start:
+                self._series_ranges[key] = None  # No samples inside the window
+                continue
+            extremes = self._extremes.get(key)
+            if self.autoscale_mode == 'minmax' and extremes is not None:
+                extremes.expire(self._window_end)
+                self._series_ranges[key] = extremes.range()
+
+    def _update_value_ranges(self):
+        """Combine the series ranges into one y range per plot."""
+        ranges = {label: [float('inf'), float('-inf')] for label in self.plot_properties}
+        for (label, name), value_range in list(self._series_ranges.items()):
+            if value_range is not None:
+                ranges[label][0] = min(ranges[label][0], value_range[0])
+                ranges[label][1] = max(ranges[label][1], value_range[1])
+        for label, (low, high) in ranges.items():
+            self.value_ranges[label] = {'min': low, 'max': high}
+
+    def visible_data(self, series):
+        """
+        Get the part of a series inside the time window, decimated to about 2 points per pixel.
+        
+        Args:
+            series: Series to read
             
-            # Plot data series
-            for label, data_dict in self.data_dicts:
-                plotted = False
-                p_idx = self.plot_properties[label]['index']
-                p = plots[p_idx]
-                
-                for name, var_value in data_dict.items():
-                    if var_value[0] and var_value[1] and len(var_value[2]) > 0:
-                        # Filter out None values and limit to max points
-                        valid_data = [(t, v) for t, v in var_value[2][-self.max_points:] if t is not None and v is not None]
-                        
-                        if valid_data:
-                            times = [(t - self.start_time) for t, v in valid_data]  # Relative time in seconds
-                            values = [v for t, v in valid_data]
-                            
-                            # Update min/max values for auto-scaling
-                            if values:
-                                self.value_ranges[label]['min'] = min(self.value_ranges[label]['min'], min(values))
-                                self.value_ranges[label]['max'] = max(self.value_ranges[label]['max'], max(values))
-                            
-                            # Assign consistent colors to each series
-                            if name not in self.color_map:
-                                cmap = plt.get_cmap(self.plot_properties[label]['color_map'])
-                                self.color_map[name] = cmap(hash(name) % 10 / 10.0)
-                            
-                            line, = p.plot(times, values, label=f'{name}', color=self.color_map[name], 
-                                          linewidth=2, marker='o', markersize=2, alpha=0.8)
-                            
-                            # Add annotation for the latest value if there are values
-                            if values:
-                                latest_idx = len(values) - 1
-                                latest_value = values[latest_idx]
-                                latest_time = times[latest_idx]
-                                p.annotate(f'{latest_value:.2f}', 
-                                          xy=(latest_time, latest_value),
-                                          xytext=(4, 4), 
-                                          textcoords='offset points',
-                                          fontsize=8)
-                            
-                            plotted = True
-                
-                if plotted:
-                    # Set better y limits with padding
-                    if self.value_ranges[label]['min'] != float('inf'):
-                        data_range = self.value_ranges[label]['max'] - self.value_ranges[label]['min']
-                        padding = max(0.1 * data_range, 0.1)  # At least 0.1 unit padding
-                        p.set_ylim(
-                            self.value_ranges[label]['min'] - padding,
-                            self.value_ranges[label]['max'] + padding
-                        )
-                    
-                    p.legend(loc='upper right', fontsize=8)
+        Returns:
+            Tuple of (timestamps, values) NumPy arrays
+        """
+        latest = self._window_end if self._window_end is not None else series.last_time()
+        if latest is None:
+            return series.samples()
+        # Wide windows read from a rolled-up tier once the raw samples do not reach back far enough
+        times, values = series.window(latest - self.time_window - self.x_headroom())
+        return decimate_minmax(times, values, self.plot_width_px)
+
+    def x_headroom(self):
+        """Space in seconds kept free right of the newest point, so the time axis only moves in steps."""
+        return max(2.0, 0.1 * self.time_window)
+
+    def take_snapshot(self):
+        """
+        Get and clear the pending snapshot.
+        
+        Returns:
+            Dictionary with 'series' ((label, name) -> (relative times, values, index of the
+            newest non-gap value) or None when hidden), 'categories' (plots with changes)
+            and 'latest' (latest timestamp shown), or None if nothing changed
+        """
+        with self._snapshot_lock:
+            snapshot = self._pending_snapshot
+            self._pending_snapshot = None
+            return snapshot
+
+    def needs_redraw(self):
+        """True if a frame must be drawn even without new data (first frame, resize, legend change)."""
+        return self._layout_dirty
+
+    def snapshot_loop(self):
+        """
+        Prepare a data snapshot whenever new samples arrive, at most every update_interval
+        seconds, until plotting is stopped. The thread sleeps while no data comes in.
+        """
+        if self.start_time is None:
+            self.start_time = time.time()
+
+        while not self.gui_plot_stopped:
+            if not self._data_event.wait(timeout=0.5):
+                continue
+            self._data_event.clear()
+            try:
+                self.prepare_snapshot()
+            except Exception as e:
+                print(f"Error preparing graph data: {e}")
+            time.sleep(self.update_interval)  # Samples arriving meanwhile go into the next snapshot
+
+    def set_render_mode(self, mode):
+        """
+        Switch between 'full' (clear and redraw everything each frame) and
+        'blit' (persistent artists, only changed axes are redrawn) rendering.
+        
+        Args:
+            mode: 'full' or 'blit'
+        """
+        if mode not in ('full', 'blit'):
+            raise ValueError(f"Unknown render mode: {mode}")
+        self.render_mode = mode
+        self._blit_canvas = None  # Artists are rebuilt on the next blitted frame
+
+    def frame_stats(self):
+        """
+        Get frame time statistics over the recent frames.
+        
+        Returns:
+            Dictionary with frames, last, mean, p95 and max frame time (seconds) and fps
+            (frames per second the renderer could sustain at the mean frame time)
+        """
+        times = sorted(self.frame_times)
+        if not times:
+            return {'frames': 0, 'last': 0.0, 'mean': 0.0, 'p95': 0.0, 'max': 0.0, 'fps': 0.0}
+        mean = sum(times) / len(times)
+        return {
+            'frames': len(times),
+            'last': self.frame_time,
+            'mean': mean,
+            'p95': times[int(0.95 * (len(times) - 1))],
+            'max': times[-1],
+            'fps': 1.0 / mean if mean > 0 else float('inf'),
+        }
+
+    def _render_full(self, plots, canvas, fig=None):
+        """Clear all axes and rebuild every artist, legend and the layout."""
+        # Clear plots but maintain settings
+        for p in plots:
+            p.clear()
+        
+        # Set up plots
+        for label, properties in self.plot_properties.items():
+            label = label[:-1] # remove s from the end of the label
+            idx = properties['index']
+            plots[idx].set_title(f'{label} Over Time')
+            plots[idx].set_xlabel('Time (s)')
+            plots[idx].set_ylabel(properties['ylabel'])
+            plots[idx].grid(True, linestyle='--', alpha=0.7)
+        
+        # Plot data series
+        for label, data_dict in self.data_dicts:
+            plotted = False
+            p_idx = self.plot_properties[label]['index']
+            p = plots[p_idx]
             
-            # Adjust the time window - dynamic based on available data
-            latest_times = []
-            for label, data_dict in self.data_dicts:
-                for name, var_value in data_dict.items():
-                    if var_value[0] and var_value[1] and var_value[2]:
-                        valid_times = [t for t, v in var_value[2] if t is not None]
-                        if valid_times:
-                            latest_times.append(max(valid_times))
+            for name, var_value in data_dict.items():
+                if var_value[0] and var_value[1] and len(var_value[2]) > 0:
+                    # NaN gap markers are kept, they break the line
+                    times, values = self.visible_data(var_value[2])
+                    valid = np.flatnonzero(~np.isnan(values))
+                    
+                    if len(valid):
+                        times = times - self.start_time  # Relative time in seconds
+                        
+                        # Assign consistent colors to each series
+                        if name not in self.color_map:
+                            cmap = plt.get_cmap(self.plot_properties[label]['color_map'])
+                            self.color_map[name] = cmap(hash(name) % 10 / 10.0)
+                        
+                        line, = p.plot(times, values, label=f'{name}', color=self.color_map[name], 
+                                      linewidth=2, marker='o', markersize=2, alpha=0.8)
+                        
+                        # Add annotation for the latest value
+                        latest_idx = valid[-1]
+                        latest_value = values[latest_idx]
+                        latest_time = times[latest_idx]
+                        p.annotate(f'{latest_value:.2f}', 
+                                  xy=(latest_time, latest_value),
+                                  xytext=(4, 4), 
+                                  textcoords='offset points',
+                                  fontsize=8)
+                        
+                        plotted = True
             
-            if latest_times:
-                latest_time = max(latest_times)
-                time_range = latest_time - self.start_time
+            if plotted:
+                # Set better y limits with padding (value_ranges follow the time window, see prepare_snapshot)
+                if self.value_ranges[label]['min'] != float('inf'):
+                    data_range = self.value_ranges[label]['max'] - self.value_ranges[label]['min']
+                    padding = max(0.1 * data_range, 0.1)  # At least 0.1 unit padding
+                    p.set_ylim(
+                        self.value_ranges[label]['min'] - padding,
+                        self.value_ranges[label]['max'] + padding
+                    )
                 
-                # Update all x-axes to show the same time range
-                for p in plots:
-                    # Show at most the last time_window seconds of data
-                    if time_range > self.time_window:
-                        p.set_xlim(time_range - self.time_window, time_range + 2)
-                    else:
-                        p.set_xlim(0, max(time_range + 2, self.time_window))
+                p.legend(loc='upper right', fontsize=8)
+        
+        # Adjust the time window - dynamic based on available data
+        # (latest timestamps are cached per series on ingest, see prepare_snapshot)
+        if self._latest_times:
+            latest_time = max(self._latest_times.values())
+            time_range = latest_time - self.start_time
             
-            # Make plots look good
+            # Update all x-axes to show the same time range
+            for p in plots:
+                # Show at most the last time_window seconds of data
+                if time_range > self.time_window:
+                    p.set_xlim(time_range - self.time_window, time_range + 2)
+                else:
+                    p.set_xlim(0, max(time_range + 2, self.time_window))
+        
+        # Make plots look good
+        if fig:
+            fig.tight_layout()
+        self.plot_width_px = max(100, int(plots[0].bbox.width))
+        self._layout_dirty = False
+        
+        # Draw the canvas
+        canvas.draw()
+
+    def _init_blit(self, plots, canvas, fig=None):
+        """Set up titles, labels and grids once and hook the canvas draw and resize events."""
+        for label, properties in self.plot_properties.items():
+            p = plots[properties['index']]
+            p.clear()
+            p.set_title(f'{label[:-1]} Over Time')
+            p.set_xlabel('Time (s)')
+            p.set_ylabel(properties['ylabel'])
+            p.grid(True, linestyle='--', alpha=0.7)
+
+        self._blit_plots = plots
+        self._artists = {}          # (label, name) -> (line, annotation)
+        self._backgrounds = {}      # axes index -> saved pixels without the animated artists
+        self._ylims = {}            # label -> y limits set by the renderer
+        self._xlim = None
+        self._layout_dirty = True
+        with self._snapshot_lock:
+            self._resnapshot = True
+            self._pending_snapshot = None
+        self._data_event.set()
+
+        if self._hooked_canvas is not canvas:
+            canvas.mpl_connect('draw_event', self._on_draw)
+            canvas.mpl_connect('resize_event', self._on_resize)
+            self._hooked_canvas = canvas
+        self._blit_canvas = canvas
+
+    def _on_resize(self, event):
+        self._layout_dirty = True
+
+    def _on_draw(self, event):
+        """Save the static background of each axes after a full draw and put the lines back on top."""
+        if self.render_mode != 'blit' or self._blit_canvas is None:
+            return
+        canvas = event.canvas
+        self.plot_width_px = max(100, int(self._blit_plots[0].bbox.width))
+        self._backgrounds = {i: canvas.copy_from_bbox(p.bbox) for i, p in enumerate(self._blit_plots)}
+        for p_idx in range(len(self._blit_plots)):
+            self._draw_animated(p_idx)
+
+    def _draw_animated(self, p_idx):
+        """Draw the visible lines and latest-value annotations of one axes."""
+        p = self._blit_plots[p_idx]
+        for (label, name), artists in self._artists.items():
+            if self.plot_properties[label]['index'] == p_idx:
+                for artist in artists:
+                    if artist.get_visible():
+                        p.draw_artist(artist)
+
+    def _apply_snapshot(self, plots, canvas, fig=None, snapshot=None):
+        """
+        Update the persistent line artists with set_data and blit only the axes whose data changed.
+        
+        Limits move in steps with some headroom so that most frames need no full redraw;
+        the layout is only recomputed on resize or when series are shown or hidden.
+        """
+        if self._blit_canvas is not canvas:
+            self._init_blit(plots, canvas, fig)
+            return  # The next snapshot carries every series
+
+        changed_axes = set()
+        series = snapshot['series'] if snapshot else {}
+        for (label, name), data in series.items():
+            p_idx = self.plot_properties[label]['index']
+            p = plots[p_idx]
+
+            if (label, name) not in self._artists:
+                if data is None:
+                    continue
+                if name not in self.color_map:
+                    cmap = plt.get_cmap(self.plot_properties[label]['color_map'])
+                    self.color_map[name] = cmap(hash(name) % 10 / 10.0)
+                line, = p.plot([], [], label=f'{name}', color=self.color_map[name],
+                               linewidth=2, marker='o', markersize=2, alpha=0.8, animated=True)
+                annotation = p.annotate('', xy=(0, 0), xytext=(4, 4), textcoords='offset points',
+                                        fontsize=8, animated=True, annotation_clip=False)
+                annotation.set_clip_box(p.bbox)
+                annotation.set_clip_on(True)
+                line.set_visible(False)
+                annotation.set_visible(False)
+                self._artists[(label, name)] = (line, annotation)
+            line, annotation = self._artists[(label, name)]
+
+            if data is not None:
+                times, values, last = data
+                line.set_data(times, values)
+                annotation.set_text(f'{values[last]:.2f}')
+                annotation.xy = (times[last], values[last])
+
+            if line.get_visible() != (data is not None):
+                line.set_visible(data is not None)
+                annotation.set_visible(data is not None)
+                self._layout_dirty = True  # Legend entries change
+            changed_axes.add(p_idx)
+
+        # Y limits follow the range of the time window, with hysteresis: they move when the
+        # data leaves them or when the padded range shrinks to less than half of them
+        limits_changed = False
+        for label in (snapshot['categories'] if snapshot else self.plot_properties):
+            properties = self.plot_properties[label]
+            value_range = self.value_ranges[label]
+            if value_range['min'] == float('inf'):
+                self._ylims.pop(label, None)
+                continue
+            data_range = value_range['max'] - value_range['min']
+            padding = max(0.1 * data_range, 0.1)
+            target = (value_range['min'] - padding, value_range['max'] + padding)
+            ylim = self._ylims.get(label)
+            if (ylim is None or value_range['min'] < ylim[0] or value_range['max'] > ylim[1]
+                    or ylim[1] - ylim[0] > 2 * (target[1] - target[0])):
+                plots[properties['index']].set_ylim(*target)
+                self._ylims[label] = target
+                limits_changed = True
+
+        # The time axis jumps ahead by a headroom instead of scrolling every frame
+        if snapshot and snapshot['latest'] is not None:
+            time_range = snapshot['latest'] - self.start_time
+            if self._xlim is None or time_range > self._xlim[1] or self._xlim_window != self.time_window:
+                headroom = self.x_headroom()
+                if time_range > self.time_window:
+                    xlim = (time_range - self.time_window, time_range + headroom)
+                else:
+                    xlim = (0, max(time_range + headroom, self.time_window))
+                for p in plots:
+                    p.set_xlim(*xlim)
+                self._xlim = xlim
+                self._xlim_window = self.time_window
+                limits_changed = True
+
+        if self._layout_dirty:
+            for label, properties in self.plot_properties.items():
+                p = plots[properties['index']]
+                handles = [line for (l, name), (line, annotation) in self._artists.items()
+                           if l == label and line.get_visible()]
+                if handles:
+                    p.legend(handles=handles, loc='upper right', fontsize=8)
+                elif p.get_legend() is not None:
+                    p.get_legend().remove()
             if fig:
                 fig.tight_layout()
-            
-            # Draw the canvas
+            self._layout_dirty = False
+            canvas.draw()  # _on_draw saves the new backgrounds and draws the lines
+        elif limits_changed or not self._backgrounds:
             canvas.draw()
-            
-            # Small sleep to prevent CPU hogging
-            time.sleep(0.05)
+        else:
+            for p_idx in changed_axes:
+                p = plots[p_idx]
+                canvas.restore_region(self._backgrounds[p_idx])
+                self._draw_animated(p_idx)
+                canvas.blit(p.bbox)
 
     def update_dict(self, dict_type, name, value):
         """
@@ -202,16 +1141,19 @@ class Graph:
         Args:
             dict_type: Type of dictionary to update
             name: Name of the data series
-            value: New data value
+            value: New data value, or None to mark a gap (e.g. PID control stopped)
         """
-        if value != None:
-            d = self.get_dict_type(dict_type)
-            if d and name in d and d[name][0] and d[name][1]:
-                # If we've reached max points, use a deque-like behavior
-                if len(d[name][2]) >= self.max_points:
-                    d[name][2] = d[name][2][-(self.max_points-1):] + [(time.time(), value)]
-                else:
-                    d[name][2].append((time.time(), value))
+        timestamp = time.time()
+        if self.recorder is not None:
+            self.recorder.record(dict_type, name, timestamp, value)  # Recorded even while hidden
+
+        d = self.get_dict_type(dict_type)
+        if d and name in d and d[name][0] and d[name][1]:
+            if value is None:
+                d[name][2].append_gap(timestamp)
+            else:
+                # The ring buffer overwrites the oldest point once it holds max_points
+                d[name][2].append(timestamp, value)
 
     def toggle_series(self, dict_type, name, is_visible=None):
         """
@@ -228,14 +1170,15 @@ class Graph:
             if is_visible is not None:
                 # If turning off, add a discontinuity marker
                 if d[name][1] and not is_visible:
-                    d[name][2].append((None, None))
+                    d[name][2].append_gap()
                 d[name][1] = is_visible
             # Otherwise toggle current state
             else:
                 # If turning off, add a discontinuity marker
                 if d[name][1]:
-                    d[name][2].append((None, None))
+                    d[name][2].append_gap()
                 d[name][1] = not d[name][1]
+            self.mark_dirty(dict_type, name)
                 
     def set_all_series(self, dict_type, is_visible):
         """
@@ -250,8 +1193,39 @@ class Graph:
             for name in d:
                 # If turning off and currently visible, add discontinuity marker
                 if d[name][1] and not is_visible:
-                    d[name][2].append((None, None))
+                    d[name][2].append_gap()
                 d[name][1] = is_visible
+            self.mark_dirty(dict_type)
+
+    def mark_dirty(self, dict_type, name=None):
+        """
+        Redraw a series, or all series of a type, on the next frame, e.g. after a visibility change.
+        New samples mark their series dirty by themselves.
+        
+        Args:
+            dict_type: Type of dictionary containing the series
+            name: Name of the data series (if None, every series of the type)
+        """
+        d = self.get_dict_type(dict_type)
+        for label, data_dict in self.data_dicts:
+            if data_dict is d:
+                for series_name in ([name] if name is not None else list(d)):
+                    self._mark_dirty(label, series_name)
+
+    def _mark_dirty(self, label, name):
+        with self._snapshot_lock:
+            self._dirty_series.add((label, name))
+            self.dirty_categories.add(label)
+        self._data_event.set()
+
+    def _watch_series(self):
+        """Subscribe to every series so that new samples mark it (and its plot) dirty on ingest."""
+        for label, data_dict in self.data_dicts:
+            for name, var_value in list(data_dict.items()):
+                series = var_value[2]
+                if id(series) not in self._watched:
+                    self._watched.add(id(series))
+                    series.listeners.append(functools.partial(self._mark_dirty, label, name))
 
     def get_dict_type(self, dict_type):
         """
@@ -273,135 +1247,151 @@ class Graph:
             seconds: Number of seconds to display
         """
         self.time_window = seconds
+        with self._snapshot_lock:
+            self._resnapshot = True  # Series ranges and limits follow the new window
+        self._data_event.set()
 
-    def export_data(self, filename=None):
+    EXPORT_TYPES = ["Temperatures", "Pressures", "Balances", "Flow_Rates"]
+
+    def export_columns(self, data_type):
         """
-        Export all current data to a nicely formatted Excel file without timestamp column.
-        Only includes data sheets for each measurement type.
+        Align the active series of one data type on their union of timestamps.
+
+        Each series contributes its whole history (Series.history): the raw samples and,
+        before them, the means of the rolled-up tiers. The timestamps are merged with
+        np.unique and each series is placed with np.searchsorted, so no per-sample Python
+        work is done. Gap markers are left out.
+
+        Args:
+            data_type: One of EXPORT_TYPES, e.g. "Temperatures"
+
+        Returns:
+            Tuple of (timestamps, names, columns): sorted timestamps, the series names and a
+            (len(timestamps), len(names)) array with NaN where a series has no sample
+        """
+        data_dict = getattr(self, f"{data_type.lower()}_dict")
+        names = [name for name, var_value in list(data_dict.items()) if var_value[0]]
+
+        samples = []
+        for name in names:
+            times, values = data_dict[name][2].history()
+            valid = ~np.isnan(values)
+            samples.append((times[valid], values[valid]))
+
+        timestamps = np.unique(np.concatenate([times for times, values in samples])) if samples else np.empty(0)
+        columns = np.full((len(timestamps), len(names)), np.nan)
+        for col, (times, values) in enumerate(samples):
+            columns[np.searchsorted(timestamps, times), col] = values
+        return timestamps, names, columns
+
+    def export_tables(self):
+        """
+        Align every data type for export (see export_columns).
+
+        Returns:
+            List of (data_type, timestamps, names, columns), one per entry of EXPORT_TYPES
+        """
+        return [(data_type,) + self.export_columns(data_type) for data_type in self.EXPORT_TYPES]
+
+    def export(self, filename=None, fmt=None, progress=None):
+        """
+        Export all current data with one of the writers in data_export.WRITERS.
+        Safe to call from a worker thread, see export_data_in_background.
         
         Args:
-            filename: Output filename (default: "system2_data_YYYY-MM-DD_HH-MM-SS.xlsx")
+            filename: Output filename (default: "system2_data_YYYYMMDD_HHMMSS" plus the format's extension)
+            fmt: 'xlsx', 'csv', 'parquet', 'feather', 'hdf5' or a registered format
+                (default: from the filename extension, else 'xlsx')
+            progress: Optional callback called with the fraction written (0 to 1)
             
         Returns:
-            The filename of the exported file
+            List of the written files (the file-per-data-type formats write several)
         """
+        if fmt is None:
+            fmt = data_export.format_for(filename) if filename else None
+            fmt = fmt or 'xlsx'
+        if fmt not in data_export.WRITERS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        writer, extension = data_export.WRITERS[fmt]
         if filename is None:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"system2_data_{timestamp}.xlsx"
-        
-        # Create a new workbook and select the active worksheet
-        wb = openpyxl.Workbook()
-        
-        # Create separate sheets for each data type
-        data_types = ["Temperatures", "Pressures", "Balances", "Flow_Rates"]
-        
-        # Dictionary to hold timestamps for each data type
-        all_timestamps_by_type = {}
+            filename = f"system2_data_{timestamp}{extension}"
+
+        # Align every data type first, this copies the data before the slow part
+        return writer(filename, self.export_tables(), progress)
+
+    def export_data(self, filename=None, progress=None):
+        """
+        Export all current data to a nicely formatted Excel file without timestamp column.
+        Only includes data sheets for each measurement type.
         
-        # First, collect all timestamps for each data type
-        for data_type in data_types:
-            dict_name = f"{data_type.lower()}_dict"
-            data_dict = getattr(self, dict_name)
-            
-            # Collect all timestamps for this data type
-            timestamps = set()
-            for name, var_value in data_dict.items():
-                if var_value[0] and var_value[1]:  # If series is active and visible
-                    timestamps.update([t for t, v in var_value[2] if t is not None])
-            
-            all_timestamps_by_type[data_type] = sorted(timestamps)
-        
-        # Now create and populate each sheet
-        for i, data_type in enumerate(data_types):
-            # Create a sheet for this data type
-            if i == 0:  # Use the default sheet for the first data type
-                ws = wb.active
-                ws.title = data_type
-            else:
-                ws = wb.create_sheet(title=data_type)
-            
-            # Reference the dictionary
-            dict_name = f"{data_type.lower()}_dict"
-            data_dict = getattr(self, dict_name)
-            
-            # Get sorted timestamps
-            timestamps = all_timestamps_by_type[data_type]
-            
-            # Style configuration
-            header_font = Font(bold=True, size=12)
-            header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-            thin_border = Border(
-                left=Side(style='thin'), 
-                right=Side(style='thin'), 
-                top=Side(style='thin'), 
-                bottom=Side(style='thin')
-            )
-            
-            # First row: Headers - now we'll only have Date/Time column and data columns
-            # Add date/time column header
-            ws.cell(row=1, column=1).value = "Date/Time"
-            ws.cell(row=1, column=1).font = header_font
-            ws.cell(row=1, column=1).fill = header_fill
-            ws.cell(row=1, column=1).alignment = header_alignment
-            ws.cell(row=1, column=1).border = thin_border
-            
-            # Add data series headers
-            col_idx = 2
-            series_indices = {}  # To track column indices for each series
-            
-            for name in data_dict:
-                if data_dict[name][0]:  # If the series is active
-                    ws.cell(row=1, column=col_idx).value = name
-                    ws.cell(row=1, column=col_idx).font = header_font
-                    ws.cell(row=1, column=col_idx).fill = header_fill
-                    ws.cell(row=1, column=col_idx).alignment = header_alignment
-                    ws.cell(row=1, column=col_idx).border = thin_border
-                    series_indices[name] = col_idx
-                    col_idx += 1
+        Args:
+            filename: Output filename (default: "system2_data_YYYYMMDD_HHMMSS.xlsx")
+            progress: Optional callback called with the fraction of rows written (0 to 1)
             
-            # Data rows
-            for row_idx, ts in enumerate(timestamps, start=2):
-                # Convert timestamp to readable datetime
-                dt = datetime.datetime.fromtimestamp(ts)
-                formatted_dt = dt.strftime("%Y-%m-%d %H:%M:%S")
-                
-                # Add datetime - no raw timestamp anymore
-                ws.cell(row=row_idx, column=1).value = formatted_dt
-                ws.cell(row=row_idx, column=1).border = thin_border
-                
-                # Add values for each series
-                for name, col_idx in series_indices.items():
-                    # Find the value at this timestamp
-                    value = None
-                    for t, v in data_dict[name][2]:
-                        if t == ts:
-                            value = v
-                            break
-                    
-                    # Add to the sheet
-                    if value is not None:
-                        ws.cell(row=row_idx, column=col_idx).value = value
-                        ws.cell(row=row_idx, column=col_idx).number_format = '0.0000'  # Format as number with 4 decimals
-                    ws.cell(row=row_idx, column=col_idx).border = thin_border
+        Returns:
+            The filename of the exported file
+        """
+        return self.export(filename, 'xlsx', progress)[0]
+
+    def export_data_in_background(self, filename=None, progress=None, done=None, fmt='xlsx'):
+        """
+        Run export() in a daemon thread so the GUI stays responsive.
+
+        The callbacks are called on the worker thread; GUI code should hand them over to
+        the Tk thread (e.g. with root.after).
+        
+        Args:
+            filename: Output filename (default: see export)
+            progress: Optional callback called with the fraction written
+            done: Optional callback called with (written files, None) on success or (None, error)
+            fmt: Export format (see export)
             
-            # Auto-adjust column widths
-            for col_idx in range(1, len(series_indices) + 2):
-                ws.column_dimensions[get_column_letter(col_idx)].width = 15
+        Returns:
+            The started thread
+        """
+        def worker():
+            try:
+                result = self.export(filename, fmt, progress)
+            except Exception as e:
+                print(f"Error exporting data: {e}")
+                if done is not None:
+                    done(None, e)
+                return
+            if done is not None:
+                done(result, None)
+
+        thread = threading.Thread(target=worker, name="DataExport")
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def load_session(self, samples):
+        """
+        Put recorded samples back into the series, e.g. from session_recorder.load_session().
+        Samples newer than the first one already in a series are dropped, so the live data
+        recorded since startup stays in time order after the reloaded history. A series
+        that fails to load is left as it was (see Series.load_history).
+        
+        Args:
+            samples: {(dict_type, name): (timestamps, values)}
             
-            # Freeze the header row
-            ws.freeze_panes = "A2"
-        
-        # Save the workbook
-        try:
-            wb.save(filename)
-            return filename
-        except PermissionError:
-            # If file is open in another program, create a new filename
-            base_name, ext = os.path.splitext(filename)
-            new_filename = f"{base_name}_new{ext}"
-            wb.save(new_filename)
-            return new_filename
+        Returns:
+            Number of samples loaded
+        """
+        loaded = 0
+        for (dict_type, name), (times, values) in samples.items():
+            d = self.get_dict_type(dict_type)
+            if not d or name not in d:
+                continue
+            try:
+                loaded += d[name][2].load_history(times, values)
+            except Exception as e:
+                print(f"Error loading recorded {dict_type} of {name}: {e}")
+        with self._snapshot_lock:
+            self._resnapshot = True
+        self._data_event.set()
+        return loaded
 
     def clear_data(self, dict_type=None, name=None):
         """
@@ -415,7 +1405,7 @@ class Graph:
             # Clear all data
             for label, data_dict in self.data_dicts:
                 for name in data_dict:
-                    data_dict[name][2] = []
+                    data_dict[name][2].clear()
             # Reset value ranges
             for plot_type in self.value_ranges:
                 self.value_ranges[plot_type] = {'min': float('inf'), 'max': float('-inf')}
@@ -425,7 +1415,7 @@ class Graph:
             d = self.get_dict_type(dict_type)
             if d:
                 for name in d:
-                    d[name][2] = []
+                    d[name][2].clear()
                 # Reset value range for this type
                 plot_type = dict_type.capitalize()
                 self.value_ranges[plot_type] = {'min': float('inf'), 'max': float('-inf')}
@@ -433,7 +1423,7 @@ class Graph:
             # Clear only the specified series
             d = self.get_dict_type(dict_type)
             if d and name in d:
-                d[name][2] = []
+                d[name][2].clear()
                 # We'll recalculate min/max on next update
 
     def stop_plotting(self, stop=True):
@@ -445,6 +1435,102 @@ class Graph:
         """
         self.gui_plot_stopped = stop
 
+class RenderScheduler:
+    """
+    Draws Graph frames on the Tk main loop with root.after at a target frame rate.
+
+    A worker thread (Graph.snapshot_loop) prepares the data snapshots; this class only
+    touches Matplotlib from the Tk thread. A frame is skipped when no series changed, and
+    frame deadlines that passed while a frame (or the Tk event loop) overran its budget
+    are dropped rather than caught up.
+    """
+    def __init__(self, root, graph, plots, canvas, fig=None, fps=10.0, status_var=None):
+        """
+        Args:
+            root: Tk root window whose after() drives the frames
+            graph: Graph object to render
+            plots: List of matplotlib subplot axes
+            canvas: FigureCanvasTkAgg to draw on
+            fig: Figure object (optional)
+            fps: Target frame rate (default: 10.0)
+            status_var: Optional tk.StringVar that shows the frame counters about once per second
+        """
+        self.root = root
+        self.graph = graph
+        self.plots = plots
+        self.canvas = canvas
+        self.fig = fig
+        self.period = 1.0 / fps
+        self.status_var = status_var
+
+        self.frames = 0
+        self.dropped = 0
+        self.idle = 0
+        self._deadline = None
+        self._after_id = None
+        self._last_status = 0.0
+
+    def start(self):
+        """Start scheduling frames (call from the Tk thread)."""
+        if self._after_id is None:
+            self._deadline = time.perf_counter() + self.period
+            self._after_id = self.root.after(int(self.period * 1000), self._tick)
+
+    def stop(self):
+        """Stop scheduling frames."""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def set_fps(self, fps):
+        """Set the target frame rate."""
+        self.period = 1.0 / fps
+
+    def stats(self):
+        """
+        Get the frame counters.
+
+        Returns:
+            Dictionary with frames (drawn), dropped (deadlines missed), idle (skipped, nothing
+            changed) and the Graph frame time statistics (see Graph.frame_stats)
+        """
+        stats = {'frames': self.frames, 'dropped': self.dropped, 'idle': self.idle}
+        stats.update({f'frame_{key}': value for key, value in self.graph.frame_stats().items()})
+        return stats
+
+    def _tick(self):
+        self._after_id = None
+        if not self.graph.gui_plot_stopped:
+            snapshot = self.graph.take_snapshot()
+            if snapshot is None and not self.graph.needs_redraw():
+                self.idle += 1
+            else:
+                try:
+                    self.graph.render_snapshot(self.plots, self.canvas, self.fig, snapshot)
+                    self.frames += 1
+                except Exception as e:
+                    print(f"Error drawing graph: {e}")
+
+        # Fixed-rate deadlines; the ones already missed are dropped, not caught up
+        now = time.perf_counter()
+        self._deadline += self.period
+        if now > self._deadline:
+            missed = int((now - self._deadline) / self.period) + 1
+            self.dropped += missed
+            self._deadline += missed * self.period
+
+        if self.status_var is not None and now - self._last_status >= 1.0:
+            self._last_status = now
+            self.status_var.set(self.status_text())
+
+        self._after_id = self.root.after(max(1, int((self._deadline - now) * 1000)), self._tick)
+
+    def status_text(self):
+        """One-line summary of the frame counters for the status area."""
+        stats = self.graph.frame_stats()
+        return (f"Frames: {self.frames}  dropped: {self.dropped}  idle: {self.idle}  "
+                f"frame time: {stats['last'] * 1000:.1f} ms (p95 {stats['p95'] * 1000:.1f} ms)")
+
 class DataCollector:
     """
     A class to synchronize data collection and ensure all sensors are read together
@@ -459,6 +1545,7 @@ class DataCollector:
         """
         self.graph = graph
         self.collection_interval = 1.0  # 1 second interval
+        self.recorder = None  # Optional session_recorder.SessionRecorder that gets every tick
         self.running = False
         self.thread = None
         
@@ -527,19 +1614,24 @@ class DataCollector:
             for name, value in temp_data.items():
                 if self.graph.temperatures_dict.get(name) and self.graph.temperatures_dict[name][0] and self.graph.temperatures_dict[name][1]:
                     # Replace the automatic timestamp with our synchronized one
-                    self.graph.temperatures_dict[name][2].append((timestamp, value))
+                    self.graph.temperatures_dict[name][2].append(timestamp, value)
             
             for name, value in press_data.items():
                 if self.graph.pressures_dict.get(name) and self.graph.pressures_dict[name][0] and self.graph.pressures_dict[name][1]:
-                    self.graph.pressures_dict[name][2].append((timestamp, value))
+                    self.graph.pressures_dict[name][2].append(timestamp, value)
             
             for name, value in flow_data.items():
                 if self.graph.flow_rates_dict.get(name) and self.graph.flow_rates_dict[name][0] and self.graph.flow_rates_dict[name][1]:
-                    self.graph.flow_rates_dict[name][2].append((timestamp, value))
+                    self.graph.flow_rates_dict[name][2].append(timestamp, value)
             
             for name, value in bal_data.items():
                 if self.graph.balances_dict.get(name) and self.graph.balances_dict[name][0] and self.graph.balances_dict[name][1]:
-                    self.graph.balances_dict[name][2].append((timestamp, value))
+                    self.graph.balances_dict[name][2].append(timestamp, value)
+
+            # Persist the whole tick with the same timestamp
+            if self.recorder is not None:
+                self.recorder.record_tick(timestamp, {"temperatures": temp_data, "pressures": press_data,
+                                                      "flow_rates": flow_data, "balances": bal_data})
             
             # Sleep for the collection interval
             time.sleep(self.collection_interval)
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Frame time benchmark for Graph rendering, without a GUI (Agg backend).
+
+Feeds S synthetic series spread over the four plot categories at a fixed
+sample rate and renders frames in the 'full' or 'blit' mode, reporting the
+frame time percentiles and the frame rate the renderer could sustain. The
+series use the same raw buffer and rolled-up tiers as the GUI.
+
+Examples:
+    python benchmark_graph.py --series 40 --mode full
+    python benchmark_graph.py --series 40 --mode blit --save frame.png
+    python benchmark_graph.py --series 40 --points 172800 --sample-rate 1 --window 172800   # 48 h run
+"""
+import argparse
+import math
+import random
+import time
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from System2_utils import Graph, Series
+
+CATEGORIES = ['temperatures', 'pressures', 'balances', 'flow_rates']
+RAW_POINTS = 7200
+HISTORY_TIERS = ((10, 4320), (60, 2880))
+
+
+def run(args):
+    dicts = {category: {} for category in CATEGORIES}
+    for i in range(args.series):
+        dicts[CATEGORIES[i % 4]][f"{CATEGORIES[i % 4]}_{i}"] = [True, True, Series(RAW_POINTS, HISTORY_TIERS)]
+
+    graph = Graph(dicts['temperatures'], dicts['pressures'], dicts['balances'], dicts['flow_rates'],
+                  max_points=RAW_POINTS, render_mode=args.mode)
+    graph.set_time_window(args.window)
+    fig, plots = plt.subplots(2, 2, figsize=(10, 8))
+    plots = plots.flatten()
+    canvas = fig.canvas
+
+    # Pre-fill the history so every frame draws full-length lines
+    now = time.time()
+    graph.start_time = now - args.points / args.sample_rate
+    for category, d in dicts.items():
+        for j, (name, series) in enumerate(d.items()):
+            for k in range(args.points):
+                t = graph.start_time + k / args.sample_rate
+                series[2].append(t, 20 + j + math.sin(t / 10) + random.gauss(0, 0.05))
+
+    rng = random.Random(0)
+    skipped = 0
+    for frame in range(args.warmup + args.frames):
+        if frame == args.warmup:
+            graph.frame_times.clear()
+        # New samples arrive between frames for a fraction of the series
+        t = time.time()
+        for category, d in dicts.items():
+            for j, (name, series) in enumerate(d.items()):
+                if rng.random() < args.updated:
+                    series[2].append(t, 20 + j + math.sin(t / 10) + rng.gauss(0, 0.05))
+        if not graph.render_frame(plots, canvas, fig) and frame >= args.warmup:
+            skipped += 1  # Nothing arrived, the frame was not drawn
+
+    stats = graph.frame_stats()
+    print(f"Mode: {args.mode}, {args.series} series x {args.points} points, {args.window:g} s window, "
+          f"{100 * args.updated:.0f}% of series updated per frame")
+    print(f"Frame time: mean {stats['mean'] * 1000:.1f} ms, p95 {stats['p95'] * 1000:.1f} ms, "
+          f"max {stats['max'] * 1000:.1f} ms -> {stats['fps']:.1f} fps, "
+          f"{skipped} of {args.frames} frames skipped")
+    if args.save:
+        # Save the rendered buffer, savefig would redraw without the animated (blitted) lines
+        plt.imsave(args.save, canvas.buffer_rgba())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Graph frame times on the Agg backend")
+    parser.add_argument('--series', type=int, default=40, help="Number of series over the four plots")
+    parser.add_argument('--points', type=int, default=1000, help="Samples fed to each series before measuring")
+    parser.add_argument('--sample-rate', type=float, default=2.0, help="Samples per second in the pre-filled history")
+    parser.add_argument('--updated', type=float, default=1.0, help="Fraction of series with a new sample per frame")
+    parser.add_argument('--window', type=float, default=120.0, help="Graph time window in seconds")
+    parser.add_argument('--mode', choices=['full', 'blit'], default='blit')
+    parser.add_argument('--frames', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--save', default=None, help="Save the last frame to this image file")
+    args = parser.parse_args()
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
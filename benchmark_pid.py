@@ -0,0 +1,141 @@
+"""
+Tick timing benchmark for the PIDExecutor.
+
+Runs N PID loops in one PIDExecutor, the way the GUI does: every loop reads a
+balance on its own pseudo-terminal, fed with continuous-output lines of a
+draining reservoir, and drives a channel of an emulated Reglo pump
+(reglo_emulator.py, four channels per pump). Optionally other threads render
+Graph frames on the Agg backend meanwhile to load the interpreter the way the
+GUI does. Reports the tick counts, the latency and jitter percentiles and
+histograms, and the pump writes. Needs pseudo-terminals (Linux/macOS).
+
+Examples:
+    python benchmark_pid.py --rate 10 --duration 10
+    python benchmark_pid.py --rate 20 --loops 24 --load 2 --policy catchup
+    python benchmark_pid.py --rate 20 --loops 24 --robust
+"""
+import argparse
+import math
+import os
+import threading
+import time
+import tty
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from pid_control import PIDExecutor
+from reglo_emulator import RegloEmulator
+from System2_Equipment import Pump
+from System2_utils import Graph, Series
+
+
+def render_load(stop, series=40):
+    """Render blitted Graph frames with new samples until stop is set."""
+    dicts = [{} for _ in range(4)]
+    for i in range(series):
+        dicts[i % 4][f"s{i}"] = [True, True, Series(2000)]
+    graph = Graph(*dicts, max_points=2000, render_mode='blit')
+    fig, plots = plt.subplots(2, 2, figsize=(10, 8))
+    plots = plots.flatten()
+    while not stop.is_set():
+        t = time.time()
+        for d in dicts:
+            for j, entry in enumerate(d.values()):
+                entry[2].append(t, j + math.sin(t))
+        graph.render_frame(plots, fig.canvas, fig)
+
+
+def feed_balances(stop, masters, rate, flow=1.0):
+    """Write one A&D style reading per balance every 1 / rate seconds, mass falling at flow mL/min."""
+    mass = [100.0] * len(masters)
+    period = 1.0 / rate
+    deadline = time.monotonic()
+    while not stop.is_set():
+        for i, master in enumerate(masters):
+            mass[i] -= flow * period / 60.0
+            os.write(master, f"ST,+{mass[i]:08.2f}  g\r\n".encode('ascii'))
+        deadline += period
+        stop.wait(max(0.0, deadline - time.monotonic()))
+
+
+def run(args):
+    # One pty per balance; the executor opens the slave side like a COM port
+    balances = [os.openpty() for _ in range(args.loops)]
+    for master, slave in balances:
+        tty.setraw(slave)
+    emulators = [RegloEmulator(latency=args.latency) for _ in range(math.ceil(args.loops / 4))]
+    pumps = [Pump(emulator.start()) for emulator in emulators]
+
+    executor = PIDExecutor(rate=args.rate, policy=args.policy)
+    controller = {'set_point': 1.0, 'kp': 0.1, 'ki': 0.01, 'kd': 0.01, 'integral_error_limit': 5.0}
+    for i, (master, slave) in enumerate(balances):
+        executor.add_loop(f"Loop_{i}", os.ttyname(slave), pumps[i // 4], i % 4 + 1, controller,
+                          robust=args.robust)
+
+    stop = threading.Event()
+    threads = []
+    feeder = threading.Thread(target=feed_balances, args=(stop, [master for master, slave in balances],
+                                                          args.balance_rate))
+    feeder.daemon = True
+    feeder.start()
+    threads.append(feeder)
+    for _ in range(args.load):
+        loader = threading.Thread(target=render_load, args=(stop,))
+        loader.daemon = True
+        loader.start()
+        threads.append(loader)
+
+    executor.start()
+    time.sleep(args.duration)
+    thread_count = threading.active_count()  # The balances are all read on the one EquipmentLoop thread
+    executor.scheduler.stop()
+    executor.thread.join()
+    stop.set()
+    for thread in threads:
+        thread.join()  # Agg must not be mid-frame when the interpreter shuts down
+
+    stats = executor.tick_stats()
+    histograms = executor.scheduler.histograms()
+    outputs = [executor.get_last(name)[2] for name in executor.loops()]
+    executor.stop()
+    writes = sum(emulator.commands for emulator in emulators)
+    for pump in pumps:
+        pump.close()
+    for emulator in emulators:
+        emulator.stop()
+    for master, slave in balances:
+        os.close(master)
+        os.close(slave)
+
+    print(f"{args.loops} {'robust ' if args.robust else ''}loops at {args.rate:g} Hz ({args.policy}) "
+          f"for {args.duration:g} s with {args.load} rendering threads")
+    print(f"Ticks: {stats['ticks']}, dropped: {stats['dropped']}, late: {stats['late']}, "
+          f"overruns: {stats['overruns']}")
+    for name in ('latency', 'jitter'):
+        p = stats[name]
+        print(f"{name.capitalize()}: p50 {p['p50'] * 1000:.2f} ms, p95 {p['p95'] * 1000:.2f} ms, "
+              f"p99 {p['p99'] * 1000:.2f} ms, max {p['max'] * 1000:.2f} ms")
+    print(f"{'bin':>14} {'latency':>8} {'jitter':>8}")
+    for label, latency, jitter in histograms:
+        if latency or jitter:
+            print(f"{label:>14} {latency:>8} {jitter:>8}")
+    print(f"Pump commands: {writes}, loops with a PID output: {sum(output is not None for output in outputs)}")
+    print(f"Threads while running: {thread_count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PIDExecutor tick timing under rendering load")
+    parser.add_argument('--rate', type=float, default=10.0, help="Control ticks per second")
+    parser.add_argument('--loops', type=int, default=4, help="PID loops in the executor (4 per emulated pump)")
+    parser.add_argument('--balance-rate', type=float, default=10.0, help="Readings per second of each balance")
+    parser.add_argument('--latency', type=float, default=0.005, help="Emulator processing delay in seconds")
+    parser.add_argument('--load', type=int, default=1, help="Threads rendering graph frames meanwhile")
+    parser.add_argument('--policy', choices=['drop', 'catchup'], default='drop')
+    parser.add_argument('--duration', type=float, default=10.0, help="Measurement time in seconds")
+    parser.add_argument('--robust', action='store_true', help="Use the robust flow rate estimator")
+    args = parser.parse_args()
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
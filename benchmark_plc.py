@@ -0,0 +1,148 @@
+"""
+Load benchmark for the PLC wrappers against plc_emulator.py.
+
+Polls N float sensors at M Hz through the real ReadFloatsPLC class (block scan
+groups or the old one-thread-per-sensor read_float path), optionally while
+writing floats and coils through WriteFloatsPLC/OneBitClass, and reports the
+achieved sample rate, Modbus transaction latency percentiles and client CPU use.
+
+Examples:
+    python benchmark_plc.py --sensors 50 --rate 10 --duration 10
+    python benchmark_plc.py --sensors 50 --rate 2 --mode per-sensor --latency 0.002
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+from System2_Equipment import ReadFloatsPLC, WriteFloatsPLC, OneBitClass
+
+FIRST_REGISTER = 28710
+
+
+def start_emulator(port, sensors, latency, jitter):
+    """Start plc_emulator.py in a subprocess so its CPU time is not counted."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plc_emulator.py')
+    proc = subprocess.Popen(
+        [sys.executable, script, '--port', str(port), '--sensors', str(sensors),
+         '--latency', str(latency), '--jitter', str(jitter)],
+        stdout=subprocess.PIPE, text=True)
+    print(proc.stdout.readline().strip())  # Wait until it is listening
+    return proc
+
+
+def percentiles(values, ps=(50, 95, 99)):
+    if not values:
+        return {p: float('nan') for p in ps}
+    return dict(zip(ps, np.percentile(values, ps)))
+
+
+def run(args):
+    reader = ReadFloatsPLC(args.host, args.port)
+    reader.connect()
+    reader.reading_onoff(True)
+
+    registers = [FIRST_REGISTER + 2 * i for i in range(args.sensors)]
+    counts = dict.fromkeys(registers, 0)
+    lock = threading.Lock()
+
+    def make_callback(reg):
+        def callback(value):
+            with lock:
+                counts[reg] += 1
+        return callback
+
+    callbacks = {reg: make_callback(reg) for reg in registers}
+    interval = 1.0 / args.rate
+    if args.mode == 'scan':
+        threads = [threading.Thread(target=reader.read_floats, args=(callbacks, interval))]
+    else:
+        threads = [threading.Thread(target=reader.read_float, args=(cb, reg, reg + 1, interval))
+                   for reg, cb in callbacks.items()]
+    for t in threads:
+        t.daemon = True
+        t.start()
+
+    write_latencies = []
+    stop_writes = threading.Event()
+    if args.writes:
+        float_writer = WriteFloatsPLC(args.host, args.port)
+        coil_writer = OneBitClass(args.host, args.port)
+
+        def write_loop():
+            i = 0
+            while not stop_writes.is_set():
+                futures = [float_writer.write_float(28790 + 2 * (i % 3), float(i)),
+                           coil_writer.write_onoff(8352 + i % 6, bool(i % 2))]
+                for f in futures:
+                    f.add_done_callback(lambda f: f.exception() is None and write_latencies.append(f.result()))
+                i += 1
+                time.sleep(1.0 / args.writes)
+
+        writer = threading.Thread(target=write_loop)
+        writer.daemon = True
+        writer.start()
+
+    time.sleep(args.warmup)
+    with lock:
+        for reg in counts:
+            counts[reg] = 0
+    write_latencies.clear()
+    reader.client.reset_stats()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    time.sleep(args.duration)
+
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    stats = reader.client.stats()
+    with lock:
+        samples = sum(counts.values())
+    stop_writes.set()
+    reader.reading_onoff(False)
+
+    print(f"\nMode: {args.mode}, {args.sensors} sensors at {args.rate:g} Hz for {wall:.1f} s")
+    print(f"Samples: {samples / wall:.1f}/s total, {samples / wall / args.sensors:.2f} Hz per sensor "
+          f"(target {args.rate:g} Hz)")
+    print(f"Modbus transactions: {stats['requests'] / wall:.1f}/s, errors: {stats['errors']}")
+    print(f"Transaction latency: p50 {stats['p50_latency'] * 1000:.2f} ms, p95 {stats['p95_latency'] * 1000:.2f} ms, "
+          f"p99 {stats['p99_latency'] * 1000:.2f} ms, max {stats['max_latency'] * 1000:.2f} ms")
+    if args.writes:
+        p = percentiles(write_latencies)
+        print(f"Write completion latency ({len(write_latencies)} writes): p50 {p[50] * 1000:.2f} ms, "
+              f"p95 {p[95] * 1000:.2f} ms, p99 {p[99] * 1000:.2f} ms")
+    print(f"Client CPU: {100 * cpu / wall:.1f}% of one core")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PLC wrappers against the PLC emulator")
+    parser.add_argument('--sensors', type=int, default=6, help="Number of float sensors (N)")
+    parser.add_argument('--rate', type=float, default=2.0, help="Poll rate per sensor in Hz (M)")
+    parser.add_argument('--mode', choices=['scan', 'per-sensor'], default='scan',
+                        help="read_floats scan groups or one read_float thread per sensor")
+    parser.add_argument('--writes', type=float, default=0.0, help="Float + coil writes per second")
+    parser.add_argument('--duration', type=float, default=10.0, help="Measurement time in seconds")
+    parser.add_argument('--warmup', type=float, default=1.0, help="Time before measuring in seconds")
+    parser.add_argument('--host', default=None, help="Use a running PLC or emulator instead of starting one")
+    parser.add_argument('--port', type=int, default=5020)
+    parser.add_argument('--latency', type=float, default=0.002, help="Emulator response delay in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0005, help="Emulator delay jitter in seconds")
+    args = parser.parse_args()
+
+    emulator = None
+    if args.host is None:
+        args.host = '127.0.0.1'
+        emulator = start_emulator(args.port, args.sensors, args.latency, args.jitter)
+    try:
+        run(args)
+    finally:
+        if emulator is not None:
+            emulator.terminate()
+            emulator.wait()
+
+
+if __name__ == '__main__':
+    main()
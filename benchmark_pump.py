@@ -0,0 +1,144 @@
+"""
+Load benchmark for the Reglo ICC Pump wrapper against reglo_emulator.py.
+
+Polls the flow rate of N channels through PumpSpeedPoller at an aggregate rate
+while one or more PID-style writers call set_speed at the PID priority, and
+reports the achieved command rate, serial round-trip percentiles, scheduler
+queueing and the end-to-end latency of the PID writes.
+
+Examples:
+    python benchmark_pump.py --channels 4 --poll-rate 8 --pid-rate 2 --duration 10
+    python benchmark_pump.py --channels 4 --poll-rate 40 --pid-rate 4 --latency 0.01
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+from System2_Equipment import Pump, PumpSpeedPoller
+
+
+class RecordingPump(Pump):
+    """Pump that keeps the round-trip time of every serial transaction."""
+    def __init__(self, port_number, command_timeout=0.5):
+        self.rtts = []
+        super().__init__(port_number, command_timeout)
+
+    def transact(self, command, timeout=None):
+        reply = super().transact(command, timeout)
+        self.rtts.append(reply.rtt)
+        return reply
+
+
+def start_emulator(latency, jitter):
+    """Start reglo_emulator.py in a subprocess and return it with its device path."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reglo_emulator.py')
+    proc = subprocess.Popen(
+        [sys.executable, script, '--latency', str(latency), '--jitter', str(jitter)],
+        stdout=subprocess.PIPE, text=True)
+    return proc, proc.stdout.readline().strip()
+
+
+def percentiles(values, ps=(50, 95, 99)):
+    if not values:
+        return {p: float('nan') for p in ps}
+    return dict(zip(ps, np.percentile(values, ps)))
+
+
+def run(args):
+    pump = RecordingPump(args.port)
+    pump.set_independent_channel_control()
+
+    readings = []
+    poller = PumpSpeedPoller(pump, lambda name, value: readings.append(value), rate=args.poll_rate)
+    for channel in range(1, args.channels + 1):
+        poller.add_channel(channel, f"Pump_Ch{channel}")
+
+    write_latencies = []
+    stop_writes = threading.Event()
+
+    def pid_loop(channel):
+        i = 0
+        while not stop_writes.is_set():
+            start = time.perf_counter()
+            try:
+                pump.set_speed(channel, 1.0 + (i % 50) / 10.0, priority=pump.PRIORITY_PID)
+                write_latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                print(f"PID write failed: {e}")
+            i += 1
+            time.sleep(max(0.0, 1.0 / args.pid_rate - (time.perf_counter() - start)))
+
+    writers = []
+    if args.pid_rate > 0:
+        for channel in range(1, args.pid_loops + 1):
+            writer = threading.Thread(target=pid_loop, args=(channel,))
+            writer.daemon = True
+            writer.start()
+            writers.append(writer)
+
+    time.sleep(args.warmup)
+    readings.clear()
+    write_latencies.clear()
+    pump.rtts.clear()
+    pump.scheduler.reset_stats()
+    wall_start = time.perf_counter()
+
+    time.sleep(args.duration)
+
+    wall = time.perf_counter() - wall_start
+    rtts = list(pump.rtts)
+    sched = pump.scheduler.stats()
+    reads = len(readings)
+    writes = list(write_latencies)
+    stop_writes.set()
+    poller.stop()
+    for writer in writers:
+        writer.join(1.0)
+    pump.close()
+
+    p = percentiles(rtts)
+    print(f"\n{args.channels} channels polled at {args.poll_rate:g} reads/s, "
+          f"{len(writers)} PID writers at {args.pid_rate:g} Hz for {wall:.1f} s")
+    print(f"Serial commands: {len(rtts) / wall:.1f}/s, speed reads: {reads / wall:.1f}/s "
+          f"(target {args.poll_rate:g}/s), PID writes: {len(writes) / wall:.1f}/s")
+    print(f"Round-trip time: p50 {p[50] * 1000:.2f} ms, p95 {p[95] * 1000:.2f} ms, "
+          f"p99 {p[99] * 1000:.2f} ms, max {max(rtts, default=float('nan')) * 1000:.2f} ms")
+    print(f"Scheduler: utilization {100 * sched['utilization']:.0f}%, mean wait {sched['mean_wait'] * 1000:.2f} ms, "
+          f"p95 wait {sched['p95_wait'] * 1000:.2f} ms, max depth {sched['max_queue_depth']}, "
+          f"collapsed {sched['collapsed']}")
+    if writes:
+        p = percentiles(writes)
+        print(f"PID write latency ({len(writes)} writes): p50 {p[50] * 1000:.2f} ms, "
+              f"p95 {p[95] * 1000:.2f} ms, p99 {p[99] * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Reglo pump wrapper against the pump emulator")
+    parser.add_argument('--channels', type=int, default=4, help="Number of polled channels")
+    parser.add_argument('--poll-rate', type=float, default=8.0, help="Aggregate speed reads per second")
+    parser.add_argument('--pid-rate', type=float, default=2.0, help="set_speed calls per second per PID writer")
+    parser.add_argument('--pid-loops', type=int, default=1, help="Number of PID writers (one channel each)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Measurement time in seconds")
+    parser.add_argument('--warmup', type=float, default=1.0, help="Time before measuring in seconds")
+    parser.add_argument('--port', default=None, help="Use a real pump or running emulator instead of starting one")
+    parser.add_argument('--latency', type=float, default=0.005, help="Emulator processing delay in seconds")
+    parser.add_argument('--jitter', type=float, default=0.001, help="Emulator delay jitter in seconds")
+    args = parser.parse_args()
+
+    emulator = None
+    if args.port is None:
+        emulator, args.port = start_emulator(args.latency, args.jitter)
+        print(f"Reglo emulator on {args.port}")
+    try:
+        run(args)
+    finally:
+        if emulator is not None:
+            emulator.terminate()
+            emulator.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+"""
+File writers for exporting graph data.
+
+Every writer takes the aligned tables of Graph.export_tables() - a list of
+(data_type, timestamps, names, columns) with one table per data type - and
+writes them without per-sample Python work where the format allows it:
+
+    xlsx     Excel workbook, one sheet per data type (openpyxl, write-only mode)
+    csv      One CSV file per data type, written in chunks
+    parquet  One Parquet file per data type (pyarrow)
+    feather  One Arrow IPC/Feather file per data type (pyarrow)
+    hdf5     One HDF5 file with a group per data type and a dataset per column (h5py)
+
+The columnar formats store the raw Unix time in seconds in a "Timestamp"
+column and leave missing samples as NaN. pyarrow and h5py are optional and
+only imported when their format is used; available_writers() lists the formats
+whose backend is installed. New formats can be added with register_writer().
+"""
+import datetime
+import importlib.util
+import io
+import os
+import numpy as np
+import openpyxl
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+CSV_CHUNK_ROWS = 50000
+
+
+def _report(progress, fraction):
+    if progress is not None:
+        progress(fraction)
+
+
+def _table_path(filename, data_type, ext):
+    """'run.csv' -> 'run_Temperatures.csv' for the formats that write one file per data type."""
+    base, _ = os.path.splitext(filename)
+    return f"{base}_{data_type}{ext}"
+
+
+def write_excel(filename, tables, progress=None):
+    """
+    Write a formatted Excel workbook with one sheet per data type and a Date/Time column.
+
+    Rows are streamed with openpyxl's write-only mode and shared named styles, so memory
+    stays flat and the time grows linearly with the number of cells.
+
+    Args:
+        filename: Output .xlsx file
+        tables: Aligned tables from Graph.export_tables()
+        progress: Optional callback called with the fraction of rows written (0 to 1)
+
+    Returns:
+        List with the written filename (renamed to *_new.xlsx if the file is open elsewhere)
+    """
+    total_rows = sum(len(timestamps) for data_type, timestamps, names, columns in tables) or 1
+
+    wb = openpyxl.Workbook(write_only=True)
+
+    # Style configuration, registered once and referenced by name from every cell
+    thin_border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    header_style = NamedStyle(name="export_header", font=Font(bold=True, size=12), border=thin_border,
+                              fill=PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid"),
+                              alignment=Alignment(horizontal="center", vertical="center", wrap_text=True))
+    time_style = NamedStyle(name="export_time", border=thin_border)
+    value_style = NamedStyle(name="export_value", border=thin_border, number_format='0.0000')
+    for style in (header_style, time_style, value_style):
+        wb.add_named_style(style)
+
+    def styled(ws, value, style):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
+
+    rows_written = 0
+    for data_type, timestamps, names, columns in tables:
+        ws = wb.create_sheet(title=data_type)
+
+        # Column widths and the frozen header row must be set before any row is written
+        for col_idx in range(1, len(names) + 2):
+            ws.column_dimensions[get_column_letter(col_idx)].width = 15
+        ws.freeze_panes = "A2"
+
+        # Headers: Date/Time column and one column per active series
+        ws.append([styled(ws, header, "export_header") for header in ["Date/Time"] + names])
+
+        # Data rows, one cell per series; missing samples are left empty but keep the border.
+        # Rows are serialized on append, so one row of styled cells is reused for all of them
+        cells = [styled(ws, None, "export_time")] + [styled(ws, None, "export_value") for name in names]
+        values = columns.tolist()  # Python floats, NaN where a series has no sample
+        for ts, row in zip(timestamps.tolist(), values):
+            cells[0].value = datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+            for cell, value in zip(cells[1:], row):
+                cell.value = None if value != value else value
+            ws.append(cells)
+
+            rows_written += 1
+            if rows_written % 1000 == 0:
+                _report(progress, rows_written / total_rows)
+
+    # Save the workbook
+    try:
+        wb.save(filename)
+    except PermissionError:
+        # If file is open in another program, create a new filename
+        base_name, ext = os.path.splitext(filename)
+        filename = f"{base_name}_new{ext}"
+        wb.save(filename)
+    _report(progress, 1.0)
+    return [filename]
+
+
+def write_csv(filename, tables, progress=None, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Write one CSV file per data type: a Timestamp column (Unix seconds) and one column per
+    series, missing samples left empty. Rows are formatted by np.savetxt in chunks of
+    chunk_rows, so memory stays bounded.
+
+    Args:
+        filename: Base filename; data types are appended, e.g. run_Temperatures.csv
+        tables: Aligned tables from Graph.export_tables()
+        progress: Optional callback called with the fraction of rows written (0 to 1)
+        chunk_rows: Rows formatted per chunk
+
+    Returns:
+        List of the written filenames
+    """
+    total_rows = sum(len(timestamps) for data_type, timestamps, names, columns in tables) or 1
+    rows_written = 0
+    paths = []
+    for data_type, timestamps, names, columns in tables:
+        path = _table_path(filename, data_type, '.csv')
+        with open(path, 'w', newline='') as f:
+            f.write(','.join(['Timestamp'] + [f'"{name}"' for name in names]) + '\n')
+            # Microsecond timestamps, 10 significant digits for the values
+            fmt = ['%.6f'] + ['%.10g'] * len(names)
+            for start in range(0, len(timestamps), chunk_rows):
+                block = np.column_stack((timestamps[start:start + chunk_rows], columns[start:start + chunk_rows]))
+                buf = io.StringIO()
+                np.savetxt(buf, block, fmt=fmt, delimiter=',')
+                f.write(buf.getvalue().replace('nan', ''))
+                rows_written += len(block)
+                _report(progress, rows_written / total_rows)
+        paths.append(path)
+    _report(progress, 1.0)
+    return paths
+
+
+def _arrow_table(timestamps, names, columns):
+    import pyarrow as pa
+    arrays = [pa.array(timestamps)] + [pa.array(columns[:, i]) for i in range(len(names))]
+    return pa.Table.from_arrays(arrays, names=['Timestamp'] + names)
+
+
+def write_parquet(filename, tables, progress=None, compression='zstd'):
+    """
+    Write one Parquet file per data type with a Timestamp column and one column per series.
+
+    Args:
+        filename: Base filename; data types are appended, e.g. run_Temperatures.parquet
+        tables: Aligned tables from Graph.export_tables()
+        progress: Optional callback called with the fraction of tables written
+        compression: Parquet compression codec ('zstd', 'snappy', 'gzip' or None)
+
+    Returns:
+        List of the written filenames
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    paths = []
+    for i, (data_type, timestamps, names, columns) in enumerate(tables):
+        path = _table_path(filename, data_type, '.parquet')
+        pq.write_table(_arrow_table(timestamps, names, columns), path, compression=compression)
+        paths.append(path)
+        _report(progress, (i + 1) / len(tables))
+    return paths
+
+
+def write_feather(filename, tables, progress=None, compression='lz4'):
+    """
+    Write one Arrow IPC (Feather v2) file per data type with a Timestamp column and one
+    column per series.
+
+    Args:
+        filename: Base filename; data types are appended, e.g. run_Temperatures.feather
+        tables: Aligned tables from Graph.export_tables()
+        progress: Optional callback called with the fraction of tables written
+        compression: 'lz4', 'zstd' or 'uncompressed'
+
+    Returns:
+        List of the written filenames
+    """
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        raise ImportError("Feather export needs pyarrow (pip install pyarrow)")
+
+    paths = []
+    for i, (data_type, timestamps, names, columns) in enumerate(tables):
+        path = _table_path(filename, data_type, '.feather')
+        feather.write_feather(_arrow_table(timestamps, names, columns), path, compression=compression)
+        paths.append(path)
+        _report(progress, (i + 1) / len(tables))
+    return paths
+
+
+def write_hdf5(filename, tables, progress=None, compression='gzip'):
+    """
+    Write one HDF5 file with a group per data type. Each group holds a Timestamp dataset
+    and one dataset per series, all of the same length.
+
+    Args:
+        filename: Output .h5 file
+        tables: Aligned tables from Graph.export_tables()
+        progress: Optional callback called with the fraction of tables written
+        compression: h5py dataset compression ('gzip', 'lzf' or None)
+
+    Returns:
+        List with the written filename
+    """
+    try:
+        import h5py
+    except ImportError:
+        raise ImportError("HDF5 export needs h5py (pip install h5py)")
+
+    with h5py.File(filename, 'w') as f:
+        for i, (data_type, timestamps, names, columns) in enumerate(tables):
+            group = f.create_group(data_type)
+            group.attrs['columns'] = np.array(['Timestamp'] + names, dtype=h5py.string_dtype())  # Column order
+            group.create_dataset('Timestamp', data=timestamps, compression=compression)
+            for col, name in enumerate(names):
+                group.create_dataset(name.replace('/', '_'), data=np.ascontiguousarray(columns[:, col]),
+                                     compression=compression)
+            _report(progress, (i + 1) / len(tables))
+    return [filename]
+
+
+# Format name -> (writer, default file extension)
+WRITERS = {
+    'xlsx': (write_excel, '.xlsx'),
+    'csv': (write_csv, '.csv'),
+    'parquet': (write_parquet, '.parquet'),
+    'feather': (write_feather, '.feather'),
+    'hdf5': (write_hdf5, '.h5'),
+}
+
+
+# Format name -> module the writer imports, for the formats with an optional backend
+REQUIRES = {
+    'parquet': 'pyarrow',
+    'feather': 'pyarrow',
+    'hdf5': 'h5py',
+}
+
+
+def register_writer(fmt, writer, extension, requires=None):
+    """
+    Add or replace an export format.
+
+    Args:
+        fmt: Format name used by Graph.export()
+        writer: Callable (filename, tables, progress) returning the list of written files
+        extension: Default file extension, e.g. '.csv'
+        requires: Name of an optional module the writer needs, or None
+    """
+    WRITERS[fmt] = (writer, extension)
+    if requires is None:
+        REQUIRES.pop(fmt, None)
+    else:
+        REQUIRES[fmt] = requires
+
+
+def available_writers():
+    """Names of the formats whose optional backend is installed, in WRITERS order."""
+    return [fmt for fmt in WRITERS
+            if fmt not in REQUIRES or importlib.util.find_spec(REQUIRES[fmt]) is not None]
+
+
+def format_for(filename):
+    """Format name for a filename extension, e.g. 'run.parquet' -> 'parquet', or None."""
+    ext = os.path.splitext(filename)[1].lower()
+    for fmt, (writer, extension) in WRITERS.items():
+        if ext == extension or (fmt == 'hdf5' and ext in ('.hdf5', '.h5')):
+            return fmt
+    return None
@@ -1,89 +1,156 @@
 import time
 import threading
 import collections
-from scipy.stats import linregress
 import numpy as np
 import serial
+from System2_Equipment import serial_port_name
+from System2_AsyncEquipment import AsyncBalanceReader
 
-class PIDControl:
-    """
-    PID control class for regulating pump flow rate based on real-time balance readings.
-    This controller continuously calculates error between the target flow rate (set point)
-    and actual measured flow rate, then adjusts the pump speed to minimize this error.
-    """
-    def __init__(self, balance_ser, pump_ser, pump_type, pump_name, graph_obj):
-        """
-        Initialize PID controller with required components.
-        
-        Args:
-            balance_ser: Serial connection to balance
-            pump_ser: Serial connection to pump
-            pump_type: Type of pump ('ELDEX', 'UI-22', or 'REGLO')
-            pump_name: Name for identifying this controller
-            graph_obj: Graph object for visualization
-        """
-        self.balance_ser = balance_ser
-        self.pump_ser = pump_ser
-        self.pump_controller = None
-        self.pump_type = pump_type
-        self.pump_name = pump_name
-        self.max_data_points = 10
-        self.graph_obj = graph_obj
+def _median(values):
+    """Median of a 1-D array via np.partition (np.median costs more than the work on small windows)."""
+    n = len(values)
+    k = n // 2
+    if n % 2:
+        return float(np.partition(values, k)[k])
+    part = np.partition(values, (k - 1, k))
+    return 0.5 * float(part[k - 1] + part[k])
 
-        self.pid_var = True
-        self.excel_obj = None
-        self.mass = None
-        self.flow_rate = None
-        self.pid_output = None
 
-        self.stop = False
-        self.pid_thread = None
-        self._exit_thread = False
+class TickScheduler:
+    """
+    Calls tick() at a fixed rate on monotonic-clock deadlines (k * period from the start),
+    so the period does not drift with the time a tick takes.
+
+    When a tick overruns one or more deadlines the policy decides what happens:
+    'drop' drops all but the newest missed deadline and runs that one right away (late),
+    then continues on the grid; 'catchup' runs up to max_catchup of the missed ticks back
+    to back and drops the rest. Every tick records
+    its latency (start - deadline) and jitter (|start interval - period|) in fixed
+    millisecond histograms, see stats() and histograms().
+    """
+    HISTOGRAM_EDGES_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
 
-    def set_stop(self, boolean):
+    def __init__(self, rate, policy='drop', max_catchup=3):
         """
-        Stop or start the PID control loop.
-        
         Args:
-            boolean: True to stop, False to allow running
+            rate: Ticks per second
+            policy: 'drop' or 'catchup' for ticks whose deadline has already passed
+            max_catchup: Most missed ticks run late in a row with 'catchup'
         """
-        self.stop = boolean
-
-        if boolean:
-            self.mass = None
-            self.flow_rate = None
-            self.pid_output = None
-
-    def set_excel_obj(self, excel_obj):
+        if policy not in ('drop', 'catchup'):
+            raise ValueError(f"Unknown tick policy: {policy}")
+        self.period = 1.0 / float(rate)
+        self.policy = policy
+        self.max_catchup = max_catchup
+        self._stop = threading.Event()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.ticks = 0
+        self.dropped = 0
+        self.late = 0  # Ticks that started a whole period or more after their deadline
+        self.overruns = 0  # Ticks that took longer than the period
+        self._edges = np.array(self.HISTOGRAM_EDGES_MS) / 1000.0
+        self.latency_counts = np.zeros(len(self._edges) + 1, dtype=int)
+        self.jitter_counts = np.zeros(len(self._edges) + 1, dtype=int)
+        self.latencies = collections.deque(maxlen=1000)  # Recent values for percentiles
+        self.jitters = collections.deque(maxlen=1000)
+
+    def set_rate(self, rate):
+        """Change the rate; takes effect from the next deadline."""
+        self.period = 1.0 / float(rate)
+
+    def stop(self):
+        """Make run() return after the current tick."""
+        self._stop.set()
+
+    def run(self, tick, should_stop=None):
         """
-        Set Excel object for data export.
-        
+        Call tick(dt) on every deadline until stop() is called or should_stop() returns True.
+
         Args:
-            excel_obj: Excel export object
+            tick: Callable taking dt, the measured seconds since the previous tick started
+                (the nominal period for the first one)
+            should_stop: Optional predicate checked before each tick
         """
-        self.excel_obj = excel_obj
+        self._stop.clear()
+        deadline = time.monotonic()
+        last_start = None
+        catchup = 0  # Ticks run late in the current overrun
+
+        while not self._stop.is_set() and not (should_stop and should_stop()):
+            now = time.monotonic()
+            if now < deadline:
+                self._stop.wait(deadline - now)
+                continue
+
+            start = time.monotonic()
+            latency = start - deadline
+            self._record(self.latency_counts, self.latencies, latency)
+            if last_start is not None:
+                self._record(self.jitter_counts, self.jitters, abs(start - last_start - self.period))
+            dt = self.period if last_start is None else start - last_start
+            last_start = start
 
-    def pid_onoff(self, boolean):
+            try:
+                tick(dt)
+            except Exception as e:
+                print(f"Error in control tick: {e}")
+            self.ticks += 1
+            if latency >= self.period:
+                self.late += 1
+                catchup += 1
+            end = time.monotonic()
+            if end - start > self.period:
+                self.overruns += 1
+
+            # Next deadline on the grid; if more than one is already due, the policy decides
+            # how many of them still run (back to back) and how many are dropped
+            deadline += self.period
+            due = int((end - deadline) / self.period) + 1 if end >= deadline else 0
+            if due > 1:
+                keep = 1 if self.policy == 'drop' else min(due, 1 + max(0, self.max_catchup - catchup))
+                self.dropped += due - keep
+                deadline += (due - keep) * self.period  # The oldest missed deadlines go
+            elif due == 0:
+                catchup = 0  # Back on schedule
+
+    def _record(self, counts, recent, value):
+        counts[np.searchsorted(self._edges, value, side='right')] += 1
+        recent.append(value)
+
+    def stats(self):
         """
-        Enable or disable PID control.
-        
-        Args:
-            boolean: True to enable PID, False to disable
+        Returns:
+            Dictionary with tick, drop, late and overrun counts, and p50/p95/p99/max of the
+            recent latency and jitter in seconds
         """
-        self.pid_var = boolean
+        result = {'ticks': self.ticks, 'dropped': self.dropped, 'late': self.late,
+                  'overruns': self.overruns, 'period': self.period}
+        for name, values in (('latency', self.latencies), ('jitter', self.jitters)):
+            values = np.array(values)
+            if len(values):
+                p50, p95, p99 = np.percentile(values, (50, 95, 99))
+                result[name] = {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(values.max())}
+            else:
+                result[name] = {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+        return result
 
-    def set_controller_and_matrix(self, controller, matrix_len):
+    def histograms(self):
         """
-        Configure the PID controller with parameters and data buffer length.
-        
-        Args:
-            controller: Dictionary with PID parameters (set_point, kp, ki, kd, integral_error_limit)
-            matrix_len: Length of data matrix for flow rate calculation
+        Returns:
+            List of (bin label, latency count, jitter count) over all ticks since reset_stats()
         """
-        p = controller
-        self.pump_controller = self.PID(p['set_point'], p['kp'], p['ki'], p['kd'], p['integral_error_limit'])
-        self.max_data_points = matrix_len
+        edges = [0] + list(self.HISTOGRAM_EDGES_MS)
+        labels = [f"{low:g}-{high:g} ms" for low, high in zip(edges[:-1], edges[1:])] + [f">{edges[-1]:g} ms"]
+        return list(zip(labels, self.latency_counts.tolist(), self.jitter_counts.tolist()))
 
+
+class PIDControl:
+    """
+    Building blocks of the PID loops that PIDExecutor runs: the PID controller, the flow
+    rate estimators and the Balance that turns mass readings into a flow rate.
+    """
     class PID:
         """
         PID controller implementation.
@@ -118,18 +185,20 @@ class PIDControl:
             self._integral_error = 0.0
             self._last_time = time.time()
 
-        def __call__(self, process_variable):
+        def __call__(self, process_variable, dt=None):
             """
             Calculate PID output based on current process variable.
             
             Args:
                 process_variable: Current measured value (flow rate)
+                dt: Seconds since the previous call as measured by the caller's scheduler
+                    (default: wall-clock time since the previous call)
                 
             Returns:
                 Flow rate output value for pump
             """
             end_time = time.time()
-            t = end_time - self._last_time
+            t = end_time - self._last_time if dt is None else dt
 
             if process_variable == 0:
                 self._error = 0
@@ -161,21 +230,267 @@ class PIDControl:
             """Get the current set point flow rate."""
             return self._set_point
 
+    class SlopeEstimator:
+        """
+        Least-squares slope of the last `window` samples, updated in O(1) per sample.
+
+        Keeps the running sums n, Σx, Σy, Σx², Σxy with the origin moved to the newest
+        sample on every add, so the sums stay small (no cancellation with Unix timestamps
+        or large masses). In sliding mode the oldest sample is subtracted again and the
+        sums are recomputed exactly once per window to stop rounding drift. With `halflife`
+        the window is exponentially weighted instead: older samples fade by half every
+        `halflife` samples and nothing has to be removed.
+        """
+        def __init__(self, window, halflife=None):
+            """
+            Args:
+                window: Number of samples in the sliding window (also the warm-up length)
+                halflife: If given, use exponential weights with this half-life in samples
+            """
+            self.window = max(2, int(window))
+            self.decay = None if halflife is None else 0.5 ** (1.0 / float(halflife))
+            self._times = np.zeros(self.window)
+            self._values = np.zeros(self.window)
+            self._dx = np.zeros(self.window)  # Scratch arrays for _resum
+            self._dy = np.zeros(self.window)
+            self.clear()
+
+        def clear(self):
+            self._next = 0       # Ring position of the next sample
+            self.count = 0       # Samples seen (capped at window in sliding mode)
+            self._t = 0.0        # Origin of the sums: the newest sample
+            self._y = 0.0
+            self._sw = self._sx = self._sy = self._sxx = self._sxy = 0.0
+
+        def add(self, t, y):
+            """Add one sample (time in seconds, value)."""
+            if self.count:
+                # Move the origin from the previous newest sample to (t, y)
+                dx = t - self._t
+                dy = y - self._y
+                self._sxx += dx * (dx * self._sw - 2.0 * self._sx)
+                self._sxy += dx * dy * self._sw - dx * self._sy - dy * self._sx
+                self._sx -= dx * self._sw
+                self._sy -= dy * self._sw
+            self._t, self._y = t, y
+
+            if self.decay is not None:
+                self._sw *= self.decay
+                self._sx *= self.decay
+                self._sy *= self.decay
+                self._sxx *= self.decay
+                self._sxy *= self.decay
+                self.count = min(self.count + 1, self.window)
+            elif self.count == self.window:
+                # Drop the oldest sample, which the new one overwrites in the ring
+                x = self._times[self._next] - t
+                v = self._values[self._next] - y
+                self._sw -= 1.0
+                self._sx -= x
+                self._sy -= v
+                self._sxx -= x * x
+                self._sxy -= x * v
+            else:
+                self.count += 1
+            self._sw += 1.0  # The new sample sits at the origin, it adds nothing to the other sums
+
+            self._times[self._next] = t
+            self._values[self._next] = y
+            self._next = (self._next + 1) % self.window
+            if self.decay is None and self._next == 0 and self.count == self.window:
+                self._resum()
+
+        def _resum(self):
+            """Recompute the sliding sums exactly from the stored window (once per window)."""
+            x = np.subtract(self._times, self._t, out=self._dx)
+            v = np.subtract(self._values, self._y, out=self._dy)
+            self._sx = float(x.sum())
+            self._sy = float(v.sum())
+            self._sxx = float(np.dot(x, x))
+            self._sxy = float(np.dot(x, v))
+
+        @property
+        def slope(self):
+            """Slope in value units per second, or None before two distinct times were seen."""
+            denominator = self._sw * self._sxx - self._sx * self._sx
+            if self.count < 2 or denominator <= 1e-12 * max(self._sw * self._sxx, 1e-300):
+                return None
+            return (self._sw * self._sxy - self._sx * self._sy) / denominator
+
+    class RobustSlopeEstimator:
+        """
+        Theil-Sen slope of the last `window` samples with outlier rejection and step detection.
+
+        The slope is the median of the pairwise slopes in the window, so a minority of bad
+        readings cannot pull it. Each new sample is first checked against the current line.
+        A sample further off than `outlier_sigma` robust standard deviations (and at least
+        `min_jump`) is held back as a candidate. If the next sample agrees with the candidate
+        rather than with the line, the value stepped (e.g. a reservoir refill): the window is
+        cut and restarts from the candidate. Otherwise the candidate was a single bad reading
+        and is dropped. The line is then refitted by least squares over the samples that
+        agree with it. The pairwise slopes are recomputed per sample, vectorized, with at
+        most MAX_PAIRS pairs: about 70 µs per sample for 10 samples and 0.3 ms for 300.
+        """
+        MAX_PAIRS = 4096
+        def __init__(self, window, outlier_sigma=4.0, min_jump=0.5):
+            """
+            Args:
+                window: Number of samples in the sliding window (also the warm-up length)
+                outlier_sigma: Residual, in robust standard deviations, beyond which a sample is
+                    treated as an outlier or the start of a step
+                min_jump: Smallest residual treated that way, in value units (keeps quantized,
+                    noise-free readings from being rejected)
+            """
+            self.window = max(3, int(window))
+            self.outlier_sigma = float(outlier_sigma)
+            self.min_jump = float(min_jump)
+            self._times = np.zeros(self.window)
+            self._values = np.zeros(self.window)
+            self._pairs = {}  # Sample count -> index pairs for the pairwise slopes
+            self._rejected = np.zeros(self.window, dtype=bool)  # Whether each of the last adds was held back
+            self.outliers = 0  # Single readings dropped
+            self.steps = 0     # Steps that restarted the window
+            self.clear()
+
+        def clear(self):
+            self._next = 0
+            self.count = 0
+            self._adds = 0
+            self._rejected[:] = False
+            self._candidate = None
+            self._rejected_run = 0
+            self.slope = None
+            self._intercept = 0.0  # Fitted value at _t_ref
+            self._t_ref = 0.0
+            self.residual = None   # Robust standard deviation of the residuals (value units)
+            self.stderr = None     # Approximate standard error of the slope (value units per second)
+
+        @property
+        def confidence(self):
+            """
+            0 to 1: the filled fraction of the window times the fraction of recent samples that
+            were accepted. Drops after a step until the window has refilled.
+            """
+            recent = min(self._adds, self.window)
+            accepted = 1.0 - self._rejected.sum() / recent if recent else 0.0
+            return self.count / self.window * accepted
+
+        def _off_line(self, t, y, t0, y0):
+            """Whether (t, y) is too far from the fitted slope through (t0, y0)."""
+            limit = max(self.outlier_sigma * (self.residual or 0.0), self.min_jump)
+            return abs(y - y0 - self.slope * (t - t0)) > limit
+
+        def add(self, t, y):
+            """Add one sample (time in seconds, value)."""
+            self._rejected[self._adds % self.window] = False
+            self._adds += 1
+            if self.slope is None or self.count < 3:
+                self._append(t, y)
+                return
+
+            line = (self._t_ref, self._intercept)
+            if self._candidate is not None:
+                candidate, self._candidate = self._candidate, None
+                if not self._off_line(t, y, *line):
+                    self.outliers += 1  # The held sample was a lone bad reading
+                elif not self._off_line(t, y, *candidate):
+                    # Two samples on a new level: restart the window from the step
+                    self.steps += 1
+                    self._restart()
+                    self._append(*candidate)
+                    self._append(t, y)
+                    return
+                else:
+                    self.outliers += 1  # Off both, hold this one instead
+            if self._off_line(t, y, *line):
+                self._candidate = (t, y)
+                self._rejected[(self._adds - 1) % self.window] = True
+                self._rejected_run += 1
+                if self._rejected_run >= self.window:
+                    # Nothing fits for a whole window (e.g. the noise grew): start over
+                    self.steps += 1
+                    self._restart()
+                    self._append(t, y)
+                return
+            self._append(t, y)
+
+        def _restart(self):
+            self.count = 0
+            self._next = 0
+            self._candidate = None
+            self.slope = None
+            self.residual = None
+            self.stderr = None
+
+        def _append(self, t, y):
+            self._rejected_run = 0
+            self._times[self._next] = t
+            self._values[self._next] = y
+            self._next = (self._next + 1) % self.window
+            self.count = min(self.count + 1, self.window)
+            self._fit(t)
+
+        def _fit(self, t_ref):
+            n = self.count
+            if n < 2:
+                return
+            # Times relative to the newest sample, so Unix timestamps do not cancel
+            x = self._times[:n] - t_ref
+            y = self._values[:n]
+            pairs = self._pairs.get(n)
+            if pairs is None:
+                pairs = np.triu_indices(n, 1)
+                if len(pairs[0]) > self.MAX_PAIRS:
+                    # Large windows use a fixed random subset of the pairs (randomized Theil-Sen)
+                    keep = np.sort(np.random.default_rng(n).choice(len(pairs[0]), self.MAX_PAIRS, replace=False))
+                    pairs = (pairs[0][keep], pairs[1][keep])
+                self._pairs[n] = pairs
+            i, j = pairs
+            dx = x[j] - x[i]
+            valid = dx != 0
+            if not valid.any():
+                return
+            slope = _median((y[j] - y[i])[valid] / dx[valid])
+            intercept = _median(y - slope * x)
+            residuals = y - (intercept + slope * x)
+            residual = 1.4826 * _median(np.abs(residuals))  # MAD scaled to a standard deviation
+
+            # Least-squares refit over the samples that agree with the robust line: as
+            # efficient as the plain fit on clean data (Theil-Sen is lumpy on 0.01 g steps)
+            inliers = np.abs(residuals) <= max(self.outlier_sigma * residual, self.min_jump)
+            xi, yi = x[inliers], y[inliers]
+            dxi = xi - xi.mean()
+            spread = float(np.dot(dxi, dxi))
+            if len(xi) >= 2 and spread > 0:
+                slope = float(np.dot(dxi, yi - yi.mean())) / spread
+                intercept = float(yi.mean() - slope * xi.mean())
+
+            self.slope = slope
+            self._intercept = intercept
+            self._t_ref = t_ref
+            self.residual = residual
+            self.stderr = residual / np.sqrt(spread) if spread > 0 else None
+
     class Balance:
         """Balance data processing for flow rate calculation."""
-        def __init__(self, max_data_points):
+        def __init__(self, max_data_points, halflife=None, robust=False):
             """
             Initialize balance data processor.
             
             Args:
-                max_data_points: Maximum number of data points to store
+                max_data_points: Number of mass readings the flow rate is fitted over
+                halflife: If given, weight the readings exponentially with this half-life
+                    (in readings) instead of using a sliding window
+                robust: Use the RobustSlopeEstimator (outlier rejection, refill detection and
+                    a confidence per estimate) instead of the least-squares fit
             """
             self.max_data_points = max_data_points
-            self._times = collections.deque(maxlen=self.max_data_points)
-            self._masses = collections.deque(maxlen=self.max_data_points)
+            if robust:
+                self._estimator = PIDControl.RobustSlopeEstimator(max_data_points)
+            else:
+                self._estimator = PIDControl.SlopeEstimator(max_data_points, halflife)
             self._mass = None
             self._mass_flow_rate = 0.0
-            self._counter = 0
 
         @property
         def mass(self):
@@ -190,180 +505,341 @@ class PIDControl:
             Args:
                 value: Current mass reading
             """
-            self._counter += 1
+            self.add(value, time.time())
 
-            t = time.time()
+        def add(self, value, timestamp):
+            """
+            Add a mass reading stamped when it arrived and update the flow rate calculation.
+            
+            Args:
+                value: Mass reading in grams
+                timestamp: Arrival time in seconds (e.g. time.monotonic() from BalanceReader)
+            """
             value = float(value)
             self._mass = value
-            self._times.append(t)
-            self._masses.append(value)
+            self._estimator.add(timestamp, value)
 
-            if self._counter == self.max_data_points:
-                try:
-                    self.estimate_flow_rate()
-                except Exception as e:
-                    print(f'Exception occurred while estimating mass flow rate: {e}')
-                self._counter = 0
+            try:
+                self.estimate_flow_rate()
+            except Exception as e:
+                print(f'Exception occurred while estimating mass flow rate: {e}')
 
         def estimate_flow_rate(self):
             """
-            Estimate flow rate based on linear regression of mass vs time.
-            The slope of the regression line gives mass per time.
+            Estimate flow rate as the least-squares slope of mass vs time over the window.
+            The estimate is refreshed on every reading once the window has filled.
             """
-            try:
-                # Convert deques to lists for linregress
-                times_list = list(self._times)
-                masses_list = list(self._masses)
-                result = linregress(times_list, masses_list)
+            if self._estimator.count < self._estimator.window:
+                return  # Keep the previous estimate until the window is full
+            slope = self._estimator.slope
+            if slope is not None:
                 # Convert to mL/min (assuming density of 1 g/mL)
-                self._mass_flow_rate = result.slope * 60
-            except Exception as e:
-                print(f"Flow rate estimation error: {e}")
-                self._mass_flow_rate = None
-                raise
+                self._mass_flow_rate = slope * 60
 
         @property
         def flow_rate(self):
             """Get current flow rate estimate."""
             return self._mass_flow_rate
-                
+
+        @property
+        def residual(self):
+            """Robust standard deviation of the mass readings around the fit in grams (robust only)."""
+            return getattr(self._estimator, 'residual', None)
+
+        @property
+        def confidence(self):
+            """Confidence of the flow rate from 0 to 1; always 1 for the least-squares fit."""
+            return getattr(self._estimator, 'confidence', 1.0)
+
+
+class PIDExecutor:
+    """
+    Runs the PID loops of all pump channels in one thread on one TickScheduler.
+
+    Each tick drains the BalanceReader of every loop into its flow estimator, computes
+    the outputs of all loops with new readings at once from NumPy arrays of set points,
+    gains, integrals and last errors, and queues the pump writes grouped per pump (one
+    Pump.set_speeds call per serial port, which does not wait for the replies). Loops
+    can be added and removed at any time. Reglo pumps are driven through their Pump
+    object, ELDEX and UI-22 pumps through a SerialPump around their serial port. The
+    balances are read by AsyncBalanceReader tasks on the shared EquipmentLoop, so any
+    number of balances costs one thread.
+    """
+    class SerialPump:
+        """set_speeds() for the single-channel ELDEX and UI-22 pumps, which take a flow rate command."""
+        PRIORITY_PID = 0
+
+        def __init__(self, pump_ser, pump_type):
+            """
+            Args:
+                pump_ser: Open serial port of the pump
+                pump_type: 'ELDEX' or 'UI-22'
+            """
+            if pump_type not in ('ELDEX', 'UI-22'):
+                raise ValueError(f"Unknown pump type: {pump_type}")
+            self.pump_ser = pump_ser
+            self.pump_type = pump_type
+            self.COM = getattr(pump_ser, 'port', None)
+
+        def set_speeds(self, speeds, priority=PRIORITY_PID):
+            """Write the flow rate in mL/min; the pumps have one channel, so speeds holds one entry."""
+            for output in speeds.values():
+                if self.pump_type == 'ELDEX':
+                    command_str = f'SF{output:06.3f}\r\n'
+                else:
+                    output_str = f'{output:06.3f}'.replace('.', '')
+                    command_str = f';01,S3,{output_str}\r\n'
+                self.pump_ser.write(command_str.encode('ascii'))
+
+    class Loop:
+        """State of one control loop that is not part of the vectorized arrays."""
+        def __init__(self, name, port, reader, pump, channel, balance, min_confidence):
+            self.name = name
+            self.port = port
+            self.reader = reader
+            self.pump = pump
+            self.channel = channel
+            self.balance = balance
+            self.min_confidence = min_confidence
+            self.position = reader.count
+            self.mass = None
+            self.flow_rate = None
+            self.pid_output = None
+
+    # Columns of the loop parameter/state table
+    SET_POINT, KP, KI, KD, LIMIT, INTEGRAL, LAST_ERROR, PID_DT, ENABLED = range(9)
+
+    def __init__(self, graph_obj=None, rate=2.0, policy='drop'):
+        """
+        Args:
+            graph_obj: Graph that gets the balance and flow rate of every loop (optional)
+            rate: Control ticks per second
+            policy: 'drop' or 'catchup' for ticks whose deadline was missed
+        """
+        self.graph_obj = graph_obj
+        self.accept_unstable = True  # Readings flagged unstable (mass still changing) are used for the fit
+        self.scheduler = TickScheduler(rate, policy)
+        self._loops = []   # Loop objects, index i matches row i of the arrays
+        self._readers = {}  # balance port name -> [AsyncBalanceReader, number of loops using it]
+        self._closing = {}  # balance port name -> thread closing its last reader
+        self._lock = threading.Lock()
+        self._table = np.zeros((0, 9))  # One row per loop, columns below
+        self.thread = None
+
     def start(self):
-        """Start the PID control loop in a separate thread."""
-        if self.pid_thread is None or not self.pid_thread.is_alive():
-            self.stop = False
-            self._exit_thread = False
-            self.pid_thread = threading.Thread(target=self._pid_loop)
-            self.pid_thread.daemon = True
-            self.pid_thread.start()
-            return True
-        return False
-
-    def _pid_loop(self):
-        """Main PID control loop."""
-        balance_ser = self.balance_ser
-        pump_ser = self.pump_ser
-        b = self.Balance(self.max_data_points)
-
-        last_flow_rate = 0.0
-
-        print(f"Starting PID control loop for {self.pump_name}")
-
-        while not self._exit_thread:
-            while not self.stop and not self._exit_thread:
-                try:
-                    # Read balance data
-                    balance_data = balance_ser.readline().strip()
-
-                    # Parse mass value from balance data
-                    if isinstance(balance_data, bytes):
-                        balance_data = balance_data.decode('ascii', errors='ignore')
-
-                    # Different balance models may output data in different formats
-                    try:
-                        parts = balance_data.split()
-                        if len(parts) >= 2:
-                            value = parts[1].strip()
-                        else:
-                            value = balance_data.strip()
-
-                        # Handle different balance output formats
-                        if value.startswith('+') or value.startswith('-'):
-                            print('skip')  # Skipping unstable readings
-                            continue
-
-                        # Extract numeric part (assuming format like "123.45g")
-                        if 'g' in value:
-                            mass_in_float = float(value.split('g')[0])
-                        else:
-                            mass_in_float = float(value)
-
-                        # Update balance with new mass
-                        b.mass = mass_in_float
-
-                        # Use the flow rate calculated from balance mass readings
-                        # Negative sign because decreasing mass = positive flow out
-                        if b.flow_rate is not None:
-                            flow_rate = -b.flow_rate
-                        else:
-                            flow_rate = last_flow_rate
-
-                        # Store the current values for UI and logging
-                        self.mass = mass_in_float
-                        self.flow_rate = flow_rate
-
-                        # Update the graph with current values
-                        self.graph_obj.update_dict("balances", self.pump_name, self.mass)
-                        self.graph_obj.update_dict("flow_rates", self.pump_name, self.flow_rate)
-
-                        # Apply PID control if enabled and flow rate has been calculated
-                        if self.pid_var and b.flow_rate is not None:
-                            output = float(self.pump_controller(flow_rate))
-                            print(
-                                f'{self.pump_name} - Mass: {mass_in_float:.2f}g, Flow rate: {flow_rate:.2f} mL/min, PID output: {output:.2f}')
-
-                            # Send command based on pump type
-                            if self.pump_type == 'REGLO':
-                                # Extract channel from pump name
-                                try:
-                                    channel = int(self.pump_name.split('_Ch')[1])
-                                    pump_ser.set_speed(channel, output)
-                                except (ValueError, IndexError):
-                                    # If we can't parse channel from name, try to get it from the last character
-                                    try:
-                                        channel = int(self.pump_name[-1])
-                                        pump_ser.set_speed(channel, output)
-                                    except (ValueError, IndexError):
-                                        # If all else fails, default to channel 1
-                                        pump_ser.set_speed(1, output)
-                                        print(
-                                            f"Warning: Could not parse channel from {self.pump_name}, using channel 1")
-                            elif self.pump_type == 'ELDEX':
-                                command_str = f'SF{output:06.3f}\r\n'
-                                pump_ser.write(command_str.encode('ascii'))
-                            elif self.pump_type == 'UI-22':
-                                output_str = f'{output:06.3f}'.replace('.', '')
-                                command_str = f';01,S3,{output_str}\r\n'
-                                pump_ser.write(command_str.encode('ascii'))
-
-                            # Store the output value
-                            self.pid_output = output
-
-                        last_flow_rate = flow_rate
-
-                        # Update Excel if available
-                        if self.excel_obj:
-                            self.excel_obj.change_data(self.pump_name, self.get_last())
-
-                    except (ValueError, IndexError) as e:
-                        print(f"Error parsing balance data: {e}")
-
-                    time.sleep(0.5)
-
-                except Exception as e:
-                    print(f'Error in PID loop: {e}')
-                    time.sleep(1)  # Prevent tight error loop
-
-            # Clear data when stopped
-            self.graph_obj.update_dict("balances", self.pump_name, None)
-            self.graph_obj.update_dict("flow_rates", self.pump_name, None)
-
-            if self.excel_obj:
-                self.excel_obj.change_data(self.pump_name, self.get_last())
-
-            # Check if we should exit the thread
-            if self._exit_thread:
-                break
-
-            time.sleep(0.5)
-
-    def get_last(self):
-        """Get the last recorded data point."""
-        if self.mass is not None and self.flow_rate is not None:
-            return [self.mass, self.flow_rate, self.pid_output]
-        else:
-            return ['', '', '']
-            
-    def stop_thread(self):
-        """Stop the PID control thread completely."""
-        self.stop = True
-        self._exit_thread = True
\ No newline at end of file
+        """Start the executor thread."""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.scheduler.run, args=(self._tick,), name="PIDExecutor")
+            self.thread.daemon = True
+            self.thread.start()
+
+    def stop(self):
+        """Stop the executor thread and close the balance ports."""
+        self.scheduler.stop()
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+        for name in self.loops():
+            self.remove_loop(name)
+
+    def loops(self):
+        """Names of the active loops."""
+        with self._lock:
+            return [loop.name for loop in self._loops]
+
+    def add_loop(self, name, balance_port, pump, channel, controller, matrix_len=10, flow_halflife=None,
+                 robust=False, min_confidence=0.5):
+        """
+        Add a control loop, or replace the one with the same name.
+        
+        Args:
+            name: Loop name, also the graph series name (e.g. 'Pump_1_Ch2')
+            balance_port: Balance port number, device path or pyserial URL (see serial_port_name);
+                the executor opens it, and loops on the same port share one reader
+            pump: Pump object driving the channel, or a SerialPump for ELDEX and UI-22 pumps
+            channel: Pump channel number (1 for a SerialPump)
+            controller: Dictionary with set_point, kp, ki, kd and integral_error_limit
+            matrix_len: Number of balance readings the flow rate is fitted over
+            flow_halflife: Optional half-life in readings for an exponentially weighted fit
+            robust: Estimate the flow rate with the RobustSlopeEstimator
+            min_confidence: Flow rate confidence below which the loop holds its last output
+
+        If a removed loop is still closing the balance port, this waits until it is closed
+        before opening it again.
+        """
+        self.remove_loop(name)
+        port = serial_port_name(balance_port)
+        while True:
+            with self._lock:
+                closing = self._closing.get(port)
+                if closing is None:
+                    entry = self._readers.get(port)
+                    if entry is None:
+                        entry = self._readers[port] = [AsyncBalanceReader(port), 0]
+                        entry[0].start()
+                    entry[1] += 1
+                    self._loops.append(self.Loop(name, port, entry[0], pump, channel,
+                                                 PIDControl.Balance(matrix_len, flow_halflife, robust),
+                                                 min_confidence))
+                    row = np.zeros(9)
+                    row[[self.SET_POINT, self.KP, self.KI, self.KD, self.LIMIT]] = [
+                        float(controller['set_point'] or 0.0), controller['kp'], controller['ki'], controller['kd'],
+                        controller['integral_error_limit'] or 0.0]
+                    row[self.ENABLED] = 1.0
+                    self._table = np.vstack((self._table, row))
+                    return
+            closing.join()  # A removed loop is still closing the port; it cannot be reopened before that
+
+    def remove_loop(self, name):
+        """
+        Remove a loop; its graph series get a gap. Returns False if there was no such loop.
+
+        The balance port is closed once no loop uses it. That happens on a background thread,
+        so the caller (e.g. the Tk thread) does not wait for a blocked read to return.
+        """
+        with self._lock:
+            index = next((i for i, loop in enumerate(self._loops) if loop.name == name), None)
+            if index is None:
+                return False
+            loop = self._loops.pop(index)
+            self._table = np.delete(self._table, index, axis=0)
+            port = loop.port
+            entry = self._readers[port]
+            entry[1] -= 1
+            if not entry[1]:
+                del self._readers[port]
+                t = threading.Thread(target=self._close_reader, args=(port, loop.reader), name=f"BalanceClose-{port}")
+                t.daemon = True
+                self._closing[port] = t
+                t.start()  # Under the lock, so add_loop never joins an unstarted thread
+        if self.graph_obj is not None:
+            self.graph_obj.update_dict("balances", name, None)
+            self.graph_obj.update_dict("flow_rates", name, None)
+        return True
+
+    def _close_reader(self, port, reader):
+        try:
+            reader.close()
+        except Exception as e:
+            print(f"Error closing balance port {port}: {e}")
+        with self._lock:
+            if self._closing.get(port) is threading.current_thread():
+                del self._closing[port]
+
+    def _row(self, name):
+        for i, loop in enumerate(self._loops):
+            if loop.name == name:
+                return i
+        raise KeyError(name)
+
+    def set_gains(self, name, set_point=None, kp=None, ki=None, kd=None, integral_error_limit=None):
+        """Change the set point and/or gains of a running loop; None leaves a value unchanged."""
+        with self._lock:
+            row = self._row(name)
+            for column, value in ((self.SET_POINT, set_point), (self.KP, kp), (self.KI, ki),
+                                  (self.KD, kd), (self.LIMIT, integral_error_limit)):
+                if value is not None:
+                    self._table[row, column] = float(value)
+
+    def pid_onoff(self, name, boolean):
+        """Enable or disable the pump writes of a loop (its flow rate is still measured)."""
+        with self._lock:
+            self._table[self._row(name), self.ENABLED] = 1.0 if boolean else 0.0
+
+    def set_tick_rate(self, rate, policy=None):
+        """Set the control loop rate in ticks per second and optionally the missed tick policy."""
+        self.scheduler.set_rate(rate)
+        if policy is not None:
+            self.scheduler.policy = policy
+
+    def tick_stats(self):
+        """Tick counts and latency/jitter percentiles of the control loop (see TickScheduler.stats)."""
+        return self.scheduler.stats()
+
+    def get_last(self, name):
+        """Get the last [mass, flow rate, PID output] of a loop."""
+        with self._lock:
+            loop = self._loops[self._row(name)]
+        if loop.mass is not None and loop.flow_rate is not None:
+            return [loop.mass, loop.flow_rate, loop.pid_output]
+        return ['', '', '']
+
+    def get_flow_quality(self, name):
+        """Get the (residual in grams, confidence) of a loop's flow rate estimate."""
+        with self._lock:
+            balance = self._loops[self._row(name)].balance
+        return balance.residual, balance.confidence
+
+    def _tick(self, dt):
+        with self._lock:
+            loops = list(self._loops)
+            table = self._table
+            if not loops:
+                return
+            table[:, self.PID_DT] += dt  # Time since each loop's last PID update
+
+            # Feed the new balance readings of every loop into its flow estimator
+            fresh = np.zeros(len(loops), dtype=bool)
+            confident = np.zeros(len(loops), dtype=bool)
+            flows = np.zeros(len(loops))
+            for i, loop in enumerate(loops):
+                loop.position, times, masses, stable = loop.reader.since(loop.position)
+                if not self.accept_unstable:
+                    times, masses = times[stable], masses[stable]
+                if not len(masses):
+                    continue
+                for t, mass in zip(times, masses):
+                    loop.balance.add(mass, t)
+                loop.mass = float(masses[-1])
+                # Negative sign because decreasing mass = positive flow out
+                loop.flow_rate = -loop.balance.flow_rate
+                flows[i] = loop.flow_rate
+                fresh[i] = True
+                confident[i] = loop.balance.confidence >= loop.min_confidence
+
+            # One vectorized PID step for every enabled loop with new, confident readings;
+            # the others keep their last pump output
+            run = fresh & confident & (table[:, self.ENABLED] > 0)
+            outputs = self._pid_step(table, run, flows)
+
+        for i in np.flatnonzero(fresh):
+            loop = loops[i]
+            if run[i]:
+                loop.pid_output = float(outputs[i])
+            if self.graph_obj is not None:
+                self.graph_obj.update_dict("balances", loop.name, loop.mass)
+                self.graph_obj.update_dict("flow_rates", loop.name, loop.flow_rate)
+
+        # Pump writes grouped per pump, queued on each port's scheduler without waiting
+        writes = {}
+        for i in np.flatnonzero(run):
+            writes.setdefault(loops[i].pump, {})[loops[i].channel] = float(outputs[i])
+        for pump, speeds in writes.items():
+            try:
+                pump.set_speeds(speeds, priority=pump.PRIORITY_PID)
+            except Exception as e:
+                print(f"PID write failed on {getattr(pump, 'COM', pump)}: {e}")
+
+    def _pid_step(self, table, run, process_variables):
+        """
+        PIDControl.PID for all rows at once; rows where run is False are left unchanged.
+
+        Returns:
+            Array of outputs (only meaningful where run is True)
+        """
+        set_point = table[:, self.SET_POINT]
+        dt = table[:, self.PID_DT]
+        error = np.where(process_variables == 0, 0.0, set_point - process_variables)
+
+        integral = table[:, self.INTEGRAL] + error * dt
+        limit = table[:, self.LIMIT]
+        integral = np.where(limit > 0, np.clip(integral, -limit, limit), integral)
+
+        safe_dt = np.where(dt > 0, dt, 1.0)
+        derivative = np.where(dt > 0, table[:, self.KD] * (error - table[:, self.LAST_ERROR]) / safe_dt, 0.0)
+
+        outputs = np.maximum(0.0, set_point + table[:, self.KP] * error + table[:, self.KI] * integral + derivative)
+
+        table[run, self.INTEGRAL] = integral[run]
+        table[run, self.LAST_ERROR] = error[run]
+        table[run, self.PID_DT] = 0.0
+        return outputs
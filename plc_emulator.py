@@ -0,0 +1,196 @@
+"""
+Modbus TCP stand-in for the System Two PLC.
+
+Serves coils and holding registers preloaded with the `addresses` map from
+System2_GUI.py. Temperature and pressure transmitter registers return synthetic
+float waveforms (sine plus noise), everything else keeps whatever was last
+written. Each request can be delayed by a fixed latency plus random jitter to
+mimic the real PLC.
+
+Run it with:
+    python plc_emulator.py --port 5020 --latency 0.004 --jitter 0.002
+and point the PLC wrappers at 127.0.0.1:5020.
+"""
+import argparse
+import math
+import random
+import socketserver
+import struct
+import threading
+import time
+import numpy as np
+from System2_Equipment import encode_floats
+
+
+class PLCEmulator:
+    """
+    Register map and Modbus request handling, independent of the socket server.
+
+    Attributes:
+        registers: numpy uint16 array with the 65536 holding registers
+        coils: numpy bool array with the 65536 coils
+        waveforms: Dictionary mapping first register to (base, amplitude, period, phase, noise)
+    """
+    def __init__(self, address_map=None, latency=0.0, jitter=0.0, seed=None):
+        """
+        Args:
+            address_map: Register map in the format of System2_GUI.addresses (default: that map)
+            latency: Fixed delay added to every response in seconds
+            jitter: Standard deviation of extra random delay in seconds
+            seed: Random seed for reproducible waveforms and jitter
+        """
+        if address_map is None:
+            from System2_GUI import addresses as address_map
+
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.registers = np.zeros(65536, dtype=np.uint16)
+        self.coils = np.zeros(65536, dtype=bool)
+        self.waveforms = {}
+        self.requests = 0
+
+        for i, reg in enumerate(address_map.get('Temperatures', [])):
+            self.add_waveform(reg, base=25.0 + 5 * i, amplitude=2.0, period=60.0, noise=0.05)
+        for i, reg in enumerate(address_map.get('Pressure Transmitters', [])):
+            self.add_waveform(reg, base=14.7 + i, amplitude=0.5, period=30.0, noise=0.01)
+
+    def add_waveform(self, reg, base=0.0, amplitude=1.0, period=60.0, phase=None, noise=0.0):
+        """Serve a synthetic sine wave plus gaussian noise as a float at reg, reg + 1."""
+        if phase is None:
+            phase = self.random.uniform(0, 2 * math.pi)
+        self.waveforms[int(reg)] = (base, amplitude, period, phase, noise)
+
+    def _refresh_waveforms(self, start, count):
+        """Write the current waveform values into the requested register range."""
+        now = time.time()
+        for reg, (base, amplitude, period, phase, noise) in self.waveforms.items():
+            if start <= reg + 1 and reg < start + count:
+                value = base + amplitude * math.sin(2 * math.pi * now / period + phase)
+                if noise:
+                    value += self.random.gauss(0.0, noise)
+                self.registers[reg:reg + 2] = encode_floats([value])
+
+    def delay(self):
+        """Sleep for the configured latency and jitter."""
+        delay = self.latency
+        if self.jitter:
+            delay += abs(self.random.gauss(0.0, self.jitter))
+        if delay > 0:
+            time.sleep(delay)
+
+    def handle_pdu(self, pdu):
+        """
+        Execute one Modbus request PDU.
+
+        Returns:
+            Response PDU bytes
+        """
+        function = pdu[0]
+        try:
+            with self.lock:
+                self.requests += 1
+                if function in (1, 2):  # Read coils / discrete inputs
+                    start, count = struct.unpack('>HH', pdu[1:5])
+                    bits = np.packbits(self.coils[start:start + count], bitorder='little').tobytes()
+                    return bytes([function, len(bits)]) + bits
+                if function in (3, 4):  # Read holding / input registers
+                    start, count = struct.unpack('>HH', pdu[1:5])
+                    if not 1 <= count <= 125 or start + count > 65536:
+                        return bytes([function | 0x80, 3])
+                    self._refresh_waveforms(start, count)
+                    data = self.registers[start:start + count].astype('>u2').tobytes()
+                    return bytes([function, len(data)]) + data
+                if function == 5:  # Write single coil
+                    address, value = struct.unpack('>HH', pdu[1:5])
+                    self.coils[address] = value == 0xFF00
+                    return pdu[:5]
+                if function == 6:  # Write single register
+                    address, value = struct.unpack('>HH', pdu[1:5])
+                    self.registers[address] = value
+                    return pdu[:5]
+                if function == 15:  # Write multiple coils
+                    start, count = struct.unpack('>HH', pdu[1:5])
+                    bits = np.unpackbits(np.frombuffer(pdu[6:6 + pdu[5]], dtype=np.uint8), bitorder='little')
+                    self.coils[start:start + count] = bits[:count].astype(bool)
+                    return pdu[:5]
+                if function == 16:  # Write multiple registers
+                    start, count = struct.unpack('>HH', pdu[1:5])
+                    self.registers[start:start + count] = np.frombuffer(pdu[6:6 + 2 * count], dtype='>u2')
+                    return pdu[:5]
+        except (struct.error, IndexError, ValueError):
+            return bytes([function | 0x80, 3])  # Illegal data value
+        return bytes([function | 0x80, 1])  # Illegal function
+
+
+class _ModbusTCPHandler(socketserver.BaseRequestHandler):
+    """Reads MBAP framed requests from one client connection."""
+    def handle(self):
+        emulator = self.server.emulator
+        sock = self.request
+        buf = b""
+        while True:
+            try:
+                data = sock.recv(4096)
+            except OSError:
+                return
+            if not data:
+                return
+            buf += data
+            while len(buf) >= 7:
+                transaction_id, protocol_id, length, unit_id = struct.unpack('>HHHB', buf[:7])
+                if len(buf) < 6 + length:
+                    break
+                pdu = buf[7:6 + length]
+                buf = buf[6 + length:]
+                emulator.delay()
+                response = emulator.handle_pdu(pdu)
+                header = struct.pack('>HHHB', transaction_id, protocol_id, len(response) + 1, unit_id)
+                sock.sendall(header + response)
+
+
+class PLCEmulatorServer(socketserver.ThreadingTCPServer):
+    """Threaded Modbus TCP server around a PLCEmulator."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, emulator, host='127.0.0.1', port=5020):
+        self.emulator = emulator
+        super().__init__((host, port), _ModbusTCPHandler)
+
+    def start(self):
+        """Serve in a background thread and return immediately."""
+        thread = threading.Thread(target=self.serve_forever, name="PLCEmulatorServer")
+        thread.daemon = True
+        thread.start()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modbus TCP emulator of the System Two PLC")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5020)
+    parser.add_argument('--latency', type=float, default=0.0, help="Fixed response delay in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Std. deviation of extra delay in seconds")
+    parser.add_argument('--sensors', type=int, default=0,
+                        help="Extra synthetic float sensors from register 28710 upwards (for benchmarks)")
+    args = parser.parse_args()
+
+    emulator = PLCEmulator(latency=args.latency, jitter=args.jitter)
+    for i in range(args.sensors):
+        emulator.add_waveform(28710 + 2 * i, base=20.0 + i % 10, amplitude=1.0, period=30.0, noise=0.02)
+
+    server = PLCEmulatorServer(emulator, args.host, args.port)
+    print(f"PLC emulator listening on {args.host}:{args.port} "
+          f"(latency {args.latency * 1000:.1f} ms, jitter {args.jitter * 1000:.1f} ms)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Reglo ICC pump emulator on a pseudo-terminal (Linux/macOS).
+
+Implements the commands used by System2_Equipment.Pump: 1~1 (independent
+channel control), nH/nI (start/stop), nJ/nK (direction), nL/nM/nG (mode),
+nf (get flow rate), nf<mmmm><e> (set flow rate), nxD and nxM. Replies are
+delayed by the time the bytes need on a 9600 baud line plus a configurable
+processing latency and jitter.
+
+Run it with:
+    python reglo_emulator.py --latency 0.005 --jitter 0.002
+and open the printed device path with Pump('/dev/pts/N').
+"""
+import argparse
+import os
+import random
+import re
+import threading
+import time
+import tty
+
+
+class RegloEmulator:
+    """
+    Emulated Reglo ICC with four channels behind a pty.
+
+    Attributes:
+        port: Device path of the pty slave to open with Pump
+        commands: Number of commands answered so far
+    """
+    def __init__(self, channels=4, latency=0.005, jitter=0.001, baudrate=9600, seed=None):
+        """
+        Args:
+            channels: Number of pump channels
+            latency: Processing delay before each reply in seconds
+            jitter: Standard deviation of extra random delay in seconds
+            baudrate: Line speed used to model transmission time (10 bits per byte)
+            seed: Random seed for reproducible jitter
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.byte_time = 10.0 / baudrate
+        self.random = random.Random(seed)
+        self.independent = False
+        self.running = {ch: False for ch in range(1, channels + 1)}
+        self.direction = {ch: 'J' for ch in range(1, channels + 1)}
+        self.mode = {ch: 'L' for ch in range(1, channels + 1)}
+        self.flow_rate = {ch: 0.0 for ch in range(1, channels + 1)}  # mL/min
+        self.commands = 0
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._stopped = False
+        self.thread = None
+
+    @staticmethod
+    def format_flow(value):
+        """Format a flow rate the way the Reglo does, 4 digit mantissa and exponent: 1.5 -> '1500E-3'."""
+        if value <= 0:
+            return "0000E+0"
+        exponent = 0
+        while value * 10 ** -exponent >= 10000:
+            exponent += 1
+        while value * 10 ** -exponent < 1000:
+            exponent -= 1
+        return f"{int(round(value * 10 ** -exponent)):04d}E{exponent:+d}"
+
+    def reply_to(self, command):
+        """
+        Build the reply to one command (without the trailing carriage return).
+
+        Returns:
+            Reply bytes: '*' for executed set commands, '#' for rejected ones,
+            a CR LF terminated line for queries
+        """
+        self.commands += 1
+        if command == "1~1":
+            self.independent = True
+            return b"*"
+
+        match = re.fullmatch(r"(\d)(xD|xM|f(\d{4})([+-]?\d)|f|[HIJKLMG])", command)
+        if not match or int(match.group(1)) not in self.running:
+            return b"#"
+        channel = int(match.group(1))
+        op = match.group(2)
+
+        if op == 'H':
+            self.running[channel] = True
+        elif op == 'I':
+            self.running[channel] = False
+        elif op in ('J', 'K'):
+            self.direction[channel] = op
+        elif op in ('L', 'M', 'G'):
+            self.mode[channel] = op
+        elif op == 'xD':
+            return f"{self.direction[channel]}\r\n".encode()
+        elif op == 'xM':
+            return f"{self.mode[channel]}\r\n".encode()
+        elif op == 'f':
+            return f"{self.format_flow(self.flow_rate[channel])}\r\n".encode()
+        else:  # f<mantissa><exponent>, set flow rate
+            self.flow_rate[channel] = int(match.group(3)) * 10.0 ** int(match.group(4))
+            return f"{self.format_flow(self.flow_rate[channel])}\r\n".encode()
+        return b"*"
+
+    def _serve(self):
+        buf = b""
+        while not self._stopped:
+            try:
+                data = os.read(self._master, 256)
+            except OSError:
+                return
+            buf += data
+            while b"\r" in buf:
+                raw, buf = buf.split(b"\r", 1)
+                command = raw.decode(errors='ignore').strip()
+                received = time.perf_counter()
+                reply = self.reply_to(command)
+
+                # Command and reply transmission time at the line speed plus processing time
+                delay = (len(raw) + 1 + len(reply)) * self.byte_time + self.latency
+                if self.jitter:
+                    delay += abs(self.random.gauss(0.0, self.jitter))
+                remaining = received + delay - time.perf_counter()
+                if remaining > 0:
+                    time.sleep(remaining)
+                try:
+                    os.write(self._master, reply)
+                except OSError:
+                    return
+
+    def start(self):
+        """Answer commands in a background thread and return the device path."""
+        self.thread = threading.Thread(target=self._serve, name="RegloEmulator")
+        self.thread.daemon = True
+        self.thread.start()
+        return self.port
+
+    def stop(self):
+        self._stopped = True
+        os.close(self._master)
+        os.close(self._slave)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reglo ICC pump emulator on a pseudo-terminal")
+    parser.add_argument('--latency', type=float, default=0.005, help="Processing delay per reply in seconds")
+    parser.add_argument('--jitter', type=float, default=0.001, help="Std. deviation of extra delay in seconds")
+    parser.add_argument('--channels', type=int, default=4)
+    args = parser.parse_args()
+
+    emulator = RegloEmulator(args.channels, args.latency, args.jitter)
+    print(emulator.start(), flush=True)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+
+
+if __name__ == '__main__':
+    main()
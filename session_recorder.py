@@ -0,0 +1,314 @@
+"""
+Crash-safe recording of every logged sample to disk while the GUI runs.
+
+A session is a directory under the sessions root (one per GUI start):
+
+    sessions/20250513_134445/
+        series.jsonl        one line per series: {"id": 3, "type": "balances", "name": "Pump_1_Ch1"}
+        segment_000000.bin  fixed-size records (timestamp float64, series id uint32, value float64)
+        segment_000001.bin
+        index.jsonl         one line per sealed segment: file, first and last timestamp, records
+
+Samples are buffered in memory and appended by a writer thread every
+flush_interval seconds; fsync runs at most every fsync_interval seconds, which
+bounds what a power loss can cost. Segments are rotated every segment_seconds
+and sealed into the index, so a reload can skip segments outside the wanted
+time range. The segment being written at a crash is not in the index; it is
+still read, up to its last complete record. Gaps are stored as NaN values.
+"""
+import datetime
+import json
+import os
+import threading
+import time
+import numpy as np
+
+RECORD = np.dtype([('t', '<f8'), ('series', '<u4'), ('value', '<f8')])  # Packed, 20 bytes per sample
+
+
+def _fsync_dir(path):
+    """Make new directory entries durable (not supported on Windows, where it is skipped)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class SessionRecorder:
+    """
+    Appends samples to segment files of a new session directory from a background thread.
+
+    record() and record_tick() only append to an in-memory list, so they can be called
+    from the acquisition threads.
+    """
+    def __init__(self, root="sessions", flush_interval=1.0, fsync_interval=5.0, segment_seconds=3600.0):
+        """
+        Args:
+            root: Directory holding the session directories
+            flush_interval: Seconds between writes of the buffered samples
+            fsync_interval: Minimum seconds between fsyncs (at most this much data is at risk)
+            segment_seconds: Seconds of data per segment file before rotating
+        """
+        self.root = root
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.segment_seconds = segment_seconds
+        self.directory = None
+
+        self._ids = {}            # (data type, name) -> series id
+        self._new_series = []     # Series not yet written to series.jsonl
+        self._pending = []        # (timestamp, series id, value) not yet written
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.thread = None
+
+        self._segment = None      # Open segment file
+        self._segment_number = 0
+        self._segment_first = None
+        self._segment_last = None
+        self._segment_records = 0
+        self._segment_started = None
+        self._last_fsync = 0.0
+
+        self.records = 0
+        self.bytes_written = 0
+        self.fsyncs = 0
+        self.write_time = 0.0     # Time spent in the writer, to check the CPU overhead
+
+    def start(self):
+        """
+        Create a new session directory and start the writer thread.
+
+        Returns:
+            The session directory
+        """
+        name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.directory = os.path.join(self.root, name)
+        suffix = 1
+        while os.path.exists(self.directory):
+            self.directory = os.path.join(self.root, f"{name}_{suffix}")
+            suffix += 1
+        os.makedirs(self.directory)
+        _fsync_dir(self.root)
+
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._writer_loop, name="SessionRecorder")
+        self.thread.daemon = True
+        self.thread.start()
+        return self.directory
+
+    def stop(self):
+        """Write the remaining samples, seal the open segment and stop the writer thread."""
+        self._stop.set()
+        if self.thread is not None and self.thread.is_alive():
+            self.thread.join(timeout=5.0)
+
+    def record(self, data_type, name, timestamp, value):
+        """
+        Buffer one sample.
+
+        Args:
+            data_type: Graph dictionary type ('temperatures', 'pressures', 'balances', 'flow_rates')
+            name: Series name
+            timestamp: Unix time in seconds
+            value: Sample value, or None/NaN for a gap
+        """
+        with self._lock:
+            self._pending.append((timestamp, self._series_id(data_type, name),
+                                  np.nan if value is None else value))
+
+    def record_tick(self, timestamp, samples):
+        """
+        Buffer one synchronized tick of several series that share a timestamp.
+
+        Args:
+            timestamp: Unix time in seconds
+            samples: {data_type: {name: value}}
+        """
+        with self._lock:
+            for data_type, values in samples.items():
+                for name, value in values.items():
+                    self._pending.append((timestamp, self._series_id(data_type, name),
+                                          np.nan if value is None else value))
+
+    def _series_id(self, data_type, name):
+        key = (data_type, name)
+        series_id = self._ids.get(key)
+        if series_id is None:
+            series_id = self._ids[key] = len(self._ids)
+            self._new_series.append({'id': series_id, 'type': data_type, 'name': name})
+        return series_id
+
+    def stats(self):
+        """
+        Returns:
+            Dictionary with records and bytes written, fsyncs, the writer's busy time in
+            seconds and the number of the open segment
+        """
+        return {'records': self.records, 'bytes': self.bytes_written, 'fsyncs': self.fsyncs,
+                'write_time': self.write_time, 'segment': self._segment_number}
+
+    def _writer_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self._flush()
+            except Exception as e:
+                print(f"Error recording session: {e}")
+        try:
+            self._flush(final=True)
+        except Exception as e:
+            print(f"Error recording session: {e}")
+
+    def _flush(self, final=False):
+        start = time.perf_counter()
+        with self._lock:
+            pending, self._pending = self._pending, []
+            new_series, self._new_series = self._new_series, []
+
+        # Series names must be on disk before any record that refers to them
+        if new_series:
+            with open(os.path.join(self.directory, "series.jsonl"), 'a') as f:
+                for entry in new_series:
+                    f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+        if pending:
+            records = np.array(pending, dtype=RECORD)
+            if self._segment is not None and records['t'][0] - self._segment_started >= self.segment_seconds:
+                self._seal_segment()
+            if self._segment is None:
+                self._open_segment(records['t'][0])
+            self._segment.write(records.tobytes())
+            self._segment.flush()
+            self._segment_records += len(records)
+            self._segment_last = float(records['t'].max())
+            self._segment_first = min(self._segment_first, float(records['t'].min()))
+            self.records += len(records)
+            self.bytes_written += records.nbytes
+
+        now = time.monotonic()
+        if final:
+            if self._segment is not None:
+                self._seal_segment()
+        elif self._segment is not None and now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._segment.fileno())
+            self._last_fsync = now
+            self.fsyncs += 1
+        self.write_time += time.perf_counter() - start
+
+    def _open_segment(self, first_time):
+        path = os.path.join(self.directory, f"segment_{self._segment_number:06d}.bin")
+        self._segment = open(path, 'ab')
+        _fsync_dir(self.directory)
+        self._segment_first = first_time
+        self._segment_last = first_time
+        self._segment_records = 0
+        self._segment_started = first_time
+
+    def _seal_segment(self):
+        """fsync the open segment and add it to the index."""
+        self._segment.flush()
+        os.fsync(self._segment.fileno())
+        self.fsyncs += 1
+        self._segment.close()
+        entry = {'file': os.path.basename(self._segment.name), 'first': self._segment_first,
+                 'last': self._segment_last, 'records': self._segment_records}
+        with open(os.path.join(self.directory, "index.jsonl"), 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._segment = None
+        self._segment_number += 1
+        self._last_fsync = time.monotonic()
+
+
+def _read_jsonl(path):
+    """Entries of a JSON-lines file; a line torn by a crash is ignored."""
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path) as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+    return entries
+
+
+def list_sessions(root="sessions"):
+    """Session directories under root, oldest first."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(os.path.join(root, name) for name in os.listdir(root)
+                  if os.path.exists(os.path.join(root, name, "series.jsonl")))
+
+
+def latest_session(root="sessions", exclude=None):
+    """
+    The most recent session directory, or None.
+
+    Args:
+        root: Directory holding the session directories
+        exclude: Session directory to skip, e.g. the one being recorded
+    """
+    sessions = [path for path in list_sessions(root)
+                if exclude is None or os.path.abspath(path) != os.path.abspath(exclude)]
+    return sessions[-1] if sessions else None
+
+
+def load_session(directory, start=None, end=None):
+    """
+    Read a recorded session.
+
+    Sealed segments entirely outside [start, end] are skipped using the index; records of
+    a segment cut short by a crash are read up to the last complete one.
+
+    Args:
+        directory: Session directory
+        start: Optional earliest timestamp to return
+        end: Optional latest timestamp to return
+
+    Returns:
+        {(data_type, name): (timestamps, values)} with NumPy arrays sorted by time
+    """
+    series = {entry['id']: (entry['type'], entry['name'])
+              for entry in _read_jsonl(os.path.join(directory, "series.jsonl"))}
+    index = {entry['file']: entry for entry in _read_jsonl(os.path.join(directory, "index.jsonl"))}
+
+    chunks = []
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith("segment_") and name.endswith(".bin")):
+            continue
+        entry = index.get(name)
+        if entry is not None and ((start is not None and entry['last'] < start)
+                                  or (end is not None and entry['first'] > end)):
+            continue
+        path = os.path.join(directory, name)
+        count = os.path.getsize(path) // RECORD.itemsize
+        chunks.append(np.fromfile(path, dtype=RECORD, count=count))
+
+    records = np.concatenate(chunks) if chunks else np.empty(0, dtype=RECORD)
+    if start is not None:
+        records = records[records['t'] >= start]
+    if end is not None:
+        records = records[records['t'] <= end]
+
+    # Group by series, keeping the time order within each
+    records = records[np.lexsort((records['t'], records['series']))]
+    ids, first = np.unique(records['series'], return_index=True)
+    bounds = np.append(first, len(records))
+    result = {}
+    for i, series_id in enumerate(ids):
+        key = series.get(int(series_id))
+        if key is not None:
+            chunk = records[bounds[i]:bounds[i + 1]]
+            result[key] = (chunk['t'].copy(), chunk['value'].copy())
+    return result
@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+import tty
+
+import pytest
+
+from plc_emulator import PLCEmulator, PLCEmulatorServer
+from reglo_emulator import RegloEmulator
+from System2_AsyncEquipment import (AsyncBalanceReader, AsyncModbusConnection, AsyncOneBitClass, AsyncPump,
+                                    AsyncReadFloatsPLC, AsyncWriteFloatsPLC, EquipmentLoop)
+from System2_Equipment import PumpTimeoutError, ScanPlan
+
+
+@pytest.fixture(scope='module')
+def equipment_loop():
+    equipment_loop = EquipmentLoop()
+    yield equipment_loop
+    equipment_loop.stop()
+
+
+@pytest.fixture
+def plc_server():
+    emulator = PLCEmulator(address_map={}, seed=0)
+    server = PLCEmulatorServer(emulator, '127.0.0.1', 0)
+    server.start()
+    yield emulator, server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def _wait(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_blocking_proxy_drives_async_pump(equipment_loop):
+    emulator = RegloEmulator(latency=0.0, jitter=0.0)
+    pump = equipment_loop.wrap(AsyncPump(emulator.start()))
+    try:
+        pump.open()
+        assert pump.set_independent_channel_control().ok
+        assert pump.set_speed(2, 1.5) == '1500E-3'
+        assert pump.get_speed(2) == 1.5
+        assert pump.set_direction(2, 1).ok and emulator.direction[2] == 'K'
+        assert pump.set_mode(2, 0).ok and emulator.mode[2] == 'L'
+        assert not pump.start_channel(9).ok  # No such channel
+        assert pump.last_rtt > 0
+    finally:
+        pump.close()
+        emulator.stop()
+
+
+def test_async_pump_timeout(equipment_loop):
+    emulator = RegloEmulator()  # Never started, so nothing answers
+    pump = equipment_loop.wrap(AsyncPump(emulator.port, command_timeout=0.05))
+    try:
+        pump.open()
+        with pytest.raises(PumpTimeoutError):
+            pump.start_channel(1)
+    finally:
+        pump.close()
+        emulator.stop()
+
+
+def test_run_refuses_the_loop_thread(equipment_loop):
+    async def nested():
+        async def inner():
+            return 1
+        return equipment_loop.run(inner())
+
+    with pytest.raises(RuntimeError):
+        equipment_loop.run(nested())
+
+
+def test_async_plc_round_trip(equipment_loop, plc_server):
+    emulator, port = plc_server
+    writer = equipment_loop.wrap(AsyncWriteFloatsPLC('127.0.0.1', port))
+    coils = equipment_loop.wrap(AsyncOneBitClass('127.0.0.1', port))
+    reader = equipment_loop.wrap(AsyncReadFloatsPLC('127.0.0.1', port))
+    assert writer.client is reader.client is AsyncModbusConnection.get('127.0.0.1', port)
+    for plc in (writer, coils, reader):
+        plc.connect()
+    try:
+        assert not writer.write_float(100, 1.5).isError()
+        assert not writer.write_float(104, -2.25).isError()
+        assert not coils.write_onoff(7, True).isError()
+        assert reader.read_floats_once(ScanPlan([100, 104])) == {100: 1.5, 104: -2.25}
+        assert emulator.coils[7]
+        stats = reader.client.stats()
+        assert stats['requests'] == 4 and stats['errors'] == 0 and stats['connects'] == 1
+    finally:
+        for plc in (writer, coils, reader):
+            plc.disconnect()
+    assert not reader.client.client.connected
+
+
+def test_async_read_floats_scans_until_switched_off(equipment_loop, plc_server):
+    emulator, port = plc_server
+    emulator.registers[200:202] = [0, 0x3FC0]  # 1.5, low word first
+    plc = AsyncReadFloatsPLC('127.0.0.1', port)
+    values = []
+    equipment_loop.run(plc.connect())
+    plc.reading_onoff(True)
+    scan = equipment_loop.submit(plc.read_floats({200: values.append}, interval=0.01))
+    try:
+        assert _wait(lambda: len(values) >= 3)
+    finally:
+        plc.reading_onoff(False)
+        scan.result(timeout=2)
+        equipment_loop.run(plc.disconnect())
+    assert set(values) == {1.5}
+
+
+def test_async_connection_backs_off_while_plc_is_down(equipment_loop):
+    connection = AsyncModbusConnection('127.0.0.1', 1, backoff_initial=5.0)
+    equipment_loop.run(connection.acquire())  # Refused: reports the failure and schedules a retry
+    with pytest.raises(ConnectionError, match="reconnecting"):
+        equipment_loop.run(connection.execute('read_holding_registers', 100))
+    assert connection.stats()['errors'] == 1
+    equipment_loop.run(connection.release())
+
+
+def test_async_balance_readers_share_the_loop_thread(equipment_loop):
+    ptys = [os.openpty() for _ in range(3)]
+    for master, slave in ptys:
+        tty.setraw(slave)
+    threads = threading.active_count()
+    readers = [AsyncBalanceReader(os.ttyname(slave), equipment_loop=equipment_loop) for master, slave in ptys]
+    try:
+        for reader in readers:
+            reader.start()
+        assert threading.active_count() == threads
+        for i, (master, slave) in enumerate(ptys):
+            os.write(master, f"ST,+{i:08.2f}  g\r\nUS,+{i + 0.5:08.2f}".encode())
+            os.write(master, b"  g\r\n")
+        assert _wait(lambda: all(reader.count == 2 for reader in readers))
+        for i, reader in enumerate(readers):
+            count, times, masses, stable = reader.since(0)
+            assert masses.tolist() == [i, i + 0.5] and stable.tolist() == [True, False]
+            assert reader.latest()[0] == times[-1] <= time.monotonic()
+    finally:
+        for reader in readers:
+            reader.close()
+        for master, slave in ptys:
+            os.close(master)
+            os.close(slave)
+    assert all(not reader.ser.is_open for reader in readers)
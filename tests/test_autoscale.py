@@ -0,0 +1,68 @@
+import collections
+
+import numpy as np
+import pytest
+
+from System2_utils import Graph, Series, WindowExtremes
+
+
+def test_window_extremes_matches_brute_force():
+    rng = np.random.default_rng(1)
+    times = np.cumsum(rng.uniform(0.1, 1.0, 2000))
+    values = rng.normal(size=len(times))
+    values[rng.integers(0, len(values), 50)] = np.nan
+    extremes = WindowExtremes(30.0)
+    for i in range(0, len(times), 37):
+        extremes.add(times[i:i + 37], values[i:i + 37])
+        end = times[min(i + 37, len(times)) - 1]
+        inside = (times >= end - 30.0) & (times <= end) & ~np.isnan(values)
+        assert extremes.range() == (values[inside].min(), values[inside].max())
+
+
+def test_window_extremes_expire():
+    extremes = WindowExtremes(10.0)
+    extremes.add(np.array([0.0, 5.0]), np.array([9.0, 1.0]))
+    extremes.expire(12.0)
+    assert extremes.range() == (1.0, 1.0)
+    extremes.expire(100.0)
+    assert extremes.range() is None
+
+
+def _graph(**series):
+    temperatures = {name: [True, True, s] for name, s in series.items()}
+    graph = Graph(temperatures, {}, {}, {})
+    graph.time_window = 100
+    graph.start_time = 0.0
+    return graph
+
+
+def _fill(series, times, values):
+    series.extend(np.asarray(times, dtype=float), np.asarray(values, dtype=float))
+
+
+@pytest.mark.parametrize('mode', ['minmax', 'percentile'])
+def test_autoscale_anchored_at_global_latest(mode):
+    fast, slow = Series(10000), Series(10000)
+    _fill(fast, np.arange(0, 1000), np.full(1000, 1.0))
+    # The slow series stopped at t=850 with a spike the global window no longer shows
+    _fill(slow, [800, 850], [50.0, 2.0])
+    graph = _graph(fast=fast, slow=slow)
+    graph.set_autoscale(mode, (0.0, 100.0))
+    graph.prepare_snapshot()
+
+    assert graph._window_end == 999
+    assert graph._series_ranges[('Temperatures', 'slow')] is None
+    assert graph.value_ranges['Temperatures'] == {'min': 1.0, 'max': 1.0}
+
+
+def test_stalled_series_leaves_autoscale():
+    fast, slow = Series(10000), Series(10000)
+    graph = _graph(fast=fast, slow=slow)
+    _fill(fast, np.arange(0, 100), np.zeros(100))
+    _fill(slow, [90], [50.0])
+    graph.prepare_snapshot()
+    assert graph.value_ranges['Temperatures']['max'] == 50.0
+
+    _fill(fast, np.arange(100, 300), np.zeros(200))
+    graph.prepare_snapshot()  # Only the fast series changed
+    assert graph.value_ranges['Temperatures']['max'] == 0.0
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+import serial
+
+from System2_Equipment import BalanceReader, parse_balance_line
+
+
+@pytest.mark.parametrize('line, mass, stable', [
+    ("ST,+00123.45  g", 123.45, True),
+    ("US,-00001.20  g", -1.2, False),
+    ("S S     123.45 g", 123.45, True),
+    ("S D     123.45 g", 123.45, False),
+    ("N  +    123.45 g", 123.45, True),
+    ("N  -      0.50 g", -0.5, True),
+    ("   123.45 g ?", 123.45, False),
+    ("   123.45 g", 123.45, True),
+    ("W1 123.4 g", 123.4, True),
+    ("ST,+0000.150 kg", 150.0, True),
+    ("S S     250 mg", 0.25, True),
+    ("-0.12", -0.12, True),
+    (".5", 0.5, True),
+])
+def test_parse_balance_formats(line, mass, stable):
+    parsed = parse_balance_line(line)
+    assert parsed is not None
+    assert parsed[0] == pytest.approx(mass)
+    assert parsed[1] is stable
+
+
+@pytest.mark.parametrize('line', ["", "   ", "OL,+99999.99  g", "ST,-------  g", "S I"])
+def test_parse_balance_rejects(line):
+    assert parse_balance_line(line) is None
+
+
+def test_reader_since_returns_new_readings():
+    reader = BalanceReader(serial.serial_for_url('loop://', timeout=0.1), capacity=8)
+    reader.start()
+    try:
+        for i in range(5):
+            reader.ser.write(f"ST,+{i:08.2f}  g\r\n".encode())
+        deadline = time.monotonic() + 2
+        while reader.count < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        count, times, masses, stable = reader.since(0)
+        assert list(masses) == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert count == 5
+        assert stable.all()
+        assert all(b >= a for a, b in zip(times, times[1:]))
+
+        for i in range(5, 15):
+            reader.ser.write(f"ST,+{i:08.2f}  g\r\n".encode())
+        while reader.count < 15 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        count, _, masses, _ = reader.since(count)
+        # Readings overwritten by the overrun are skipped, along with the slot the
+        # reader writes next, which since() cannot tell apart from a torn copy
+        assert list(masses) == [float(i) for i in range(8, 15)]
+        assert count == 15
+    finally:
+        reader.close()
@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from System2_Equipment import CommandScheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = CommandScheduler("test")
+    yield scheduler
+    scheduler.stop()
+
+
+def _block(scheduler):
+    """Occupy the worker until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    scheduler.submit(hold)
+    assert started.wait(5)
+    return release
+
+
+def test_priority_order_fifo_within_priority(scheduler):
+    release = _block(scheduler)
+    ran = []
+    futures = [scheduler.submit(ran.append, name, priority=priority)
+               for name, priority in [('poll1', 2), ('gui1', 1), ('pid1', 0), ('poll2', 2), ('gui2', 1)]]
+    release.set()
+    for future in futures:
+        future.result(5)
+    assert ran == ['pid1', 'gui1', 'gui2', 'poll1', 'poll2']
+
+
+def test_keyed_commands_collapse(scheduler):
+    release = _block(scheduler)
+    ran = []
+    first = scheduler.submit(ran.append, 1.0, priority=CommandScheduler.PRIORITY_POLL, key='speed')
+    second = scheduler.submit(ran.append, 2.0, priority=CommandScheduler.PRIORITY_PID, key='speed')
+    scheduler.submit(ran.append, 'gui', priority=CommandScheduler.PRIORITY_GUI)
+    release.set()
+    first.result(5)
+    second.result(5)
+    scheduler.call(lambda: None)
+    # Last write wins and takes the higher priority
+    assert ran == [2.0, 'gui']
+    assert scheduler.stats()['collapsed'] == 1
+
+
+def test_errors_reach_the_caller(scheduler):
+    def fail():
+        raise IOError("port gone")
+
+    with pytest.raises(IOError):
+        scheduler.call(fail, timeout=5)
+    assert scheduler.call(lambda: 42, timeout=5) == 42
+
+
+def test_submit_from_worker_runs_inline(scheduler):
+    assert scheduler.call(lambda: scheduler.call(lambda: 'inner'), timeout=5) == 'inner'
+
+
+def test_stats_and_stop(scheduler):
+    for i in range(5):
+        scheduler.call(lambda: None)
+    stats = scheduler.stats()
+    assert stats['executed'] == 5 and stats['queue_depth'] == 0
+    scheduler.stop()
+    scheduler.thread.join(5)
+    with pytest.raises(RuntimeError):
+        scheduler.submit(lambda: None)
@@ -0,0 +1,45 @@
+import csv
+import importlib.util
+
+import numpy as np
+
+import data_export
+
+
+def _tables():
+    timestamps = np.array([1.0, 2.0, 3.0])
+    columns = np.array([[1.5, np.nan], [2.5, 20.0], [np.nan, 30.0]])
+    return [('Temperatures', timestamps, ['T1', 'T2'], columns)]
+
+
+def test_csv_round_trip(tmp_path):
+    paths = data_export.write_csv(str(tmp_path / 'run.csv'), _tables(), chunk_rows=2)
+    assert paths == [str(tmp_path / 'run_Temperatures.csv')]
+    with open(paths[0]) as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['Timestamp', 'T1', 'T2']
+    assert rows[1] == ['1.000000', '1.5', '']
+    assert rows[3] == ['3.000000', '', '30']
+
+
+def test_available_writers_hide_missing_backends(monkeypatch):
+    def writer(filename, tables, progress=None):
+        return [filename]
+
+    monkeypatch.setattr(data_export, 'WRITERS', dict(data_export.WRITERS))
+    monkeypatch.setattr(data_export, 'REQUIRES', dict(data_export.REQUIRES))
+    data_export.register_writer('fake', writer, '.fake', requires='module_that_is_not_installed')
+    data_export.register_writer('plain', writer, '.plain')
+
+    available = data_export.available_writers()
+    assert 'fake' not in available
+    assert {'xlsx', 'csv', 'plain'} <= set(available)
+    for fmt in ('parquet', 'feather', 'hdf5'):
+        module = data_export.REQUIRES[fmt]
+        assert (fmt in available) == (importlib.util.find_spec(module) is not None)
+
+
+def test_format_for():
+    assert data_export.format_for('run.parquet') == 'parquet'
+    assert data_export.format_for('run.hdf5') == 'hdf5'
+    assert data_export.format_for('run.txt') is None
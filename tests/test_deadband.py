@@ -0,0 +1,41 @@
+from System2_Equipment import Deadband, DeadbandSet
+
+
+def test_absolute_band():
+    band = Deadband(absolute=0.5)
+    assert band.check(10.0, now=0)
+    assert not band.check(10.4, now=1)
+    assert not band.check(9.6, now=2)  # Measured from the last reported value, not the last reading
+    assert band.check(10.6, now=3)
+    assert band.last_value == 10.6
+
+
+def test_percent_band_and_heartbeat():
+    band = Deadband(percent=10, heartbeat=5)
+    assert band.check(100.0, now=0)
+    assert not band.check(109.0, now=1)
+    assert band.check(111.0, now=2)
+    assert not band.check(111.0, now=6)
+    assert band.check(111.0, now=7)  # Nothing reported for 5 s
+
+
+def test_zero_band_reports_any_change():
+    band = Deadband()
+    assert band.check(1.0, now=0)
+    assert not band.check(1.0, now=1)
+    assert band.check(1.0001, now=2)
+    band.reset()
+    assert band.check(1.0001, now=3)
+
+
+def test_deadband_set_defaults_and_overrides():
+    bands = DeadbandSet()
+    assert bands.check(100, 1.0) and bands.check(100, 1.0)  # No configuration: report everything
+
+    bands.set_default(absolute=1.0)
+    bands.configure(102, absolute=0.1)
+    assert bands.check(100, 1.0, now=0) and not bands.check(100, 1.5, now=1)
+    assert bands.check(102, 1.0, now=0) and bands.check(102, 1.2, now=1)
+
+    bands.reset()
+    assert bands.check(100, 1.5, now=2)
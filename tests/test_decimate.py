@@ -0,0 +1,45 @@
+import numpy as np
+
+from System2_utils import decimate_minmax
+
+
+def test_short_series_unchanged():
+    times = np.arange(10.0)
+    values = np.sin(times)
+    out_t, out_v = decimate_minmax(times, values, 5)
+    assert out_t is times and out_v is values
+
+
+def test_keeps_extremes_and_endpoints():
+    rng = np.random.default_rng(0)
+    times = np.arange(10000.0)
+    values = rng.normal(size=len(times))
+    values[1234] = 50.0
+    values[8765] = -50.0
+    out_t, out_v = decimate_minmax(times, values, 100)
+
+    assert len(out_t) <= 2 * 100 + 2
+    assert np.all(np.diff(out_t) > 0)
+    assert out_t[0] == 0.0 and out_t[-1] == times[-1]
+    assert 1234.0 in out_t and 8765.0 in out_t
+    # A subset of the original samples
+    assert np.array_equal(values[out_t.astype(int)], out_v)
+    # Every bucket keeps its own min and max
+    edges = np.linspace(times[0], times[-1], 101)
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        inside = (times >= lo) & (times < hi)
+        kept = (out_t >= lo) & (out_t < hi)
+        assert out_v[kept].max() == values[inside].max()
+        assert out_v[kept].min() == values[inside].min()
+
+
+def test_keeps_gaps_and_latest_valid_sample():
+    times = np.arange(1000.0)
+    values = np.ones(len(times))
+    values[500:510] = np.nan
+    values[-3:] = np.nan
+    values[-4] = 7.0
+    out_t, out_v = decimate_minmax(times, values, 20)
+
+    assert 500.0 in out_t and np.isnan(out_v[out_t == 500.0]).all()
+    assert 996.0 in out_t and out_v[out_t == 996.0][0] == 7.0
@@ -0,0 +1,47 @@
+import datetime
+
+import numpy as np
+import openpyxl
+
+from System2_utils import Graph, Series
+
+
+def _graph():
+    temperatures = {'T1': [True, True, Series(100)], 'T2': [True, True, Series(100)],
+                    'Off': [False, True, Series(100)]}
+    graph = Graph(temperatures, {}, {}, {}, max_points=100)
+    t1, t2 = temperatures['T1'][2], temperatures['T2'][2]
+    t1.extend(np.array([100.0, 101.0, 103.0]), np.array([1.0, 2.0, 3.0]))
+    t1.append_gap(103.5)
+    t2.extend(np.array([101.0, 102.0]), np.array([20.0, 30.0]))
+    temperatures['Off'][2].append(100.0, 9.0)
+    return graph
+
+
+def test_export_columns_align_on_merged_timestamps():
+    timestamps, names, columns = _graph().export_columns('Temperatures')
+    assert names == ['T1', 'T2']  # Series switched off are not exported
+    assert timestamps.tolist() == [100.0, 101.0, 102.0, 103.0]  # The gap marker is left out
+    np.testing.assert_array_equal(columns, [[1.0, np.nan], [2.0, 20.0], [np.nan, 30.0], [3.0, np.nan]])
+
+
+def test_export_tables_cover_every_type():
+    tables = _graph().export_tables()
+    assert [table[0] for table in tables] == Graph.EXPORT_TYPES
+    assert all(len(timestamps) == 0 and names == [] for data_type, timestamps, names, columns in tables[1:])
+
+
+def test_excel_round_trip(tmp_path):
+    progress = []
+    filename = _graph().export_data(str(tmp_path / 'run.xlsx'), progress.append)
+    assert filename == str(tmp_path / 'run.xlsx')
+    assert progress[-1] == 1.0
+
+    wb = openpyxl.load_workbook(filename)
+    assert wb.sheetnames == Graph.EXPORT_TYPES
+    rows = list(wb['Temperatures'].iter_rows(values_only=True))
+    assert rows[0] == ('Date/Time', 'T1', 'T2')
+    assert rows[1] == (datetime.datetime.fromtimestamp(100.0).strftime("%Y-%m-%d %H:%M:%S"), 1.0, None)
+    assert [row[1:] for row in rows[2:]] == [(2.0, 20.0), (None, 30.0), (3.0, None)]
+    assert wb['Temperatures'].freeze_panes == 'A2'
+    assert list(wb['Pressures'].iter_rows(values_only=True)) == [('Date/Time',)]
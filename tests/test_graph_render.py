@@ -0,0 +1,170 @@
+import threading
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+from System2_utils import Graph, RenderScheduler, Series
+
+
+@pytest.fixture
+def figure():
+    fig, plots = plt.subplots(2, 2)
+    yield fig, plots.flatten()
+    plt.close(fig)
+
+
+def _graph(render_mode='blit'):
+    temperatures = {'T1': [True, True, Series(100)], 'T2': [True, True, Series(100)]}
+    balances = {'B1': [True, True, Series(100)]}
+    graph = Graph(temperatures, {}, balances, {}, max_points=100, render_mode=render_mode)
+    graph.start_time = time.time() - 10
+    return graph, temperatures, balances
+
+
+def _render(graph, fig, plots):
+    return graph.render_frame(plots, fig.canvas, fig)
+
+
+def test_blit_keeps_artists_and_skips_idle_frames(figure):
+    fig, plots = figure
+    graph, temperatures, balances = _graph()
+    for k in range(5):
+        temperatures['T1'][2].append(graph.start_time + k, 20.0 + k)
+    assert _render(graph, fig, plots)  # Sets up the axes and draws every series
+
+    line, annotation = graph._artists[('Temperatures', 'T1')]
+    assert line.get_visible() and line.get_animated()
+    assert np.allclose(line.get_xdata(), np.arange(5)) and list(line.get_ydata()) == [20, 21, 22, 23, 24]
+    assert annotation.get_text() == '24.00'
+    assert not _render(graph, fig, plots)  # Nothing new arrived
+
+    temperatures['T1'][2].append(graph.start_time + 5, 30.0)
+    assert _render(graph, fig, plots)
+    assert graph._artists[('Temperatures', 'T1')][0] is line  # Updated in place, not recreated
+    assert list(line.get_ydata())[-1] == 30.0
+
+
+def test_hidden_series_hides_its_line(figure):
+    fig, plots = figure
+    graph, temperatures, balances = _graph()
+    temperatures['T1'][2].append(graph.start_time + 1, 20.0)
+    _render(graph, fig, plots)
+    graph.toggle_series('temperatures', 'T1', False)
+    assert _render(graph, fig, plots)
+    assert not graph._artists[('Temperatures', 'T1')][0].get_visible()
+
+
+@pytest.mark.parametrize('render_mode', ['full', 'blit'])
+def test_render_modes_draw_the_same_lines(figure, render_mode):
+    fig, plots = figure
+    graph, temperatures, balances = _graph(render_mode)
+    for k in range(5):
+        balances['B1'][2].append(graph.start_time + k, 100.0 - k)
+    assert _render(graph, fig, plots)
+    lines = [line for line in plots[2].get_lines() if line.get_label() == 'B1']
+    assert len(lines) == 1
+    assert list(lines[0].get_ydata()) == [100, 99, 98, 97, 96]
+    assert graph.frame_stats()['last'] > 0
+
+
+class FakeRoot:
+    """Records root.after calls instead of running a Tk main loop."""
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, func):
+        self.scheduled.append((ms, func))
+        return len(self.scheduled)
+
+    def after_cancel(self, after_id):
+        pass
+
+
+def test_render_scheduler_draws_snapshots_and_counts_idle_frames(figure):
+    fig, plots = figure
+    graph, temperatures, balances = _graph()
+    root = FakeRoot()
+    scheduler = RenderScheduler(root, graph, plots, fig.canvas, fig, fps=10.0)
+    scheduler.start()
+    assert root.scheduled[-1][0] == 100
+
+    graph.render_frame(plots, fig.canvas, fig)  # First frame sets up the blit artists
+    temperatures['T1'][2].append(graph.start_time + 1, 20.0)
+    graph.prepare_snapshot()
+    root.scheduled[-1][1]()
+    assert scheduler.frames == 1 and scheduler.idle == 0
+    assert graph._artists[('Temperatures', 'T1')][0].get_visible()
+
+    root.scheduled[-1][1]()  # No new data
+    assert scheduler.frames == 1 and scheduler.idle == 1
+
+
+def test_render_scheduler_drops_missed_deadlines(figure):
+    fig, plots = figure
+    graph, temperatures, balances = _graph()
+    root = FakeRoot()
+    graph.stop_plotting()  # Only the deadline bookkeeping runs
+    scheduler = RenderScheduler(root, graph, plots, fig.canvas, fig, fps=100.0)
+    scheduler.start()
+    time.sleep(0.055)  # The Tk loop was busy for about five frame periods
+    root.scheduled[-1][1]()
+    assert scheduler.dropped >= 3 and scheduler.frames == 0
+    assert 1 <= root.scheduled[-1][0] <= 10  # The next frame is due within one period, not caught up
+
+
+def test_snapshot_loop_prepares_snapshots_on_ingest():
+    graph, temperatures, balances = _graph()
+    graph.update_interval = 0.01
+    thread = threading.Thread(target=graph.snapshot_loop)
+    thread.daemon = True
+    thread.start()
+    try:
+        temperatures['T1'][2].append(graph.start_time + 1, 20.0)
+        deadline = time.monotonic() + 2.0
+        snapshot = None
+        while snapshot is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+            snapshot = graph.take_snapshot()
+        assert snapshot is not None and ('Temperatures', 'T1') in snapshot['series']
+    finally:
+        graph.stop_plotting()
+        thread.join(2.0)
+
+
+def test_ingest_marks_only_its_series_and_plot_dirty():
+    graph, temperatures, balances = _graph()
+    graph.prepare_snapshot()
+    graph.take_snapshot()
+
+    graph.update_dict('temperatures', 'T2', 21.0)
+    assert graph._dirty_series == {('Temperatures', 'T2')}
+    assert graph.dirty_categories == {'Temperatures'}
+    assert graph._data_event.is_set()
+
+    graph.prepare_snapshot()
+    snapshot = graph.take_snapshot()
+    assert set(snapshot['series']) == {('Temperatures', 'T2')}
+    assert snapshot['categories'] == {'Temperatures'}
+
+    graph.mark_dirty('temperatures', 'T2')  # Dirty but unchanged: no snapshot
+    graph.prepare_snapshot()
+    assert graph.take_snapshot() is None
+
+
+def test_only_changed_axes_are_blitted(figure, monkeypatch):
+    fig, plots = figure
+    graph, temperatures, balances = _graph()
+    temperatures['T1'][2].append(graph.start_time + 1, 20.0)
+    balances['B1'][2].append(graph.start_time + 1, 100.0)
+    _render(graph, fig, plots)
+
+    blitted = []
+    monkeypatch.setattr(fig.canvas, 'blit', lambda bbox=None: blitted.append(bbox))
+    monkeypatch.setattr(fig.canvas, 'draw', lambda: pytest.fail("unexpected full redraw"))
+    balances['B1'][2].append(graph.start_time + 2, 100.0)  # Within the current limits
+    assert _render(graph, fig, plots)
+    assert blitted == [plots[2].bbox]
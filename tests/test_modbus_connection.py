@@ -0,0 +1,82 @@
+import socket
+import time
+
+import pytest
+
+from plc_emulator import PLCEmulator, PLCEmulatorServer
+from System2_Equipment import ModbusConnection, ModbusConnectionManager, ReadFloatsPLC, WriteFloatsPLC
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def server():
+    server = PLCEmulatorServer(PLCEmulator(address_map={}, seed=0), '127.0.0.1', 0)
+    server.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_manager_shares_one_connection_per_endpoint(server):
+    port = server.server_address[1]
+    reader = ReadFloatsPLC('127.0.0.1', port)
+    writer = WriteFloatsPLC('127.0.0.1', port)
+    assert reader.client is writer.client
+    assert ModbusConnectionManager.get('127.0.0.1', port) is reader.client
+    assert ModbusConnectionManager.get('127.0.0.1', _free_port()) is not reader.client
+
+
+def test_connection_closes_with_last_user(server):
+    port = server.server_address[1]
+    reader = ReadFloatsPLC('127.0.0.1', port)
+    writer = WriteFloatsPLC('127.0.0.1', port)
+    reader.connect()
+    writer.connect()
+    writer.connect()  # A second connect() of the same wrapper is not a second user
+    assert reader.client.client.connected
+    reader.disconnect()
+    assert writer.client.client.connected
+    writer.disconnect()
+    assert not writer.client.client.connected
+
+
+def test_stats_count_requests(server):
+    connection = ModbusConnection('127.0.0.1', server.server_address[1])
+    connection.acquire()
+    try:
+        for _ in range(5):
+            assert not connection.read_holding_registers(100, count=2).isError()
+        stats = connection.stats()
+        assert stats['requests'] == 5
+        assert stats['errors'] == 0
+        assert stats['connects'] == 1
+        assert 0 < stats['p50_latency'] <= stats['max_latency']
+        connection.reset_stats()
+        assert connection.stats()['requests'] == 0
+    finally:
+        connection.release()
+
+
+def test_reconnect_backs_off_until_plc_is_up():
+    port = _free_port()
+    connection = ModbusConnection('127.0.0.1', port, backoff_initial=0.2, backoff_max=0.4)
+    connection.acquire()  # PLC down: reports the failure and schedules a retry
+    with pytest.raises(ConnectionError, match="reconnecting"):
+        connection.read_holding_registers(100)
+    assert connection.stats()['errors'] == 1
+
+    server = PLCEmulatorServer(PLCEmulator(address_map={}, seed=0), '127.0.0.1', port)
+    server.start()
+    try:
+        time.sleep(0.25)
+        assert not connection.read_holding_registers(100).isError()
+        assert connection.stats()['connects'] == 1
+    finally:
+        connection.release()
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,139 @@
+import os
+import time
+import tty
+
+import numpy as np
+import pytest
+
+from pid_control import PIDControl, PIDExecutor
+
+CONTROLLER = {'set_point': 1.0, 'kp': 0.5, 'ki': 0.2, 'kd': 0.05, 'integral_error_limit': 2.0}
+
+
+class RecordingPump:
+    PRIORITY_PID = 0
+
+    def __init__(self):
+        self.writes = []
+
+    def set_speeds(self, speeds, priority=PRIORITY_PID):
+        self.writes.append(dict(speeds))
+
+
+@pytest.fixture
+def balance():
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    yield master, os.ttyname(slave)
+    os.close(master)
+    os.close(slave)
+
+
+def _feed(master, masses):
+    for mass in masses:
+        os.write(master, f"ST,+{mass:08.2f}  g\r\n".encode())
+
+
+def _wait(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_pid_step_matches_scalar_pid():
+    rng = np.random.default_rng(2)
+    executor = PIDExecutor()
+    gains = [(1.0, 0.5, 0.2, 0.05, 2.0), (2.0, 1.0, 0.0, 0.0, 0.0), (0.5, 0.1, 0.5, 0.1, 0.3)]
+    pids = [PIDControl.PID(*g) for g in gains]
+    table = np.zeros((len(gains), 9))
+    for row, (set_point, kp, ki, kd, limit) in zip(table, gains):
+        row[[executor.SET_POINT, executor.KP, executor.KI, executor.KD, executor.LIMIT]] = \
+            set_point, kp, ki, kd, limit
+
+    for step in range(50):
+        flows = rng.uniform(0, 3, len(gains))
+        if step % 7 == 0:
+            flows[0] = 0.0  # A zero reading counts as no error
+        dt = rng.uniform(0.05, 1.0)
+        run = rng.random(len(gains)) > 0.3
+        table[:, executor.PID_DT] += dt
+        pid_dts = table[:, executor.PID_DT].copy()
+        outputs = executor._pid_step(table, run, flows)
+        for i in np.flatnonzero(run):
+            assert outputs[i] == pytest.approx(pids[i](flows[i], pid_dts[i]), abs=1e-12)
+
+
+def test_loop_writes_pump(balance):
+    master, port = balance
+    pump = RecordingPump()
+    executor = PIDExecutor(rate=20)
+    executor.add_loop('Pump_1_Ch2', port, pump, 2, CONTROLLER, matrix_len=5)
+    executor.start()
+    try:
+        _feed(master, [100.0 - 0.01 * i for i in range(10)])
+        # The readings may arrive over several ticks
+        assert _wait(lambda: pump.writes and executor.get_last('Pump_1_Ch2')[0] == pytest.approx(99.91))
+        assert set(pump.writes[-1]) == {2}
+        mass, flow_rate, output = executor.get_last('Pump_1_Ch2')
+        assert output is not None and output >= 0
+    finally:
+        executor.stop()
+    assert executor.loops() == []
+
+
+def test_loops_share_reader_and_port_reopens(balance):
+    master, port = balance
+    executor = PIDExecutor()
+    executor.add_loop('a', port, RecordingPump(), 1, CONTROLLER)
+    executor.add_loop('b', port, RecordingPump(), 2, CONTROLLER)
+    assert len(executor._readers) == 1 and executor._readers[port][1] == 2
+    reader = executor._readers[port][0]
+
+    executor.remove_loop('a')
+    assert executor._readers[port][1] == 1
+    executor.remove_loop('b')
+    assert port not in executor._readers
+
+    # Re-adding waits for the background close instead of opening the port twice
+    executor.add_loop('a', port, RecordingPump(), 1, CONTROLLER)
+    assert reader._stopped.is_set() and not reader.ser.is_open
+    assert port not in executor._closing
+    assert executor._readers[port][0] is not reader
+    executor.stop()
+
+
+def test_remove_unknown_loop():
+    assert PIDExecutor().remove_loop('missing') is False
+
+
+def test_disabled_loop_measures_without_writing(balance):
+    master, port = balance
+    pump = RecordingPump()
+    executor = PIDExecutor(rate=20)
+    executor.add_loop('x', port, pump, 1, CONTROLLER, matrix_len=3)
+    executor.pid_onoff('x', False)
+    executor.start()
+    try:
+        _feed(master, [50.0, 49.9, 49.8, 49.7])
+        assert _wait(lambda: executor.get_last('x')[0] == pytest.approx(49.7))
+        assert pump.writes == []
+    finally:
+        executor.stop()
+
+
+@pytest.mark.parametrize('pump_type, command', [('ELDEX', b'SF01.500\r\n'), ('UI-22', b';01,S3,01500\r\n')])
+def test_serial_pump_commands(pump_type, command):
+    class Port:
+        port = 'COM9'
+        written = b''
+
+        def write(self, data):
+            self.written += data
+
+    port = Port()
+    PIDExecutor.SerialPump(port, pump_type).set_speeds({1: 1.5})
+    assert port.written == command
+
+    with pytest.raises(ValueError):
+        PIDExecutor.SerialPump(port, 'REGLO')
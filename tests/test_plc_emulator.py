@@ -0,0 +1,73 @@
+import threading
+
+import numpy as np
+import pytest
+
+from plc_emulator import PLCEmulator, PLCEmulatorServer
+from System2_Equipment import OneBitClass, ReadFloatsPLC, WriteFloatsPLC, decode_floats
+
+
+@pytest.fixture
+def emulator():
+    emulator = PLCEmulator(address_map={'Temperatures': [200]}, seed=0)
+    server = PLCEmulatorServer(emulator, '127.0.0.1', 0)
+    server.start()
+    emulator.port = server.server_address[1]
+    yield emulator
+    server.shutdown()
+    server.server_close()
+
+
+def test_float_writes_land_in_registers(emulator):
+    writer = WriteFloatsPLC('127.0.0.1', emulator.port)
+    writer.connect()
+    try:
+        futures = [writer.write_float(100, 1.5), writer.write_float(102, -2.25)]
+        for future in futures:
+            future.result(timeout=5)
+    finally:
+        writer.disconnect()
+    values = decode_floats(emulator.registers[100:104], np.array([0, 2]))
+    assert values.tolist() == [1.5, -2.25]
+
+
+def test_coil_writes(emulator):
+    plc = OneBitClass('127.0.0.1', emulator.port)
+    plc.connect()
+    try:
+        plc.write_onoff(10, True).result(timeout=5)
+        plc.write_onoff(11, True).result(timeout=5)
+        plc.write_onoff(10, False).result(timeout=5)
+    finally:
+        plc.disconnect()
+    assert emulator.coils[10:12].tolist() == [False, True]
+
+
+def test_read_floats_scans_values_and_waveforms(emulator):
+    emulator.registers[100:104] = [0, 0x3FC0, 0, 0xC010]  # 1.5 and -2.25, low word first
+    reader = ReadFloatsPLC('127.0.0.1', emulator.port)
+    reader.connect()
+    received = {}
+    done = threading.Event()
+
+    def callback(reg):
+        def store(value):
+            received[reg] = value
+            if len(received) == 3:
+                reader.reading_onoff(False)
+                done.set()
+        return store
+
+    reader.reading_onoff(True)
+    thread = threading.Thread(target=reader.read_floats,
+                              args=({reg: callback(reg) for reg in (100, 102, 200)},), kwargs={'interval': 0.01})
+    thread.daemon = True
+    thread.start()
+    try:
+        assert done.wait(5)
+        thread.join(5)
+    finally:
+        reader.disconnect()
+    assert received[100] == 1.5
+    assert received[102] == -2.25
+    assert 22.0 < received[200] < 28.0  # 25 +- 2 sine plus a little noise
@@ -0,0 +1,99 @@
+import threading
+
+import numpy as np
+import pytest
+
+from System2_Equipment import PLCWriteQueue, decode_floats
+
+
+def _floats(payload):
+    words = np.asarray(payload, dtype=np.uint16)
+    return list(decode_floats(words, np.arange(0, len(words), 2)))
+
+
+class _Result:
+    def __init__(self, error=False):
+        self.error = error
+
+    def isError(self):
+        return self.error
+
+
+class FakeConnection:
+    """Records requests; the first one blocks until `release` is set."""
+    host = 'fake'
+
+    def __init__(self, fail=()):
+        self.requests = []
+        self.fail = set(fail)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def execute(self, method, address, payload):
+        self.started.set()
+        self.release.wait(5)
+        if method in self.fail:
+            raise IOError("boom")
+        self.requests.append((method, address, payload))
+        return _Result()
+
+
+def _blocked_queue(**kwargs):
+    """Queue whose worker is stuck on a first coil write, so later writes pile up."""
+    conn = FakeConnection(**kwargs)
+    queue = PLCWriteQueue(conn)
+    queue.write_coil(999, True)
+    assert conn.started.wait(5)
+    return conn, queue
+
+
+def test_coalesces_same_kind_runs():
+    conn, queue = _blocked_queue()
+    first = queue.write_float(10, 1.0)
+    second = queue.write_float(10, 2.0)
+    queue.write_float(12, 3.0)
+    conn.release.set()
+    assert queue.flush(5)
+
+    assert [r[0] for r in conn.requests] == ['write_coil', 'write_registers']
+    method, address, payload = conn.requests[1]
+    assert address == 10
+    assert _floats(payload) == pytest.approx([2.0, 3.0])
+    assert first.result(1) >= 0 and second.result(1) >= 0
+
+
+def test_keeps_order_across_kinds():
+    conn, queue = _blocked_queue()
+    queue.write_float(20, 5.0)
+    queue.write_coil(1, True)
+    queue.write_float(20, 6.0)
+    conn.release.set()
+    assert queue.flush(5)
+
+    sent = [(m, a) for m, a, _ in conn.requests[1:]]
+    assert sent == [('write_registers', 20), ('write_coil', 1), ('write_registers', 20)]
+    assert _floats(conn.requests[1][2]) == pytest.approx([5.0])
+    assert _floats(conn.requests[3][2]) == pytest.approx([6.0])
+
+
+def test_adjacent_coils_batch():
+    conn, queue = _blocked_queue()
+    for address in (3, 1, 2):
+        queue.write_coil(address, address != 2)
+    conn.release.set()
+    assert queue.flush(5)
+    assert conn.requests[1] == ('write_coils', 1, [True, False, True])
+
+
+def test_failure_resolves_futures_and_worker_survives():
+    conn, queue = _blocked_queue(fail={'write_registers'})
+    failed = queue.write_float(30, 1.0)
+    conn.release.set()
+    with pytest.raises(IOError):
+        failed.result(5)
+    assert queue.flush(5)
+
+    ok = queue.write_coil(5, True)
+    assert ok.result(5) >= 0
+    assert queue.flush(5)
+    assert conn.requests[-1] == ('write_coil', 5, True)
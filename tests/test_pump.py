@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from reglo_emulator import RegloEmulator
+from System2_Equipment import Pump, PumpTimeoutError
+
+
+@pytest.fixture
+def emulator():
+    emulator = RegloEmulator(latency=0.0, jitter=0.0)
+    emulator.start()
+    yield emulator
+    emulator.stop()
+
+
+def test_ack_and_nak_replies(emulator):
+    pump = Pump(emulator.port)
+    try:
+        reply = pump.transact('1H')
+        assert reply.text == '*' and reply.ok
+        reply = pump.transact('9H')
+        assert reply.text == '#' and not reply.ok
+        assert pump.last_rtt == reply.rtt > 0
+    finally:
+        pump.close()
+
+
+def test_query_reply_read_to_terminator(emulator):
+    pump = Pump(emulator.port)
+    try:
+        assert pump.transact('2f1234-3').text == '1234E-3'
+        # Replies come back whole, so the next command is not confused by leftovers
+        assert pump.transact('2xD').text == 'J'
+        assert Pump.parse_speed(pump.transact('2f').text) == pytest.approx(1.23)
+    finally:
+        pump.close()
+
+
+def test_timeout_raises_and_next_command_recovers(emulator):
+    pump = Pump(emulator.port, command_timeout=0.05)
+    try:
+        emulator.latency = 0.2
+        with pytest.raises(PumpTimeoutError):
+            pump.transact('1xD')
+        emulator.latency = 0.0
+        time.sleep(0.25)  # The late reply arrives and is dropped before the next command
+        assert pump.transact('1xM').text == 'L'
+    finally:
+        pump.close()
+
+
+def test_parse_speed():
+    assert Pump.parse_speed('1500E-3\r\n') == pytest.approx(1.5)
+    assert Pump.parse_speed('1500') == pytest.approx(1.5)
+    with pytest.raises(ValueError):
+        Pump.parse_speed('')
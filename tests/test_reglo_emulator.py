@@ -0,0 +1,47 @@
+import pytest
+
+from reglo_emulator import RegloEmulator
+from System2_Equipment import Pump
+
+
+@pytest.fixture
+def pump():
+    emulator = RegloEmulator(latency=0.0, jitter=0.0)
+    pump = Pump(emulator.start())
+    yield pump, emulator
+    pump.close()
+    emulator.stop()
+
+
+@pytest.mark.parametrize('value, text', [(1.5, '1500E-3'), (0.0, '0000E+0'), (12.34, '1234E-2'), (250.0, '2500E-1')])
+def test_format_flow(value, text):
+    assert RegloEmulator.format_flow(value) == text
+
+
+def test_reply_to_commands():
+    emulator = RegloEmulator()
+    try:
+        assert emulator.reply_to('1~1') == b'*'
+        assert emulator.reply_to('2H') == b'*' and emulator.running[2]
+        assert emulator.reply_to('2K') == b'*'
+        assert emulator.reply_to('2xD') == b'K\r\n'
+        assert emulator.reply_to('3f1500-3') == b'1500E-3\r\n'
+        assert emulator.flow_rate[3] == pytest.approx(1.5)
+        assert emulator.reply_to('9H') == b'#'  # No such channel
+        assert emulator.reply_to('bogus') == b'#'
+        assert emulator.commands == 7
+    finally:
+        emulator.stop()
+
+
+def test_pump_round_trip(pump):
+    pump, emulator = pump
+    assert pump.set_independent_channel_control().ok
+    assert pump.start_channel(1).ok
+    pump.set_speed(1, 2.5)
+    assert pump.get_speed(1) == pytest.approx(2.5)
+    pump.set_direction(1, 1)
+    assert pump.get_direction(1) == 'K'
+    pump.set_mode(1, 0)
+    assert pump.get_mode(1) == 'L'
+    assert emulator.running[1] and emulator.mode[1] == 'L'
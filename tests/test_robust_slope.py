@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from pid_control import PIDControl
+
+
+def _drain(n, rate=-0.02, noise=0.005, seed=0, start=0.0):
+    rng = np.random.default_rng(seed)
+    t = start + np.arange(n) * 0.5
+    return t, 100.0 + rate * t + rng.normal(0, noise, n)
+
+
+def _feed(estimator, t, y):
+    for ti, yi in zip(t, y):
+        estimator.add(ti, yi)
+
+
+def test_clean_data_matches_least_squares():
+    t, y = _drain(20)
+    estimator = PIDControl.RobustSlopeEstimator(20)
+    _feed(estimator, t, y)
+    assert estimator.slope == pytest.approx(np.polyfit(t, y, 1)[0], rel=1e-6)
+    assert estimator.confidence == 1.0
+    assert estimator.residual < 0.02
+
+
+def test_single_spike_is_dropped():
+    t, y = _drain(40)
+    y[25] += 5.0
+    estimator = PIDControl.RobustSlopeEstimator(10)
+    _feed(estimator, t[:27], y[:27])
+    assert estimator.outliers == 1 and estimator.steps == 0
+    assert estimator.confidence == pytest.approx(0.9)  # One of the last ten readings was rejected
+    _feed(estimator, t[27:], y[27:])
+    assert estimator.slope == pytest.approx(-0.02, abs=0.005)
+    assert estimator.confidence == 1.0
+
+
+def test_refill_restarts_window():
+    t, y = _drain(40)
+    y[20:] += 30.0  # Reservoir refilled
+    estimator = PIDControl.RobustSlopeEstimator(10)
+    _feed(estimator, t[:22], y[:22])
+    assert estimator.steps == 1
+    assert estimator.confidence < 0.5  # Window restarted from the step
+    _feed(estimator, t[22:], y[22:])
+    assert estimator.slope == pytest.approx(-0.02, abs=0.005)
+    assert estimator.confidence == 1.0
+
+
+def test_quantized_readings_are_not_rejected():
+    t = np.arange(30) * 0.5
+    y = np.round(100.0 - 0.02 * t, 2)  # 0.01 g balance resolution
+    estimator = PIDControl.RobustSlopeEstimator(10)
+    _feed(estimator, t, y)
+    assert estimator.outliers == 0 and estimator.steps == 0
+    assert estimator.slope == pytest.approx(-0.02, abs=0.002)
+
+
+def test_large_window_uses_pair_subset():
+    t, y = _drain(300)
+    estimator = PIDControl.RobustSlopeEstimator(300)
+    _feed(estimator, t, y)
+    assert len(estimator._pairs[300][0]) == estimator.MAX_PAIRS
+    assert estimator.slope == pytest.approx(-0.02, abs=1e-4)
+
+
+def test_balance_holds_on_low_confidence():
+    balance = PIDControl.Balance(10, robust=True)
+    t, y = _drain(12)
+    for ti, yi in zip(t, y):
+        balance.add(yi, ti)
+    assert balance.flow_rate == pytest.approx(-1.2, abs=0.3)
+    balance.add(y[-1] + 40.0, t[-1] + 0.5)
+    balance.add(y[-1] + 40.0, t[-1] + 1.0)
+    assert balance.confidence < 0.5
+    assert balance.residual is not None
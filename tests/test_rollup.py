@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from System2_utils import RollupTier, Series
+
+
+def _samples():
+    times = np.arange(0.0, 400.0)
+    values = np.sin(times / 20)
+    values[150:153] = np.nan
+    return times, values
+
+
+def test_rollup_buckets():
+    tier = RollupTier(10, 100)
+    for t, v in zip(range(25), range(25)):
+        tier.add(float(t), float(v))
+    rows = tier.view()
+    assert rows[:, 0].tolist() == [0.0, 10.0, 20.0]
+    assert rows[0, 1:].tolist() == [0.0, 4.5, 9.0]
+    assert rows[2, 1:].tolist() == [20.0, 22.0, 24.0]  # Open bucket
+    assert len(tier.rows) == 2
+
+
+def test_rollup_gap_closes_bucket():
+    tier = RollupTier(10, 100)
+    tier.add(0.0, 1.0)
+    tier.add(1.0, np.nan)
+    tier.add(2.0, np.nan)
+    tier.add(3.0, 3.0)
+    rows = tier.view()
+    assert rows[:, 0].tolist() == [0.0, 1.0, 0.0]
+    assert np.isnan(rows[1, 1:]).all()
+    assert rows[2, 2] == 3.0
+
+
+def test_rollup_extend_matches_add():
+    times, values = _samples()
+    added, extended = RollupTier(7, 100), RollupTier(7, 100)
+    for t, v in zip(times, values):
+        added.add(t, v)
+    extended.extend(times[:50], values[:50])
+    extended.extend(times[50:], values[50:])
+    assert np.allclose(added.view(), extended.view(), equal_nan=True)
+
+
+def _full_series():
+    series = Series(100, ((10, 50), (60, 50)))
+    times, values = _samples()
+    series.extend(times, values)
+    return series, times, values
+
+
+def test_window_reads_raw_when_it_reaches_back():
+    series, times, values = _full_series()
+    window_t, window_v = series.window(350.5)
+    assert window_t.tolist() == times[350:].tolist()
+
+
+@pytest.mark.parametrize('start', [250.0, 100.0, -1e9])
+def test_window_from_tiers_ends_with_raw_samples(start):
+    series, times, values = _full_series()
+    window_t, window_v = series.window(start)
+    assert np.all(np.diff(window_t) >= 0)
+    assert window_t[0] <= max(start, 0.0)
+    # The newest bucket comes from the raw samples, so the window ends with the latest one
+    assert window_t[-1] == times[-1] and window_v[-1] == values[-1]
+    assert window_t[-10:].tolist() == times[-10:].tolist()
+    # Extremes of the aggregated part come from the data
+    inside = ~np.isnan(window_v)
+    assert window_v[inside].max() <= values[~np.isnan(values)].max()
+
+
+def test_window_picks_finest_tier_that_reaches_back():
+    series, times, values = _full_series()
+    fine_t, _ = series.window(250.0)  # 10 s tier covers 400 - 50 * 10 = back to 0
+    assert np.count_nonzero(np.diff(fine_t) == 5.0) > 0
+
+
+def test_history_covers_everything_once():
+    series, times, values = _full_series()
+    history_t, history_v = series.history()
+    assert np.all(np.diff(history_t) >= 0)
+    assert history_t[0] == 0.0
+    assert history_t[-100:].tolist() == times[-100:].tolist()
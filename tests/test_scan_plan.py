@@ -0,0 +1,49 @@
+import struct
+
+import numpy as np
+import pytest
+
+from System2_Equipment import ScanPlan, decode_floats, encode_floats, plan_scan_groups
+
+
+def test_plan_merges_close_registers():
+    assert plan_scan_groups([100, 102, 110, 140]) == [(100, 12), (140, 2)]
+    assert plan_scan_groups([100, 102], max_gap=0) == [(100, 4)]
+    assert plan_scan_groups([104, 100, 100]) == [(100, 6)]
+    assert plan_scan_groups([]) == []
+
+
+def test_plan_respects_request_limit():
+    groups = plan_scan_groups(range(0, 300, 2))
+    assert all(count <= 125 for start, count in groups)
+    covered = {reg for start, count in groups for reg in range(start, start + count)}
+    assert all(reg in covered and reg + 1 in covered for reg in range(0, 300, 2))
+
+
+@pytest.mark.parametrize('word_order', ['little', 'big'])
+def test_encode_decode_round_trip(word_order):
+    values = [0.0, 1.5, -273.15, 3.4e38, 1e-6]
+    words = np.asarray(encode_floats(values, word_order), dtype=np.uint16)
+    decoded = decode_floats(words, np.arange(0, len(words), 2), word_order)
+    assert decoded == pytest.approx(np.float32(values))
+
+
+def test_little_word_order_puts_low_word_first():
+    low, high = struct.unpack('<HH', struct.pack('<f', 1.5))
+    assert list(encode_floats([1.5])) == [low, high]
+    assert list(encode_floats([1.5], 'big')) == [high, low]
+
+
+def test_scan_plan_decodes_every_register():
+    registers = [200, 100, 104, 180]
+    values = {100: 1.25, 104: -2.5, 180: 100.0, 200: 7.75}
+    plan = ScanPlan(registers, max_gap=4)
+    assert plan.groups == [(100, 6), (180, 2), (200, 2)]
+
+    memory = np.zeros(300, dtype=np.uint16)
+    for reg, value in values.items():
+        memory[reg:reg + 2] = encode_floats([value])
+    for g, (start, count) in enumerate(plan.groups):
+        plan.store(g, memory[start:start + count])
+    assert dict(zip(plan.registers, plan.decode())) == values
+    assert [plan.groups[g][0] for g in plan.group_of] == [100, 100, 180, 200]
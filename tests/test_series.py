@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from System2_utils import RingBuffer, Series
+
+
+def test_ring_buffer_keeps_newest_rows_in_order():
+    ring = RingBuffer(4, 2)
+    for i in range(6):
+        ring.append((i, 10 * i))
+    assert len(ring) == 4
+    assert ring.view()[:, 0].tolist() == [2, 3, 4, 5]
+    assert ring.last().tolist() == [5, 50]
+    with pytest.raises(ValueError):
+        ring.view()[0, 0] = 1
+
+
+def test_ring_buffer_extend_matches_append():
+    appended, extended = RingBuffer(5, 2), RingBuffer(5, 2)
+    rows = np.column_stack((np.arange(13), np.arange(13) ** 2))
+    for row in rows[:3]:
+        appended.append(row)
+        extended.append(row)
+    for row in rows[3:]:
+        appended.append(row)
+    extended.extend(rows[3:])
+    assert np.array_equal(appended.view(), extended.view())
+
+
+def test_ring_buffer_clear():
+    ring = RingBuffer(3, 1)
+    ring.extend([[1], [2]])
+    ring.clear()
+    assert len(ring) == 0 and ring.last() is None
+
+
+def test_series_samples_are_copies():
+    series = Series(3)
+    for i in range(5):
+        series.append(float(i), i * 2.0)
+    times, values = series.samples()
+    assert times.tolist() == [2.0, 3.0, 4.0]
+    assert values.tolist() == [4.0, 6.0, 8.0]
+    series.append(5.0, 10.0)
+    assert times.tolist() == [2.0, 3.0, 4.0]
+
+
+def test_series_gap_markers_collapse():
+    series = Series(10)
+    series.append(0.0, 1.0)
+    series.append_gap(1.0)
+    series.append_gap(2.0)
+    times, values = series.samples()
+    assert times.tolist() == [0.0, 1.0]
+    assert np.isnan(values[1])
+    assert series.last_time() == 1.0
+
+
+def test_series_since_and_clear():
+    series = Series(4)
+    series.append(0.0, 0.0)
+    version = series.version
+    series.append(1.0, 1.0)
+    series.append(2.0, 2.0)
+    times, values, version = series.since(version)
+    assert times.tolist() == [1.0, 2.0]
+    assert series.since(version)[0].tolist() == []
+
+    for i in range(3, 10):
+        series.append(float(i), float(i))
+    assert series.since(version) is None  # Overwritten since the last read
+
+    version = series.version
+    series.clear()
+    assert series.since(version) is None
+    assert len(series) == 0 and series.last_time() is None
+
+
+def test_series_listeners_called_on_change():
+    series = Series(4)
+    calls = []
+    series.listeners.append(lambda: calls.append(series.version))
+    series.append(0.0, 1.0)
+    series.extend([1.0, 2.0], [2.0, 3.0])
+    series.clear()
+    assert calls == [1, 2, 3]
@@ -0,0 +1,73 @@
+import json
+import os
+import time
+
+import numpy as np
+
+import session_recorder
+from session_recorder import RECORD, SessionRecorder, latest_session, load_session
+
+
+def _record(root, segment_seconds=3600.0):
+    recorder = SessionRecorder(str(root), flush_interval=0.01, segment_seconds=segment_seconds)
+    directory = recorder.start()
+    for i in range(100):
+        recorder.record('temperatures', 'T1', 1000.0 + i, float(i))
+        if i % 10 == 0:
+            recorder.record('balances', 'B1', 1000.0 + i, None)
+        if i % 10 == 9:
+            # Let each ten seconds of data go out in its own flush, so segments can rotate
+            expected = i + 1 + i // 10 + 1
+            deadline = time.monotonic() + 5
+            while recorder.records < expected and time.monotonic() < deadline:
+                time.sleep(0.005)
+    recorder.record_tick(1100.0, {'pressures': {'P1': 1.5, 'P2': 2.5}})
+    recorder.stop()
+    return recorder, directory
+
+
+def test_round_trip(tmp_path):
+    recorder, directory = _record(tmp_path)
+    data = load_session(directory)
+
+    times, values = data[('temperatures', 'T1')]
+    assert times.tolist() == [1000.0 + i for i in range(100)]
+    assert values.tolist() == [float(i) for i in range(100)]
+    assert np.isnan(data[('balances', 'B1')][1]).all()
+    assert data[('pressures', 'P2')][1].tolist() == [2.5]
+    assert recorder.stats()['records'] == 100 + 10 + 2
+    assert latest_session(str(tmp_path)) == directory
+
+
+def test_time_range_skips_sealed_segments(tmp_path):
+    recorder, directory = _record(tmp_path, segment_seconds=10.0)
+    index = [json.loads(line) for line in open(os.path.join(directory, 'index.jsonl'))]
+    assert len(index) > 1
+    assert sum(entry['records'] for entry in index) == recorder.records
+
+    times, values = load_session(directory, start=1050.0, end=1059.0)[('temperatures', 'T1')]
+    assert times.tolist() == [1050.0 + i for i in range(10)]
+
+
+def test_truncated_segment_recovered(tmp_path):
+    recorder, directory = _record(tmp_path)
+    # Simulate a crash: the last segment is not in the index and its last record is torn
+    os.remove(os.path.join(directory, 'index.jsonl'))
+    segment = os.path.join(directory, 'segment_000000.bin')
+    size = os.path.getsize(segment)
+    with open(segment, 'r+b') as f:
+        f.truncate(size - RECORD.itemsize // 2)
+    with open(os.path.join(directory, 'series.jsonl'), 'a') as f:
+        f.write('{"id": 9, "type": "tor')  # Torn series line
+
+    data = load_session(directory)
+    total = sum(len(times) for times, values in data.values())
+    assert total == recorder.records - 1
+    assert data[('temperatures', 'T1')][0][-1] == 1099.0
+
+
+def test_latest_session_excludes_current(tmp_path):
+    first = _record(tmp_path)[1]
+    second = _record(tmp_path)[1]
+    assert latest_session(str(tmp_path), exclude=second) == first
+    assert session_recorder.list_sessions(str(tmp_path)) == sorted([first, second])
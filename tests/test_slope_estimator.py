@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from scipy.stats import linregress
+
+from pid_control import PIDControl
+
+
+def _readings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    t = 1.7e9 + np.cumsum(rng.uniform(0.05, 0.15, n))  # Unix timestamps
+    y = 5000.0 - 0.02 * (t - t[0]) + rng.normal(0, 0.01, n)
+    return t, y
+
+
+@pytest.mark.parametrize('window', [2, 10, 300])
+def test_sliding_slope_matches_linregress(window):
+    t, y = _readings(3 * window + 7)
+    estimator = PIDControl.SlopeEstimator(window)
+    for i in range(len(t)):
+        estimator.add(t[i], y[i])
+        if i >= 1:
+            first = max(0, i + 1 - window)
+            expected = linregress(t[first:i + 1], y[first:i + 1]).slope
+            assert estimator.slope == pytest.approx(expected, rel=1e-6, abs=1e-9)
+
+
+def test_weighted_slope_matches_weighted_fit():
+    t, y = _readings(50)
+    halflife = 8
+    estimator = PIDControl.SlopeEstimator(10, halflife=halflife)
+    for ti, yi in zip(t, y):
+        estimator.add(ti, yi)
+    weights = 0.5 ** ((len(t) - 1 - np.arange(len(t))) / halflife)
+    expected = np.polyfit(t - t[-1], y, 1, w=np.sqrt(weights))[0]
+    assert estimator.slope == pytest.approx(expected, rel=1e-6)
+
+
+def test_slope_undefined_for_repeated_time():
+    estimator = PIDControl.SlopeEstimator(5)
+    assert estimator.slope is None
+    estimator.add(1.0, 1.0)
+    estimator.add(1.0, 2.0)
+    assert estimator.slope is None
+    estimator.clear()
+    assert estimator.count == 0
+
+
+def test_balance_flow_rate_in_ml_per_min():
+    balance = PIDControl.Balance(10)
+    for i in range(10):
+        balance.add(100.0 - 0.05 * i, 1000.0 + i)  # 0.05 g/s out
+    assert balance.flow_rate == pytest.approx(-3.0)
+    assert balance.confidence == 1.0
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from System2_Equipment import PumpSpeedPoller
+
+
+class FakePump:
+    COM = 'fake'
+
+    def __init__(self):
+        self.reads = []
+        self.lock = threading.Lock()
+
+    def get_speed(self, channel):
+        with self.lock:
+            self.reads.append(channel)
+        return channel * 1.5
+
+
+def _poll(poller, seconds):
+    time.sleep(seconds)
+    poller.stop()
+    assert not poller.thread.is_alive()
+
+
+def test_round_robin_at_aggregate_rate():
+    pump = FakePump()
+    readings = []
+    poller = PumpSpeedPoller(pump, lambda name, value: readings.append((name, value)), rate=100)
+    for channel in (1, 2, 3):
+        poller.add_channel(channel, f"Ch{channel}")
+    _poll(poller, 0.3)
+
+    assert 20 <= len(pump.reads) <= 40  # About 30 reads shared by all channels, not 30 each
+    assert pump.reads[:6] == [1, 2, 3, 1, 2, 3]
+    assert readings[0] == ('Ch1', 1.5)
+
+
+def test_skip_and_remove_channels():
+    pump = FakePump()
+    poller = PumpSpeedPoller(pump, lambda name, value: None, rate=200, skip=lambda name: name == 'Ch2')
+    poller.add_channel(1, 'Ch1')
+    poller.add_channel(2, 'Ch2')
+    time.sleep(0.1)
+    poller.remove_channel(1)
+    assert not poller.has_channel(1) and poller.has_channel(2)
+    with pump.lock:
+        count = len(pump.reads)
+    _poll(poller, 0.1)
+
+    assert set(pump.reads) == {1}  # Ch2 is skipped, Ch1 was removed
+    assert len(pump.reads) <= count + 1
+
+
+def test_read_errors_keep_polling(capsys):
+    class FailingPump(FakePump):
+        def get_speed(self, channel):
+            super().get_speed(channel)
+            raise IOError("timeout")
+
+    pump = FailingPump()
+    poller = PumpSpeedPoller(pump, lambda name, value: None, rate=100)
+    poller.add_channel(1, 'Ch1')
+    _poll(poller, 0.1)
+    assert len(pump.reads) >= 3
+    assert "Polling error on Ch1" in capsys.readouterr().out
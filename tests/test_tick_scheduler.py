@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from pid_control import TickScheduler
+
+
+def _run(scheduler, tick, seconds):
+    thread = threading.Thread(target=scheduler.run, args=(tick,))
+    thread.daemon = True
+    thread.start()
+    time.sleep(seconds)
+    scheduler.stop()
+    thread.join(2)
+    assert not thread.is_alive()
+
+
+def test_fixed_rate_without_drift():
+    scheduler = TickScheduler(50)
+    starts = []
+    _run(scheduler, lambda dt: starts.append(time.monotonic()), 0.5)
+    # Deadlines are k * period from the start, so the count does not drift
+    assert 22 <= scheduler.ticks <= 27
+    assert scheduler.dropped == 0
+    assert scheduler.stats()['latency']['p50'] < 0.01
+
+
+def test_drop_runs_newest_missed_deadline():
+    scheduler = TickScheduler(100, policy='drop')
+    durations = iter([0.055] + [0.0] * 1000)
+    dts = []
+
+    def tick(dt):
+        dts.append(dt)
+        time.sleep(next(durations))
+
+    _run(scheduler, tick, 0.2)
+    # The first tick overran about five deadlines: four are dropped, the newest runs late
+    assert 4 <= scheduler.dropped <= 6
+    assert dts[1] == pytest.approx(0.055, abs=0.01)
+    assert scheduler.overruns == 1
+
+
+def test_catchup_runs_missed_ticks_back_to_back():
+    scheduler = TickScheduler(100, policy='catchup', max_catchup=3)
+    durations = iter([0.055] + [0.0] * 1000)
+    starts = []
+
+    def tick(dt):
+        starts.append(time.monotonic())
+        time.sleep(next(durations))
+
+    _run(scheduler, tick, 0.2)
+    # About five deadlines were missed; up to max_catchup of them run late, the rest are dropped
+    assert 1 <= scheduler.dropped <= 3
+    assert starts[2] - starts[1] < 0.005  # Back to back
+    assert scheduler.late >= 2
+
+
+def test_tick_errors_do_not_stop_the_loop(capsys):
+    scheduler = TickScheduler(100)
+
+    def tick(dt):
+        raise RuntimeError("bad tick")
+
+    _run(scheduler, tick, 0.05)
+    assert scheduler.ticks >= 2
+    assert "bad tick" in capsys.readouterr().out
+
+
+def test_histograms_count_every_tick():
+    scheduler = TickScheduler(200)
+    _run(scheduler, lambda dt: None, 0.1)
+    histograms = scheduler.histograms()
+    assert sum(latency for label, latency, jitter in histograms) == scheduler.ticks
+    assert sum(jitter for label, latency, jitter in histograms) == scheduler.ticks - 1
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        TickScheduler(1, policy='skip')